@@ -0,0 +1,83 @@
+"""
+Archives the old years of a made up log and compares it with the whole log in a single csv file: the space on disk,
+and how long searches take in a new process, when nothing is in memory yet
+
+Run from the repository root:  python benchmarks/bench_archive.py [--rows N] [--before DD/MM/YYYY] [--runs N]
+
+"""
+import argparse
+import os
+import shutil
+import statistics
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import synthetic
+from worklog import stores
+
+SEARCHES = [  # name, search run on a store that has nothing in memory yet
+    ("last week", lambda store: store.find_by_date_range("22/12/2018", "28/12/2018")),
+    ("a week archived", lambda store: store.find_by_date_range("02/03/2015", "08/03/2015")),
+    ("two words", lambda store: store.find_by_words("deploy client")),
+    ("every task", lambda store: store.get_tasks()),
+]
+
+
+def directory_size(file_name):
+    """
+    :param file_name: string ... a file or a directory
+    :return: integer ... bytes of the file, or of every file in the directory
+    """
+    if os.path.isdir(file_name):
+        return sum(os.path.getsize(os.path.join(file_name, name)) for name in os.listdir(file_name))
+    return os.path.getsize(file_name) if os.path.exists(file_name) else 0
+
+
+def cold_time(file_name, search, runs):
+    """
+    :param file_name: string ... log file
+    :param search: function ... called with a new store of the log
+    :param runs: integer
+    :return: float ... median milliseconds
+    """
+    times = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        search(stores.make_store(file_name))
+        times.append((time.perf_counter() - start) * 1000)
+    return statistics.median(times)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--rows", type=int, default=300000, help="tasks in the made up log, from 2014 to 2018")
+    parser.add_argument("--before", default="01/01/2018", help="tasks dated before this day are archived")
+    parser.add_argument("--runs", type=int, default=3, help="runs of each search")
+    arguments = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        whole_file_name = os.path.join(directory, "whole.csv")
+        archived_file_name = os.path.join(directory, "archived.csv")
+        synthetic.write_log(whole_file_name, arguments.rows)
+        shutil.copy(whole_file_name, archived_file_name)
+        start = time.perf_counter()
+        archived_tasks = stores.archive_log(archived_file_name, arguments.before)
+        print("{} of {} tasks archived in {:.0f} ms".format(archived_tasks, arguments.rows,
+                                                           (time.perf_counter() - start) * 1000))
+        for file_name in (whole_file_name, archived_file_name):
+            stores.make_store(file_name).get_tasks()  # writes the sidecars, as any earlier run would have
+        print("on disk: whole log {:.1f} MB, log file {:.1f} MB + archive {:.1f} MB\n".format(
+            directory_size(whole_file_name) / 1e6, directory_size(archived_file_name) / 1e6,
+            directory_size(archived_file_name + stores.ARCHIVE_EXTENSION) / 1e6))
+
+        print("{:<20} {:>12} {:>12}".format("search, cold", "whole ms", "archived ms"))
+        for name, search in SEARCHES:
+            print("{:<20} {:>12.1f} {:>12.1f}".format(name, cold_time(whole_file_name, search, arguments.runs),
+                                                      cold_time(archived_file_name, search, arguments.runs)))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,89 @@
+"""
+Compares the csv and the SQLite backends on made up logs of several sizes
+
+Run from the repository root:  python benchmarks/bench_backends.py [--sizes N [N ...]] [--runs N]
+
+"""
+import argparse
+import os
+import re
+import statistics
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import synthetic
+from worklog import stores
+
+SEARCHES = [  # name, search run on a store
+    ("date range, 1 month", lambda store: store.find_by_date_range("01/03/2016", "31/03/2016")),
+    ("time spent, 1 minute", lambda store: store.find_by_time_spent(95, 95)),
+    ("two words", lambda store: store.find_by_words("deploy client")),
+    ("phrase", lambda store: store.find_by_phrase("database backup")),
+    ("pattern", lambda store: store.find_by_pattern(re.compile(r"#9\d\d\b"))),
+    ("median time spent", lambda store: store.time_spent_percentile(50)),
+]
+
+
+def timed(function):
+    """
+    :param function: function ... called with no arguments
+    :return: float ... milliseconds it took
+    """
+    start = time.perf_counter()
+    function()
+    return (time.perf_counter() - start) * 1000
+
+
+def benchmark(store, runs):
+    """
+    Times the searches on a store
+    :param store: stores.LogStore
+    :param runs: integer
+    :return: [(string, float, float)] ... search, milliseconds of the first run, median milliseconds of the others
+    """
+    results = []
+    for name, search in SEARCHES:
+        first_time = timed(lambda: search(store))
+        later_times = [timed(lambda: search(store)) for _ in range(runs)]
+        results.append((name, first_time, statistics.median(later_times)))
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10000, 100000, 1000000], help="tasks in each log")
+    parser.add_argument("--runs", type=int, default=5, help="runs of each search after the first one")
+    arguments = parser.parse_args()
+
+    for size in arguments.sizes:
+        with tempfile.TemporaryDirectory() as directory:
+            csv_file_name = os.path.join(directory, "work_log.csv")
+            sqlite_file_name = os.path.join(directory, "work_log.sqlite")
+            synthetic.write_log(csv_file_name, size)
+            print("\n{} tasks, csv log of {:.1f} MB".format(size, os.path.getsize(csv_file_name) / 1e6))
+            print("  load csv (no sidecar yet)   {:9.1f} ms".format(
+                timed(lambda: stores.TaskStore(csv_file_name).get_tasks())))
+            csv_store = stores.TaskStore(csv_file_name)
+            print("  load csv                    {:9.1f} ms".format(timed(csv_store.get_tasks)))
+            print("  migrate to SQLite           {:9.1f} ms, {:.1f} MB".format(
+                timed(lambda: stores.migrate_log(csv_file_name, sqlite_file_name)),
+                sum(os.path.getsize(file_name) for file_name in (sqlite_file_name, sqlite_file_name + "-wal")) / 1e6))
+            sqlite_store = stores.SqliteStore(sqlite_file_name)
+            print("  {:<26}  {:>21}  {:>21}".format("search, ms first / later", "csv", "SQLite"))
+            for (name, csv_first, csv_later), (_, sqlite_first, sqlite_later) in zip(
+                    benchmark(csv_store, arguments.runs), benchmark(sqlite_store, arguments.runs)):
+                print("  {:<26}  {:9.2f} / {:9.2f}  {:9.2f} / {:9.2f}".format(name, csv_first, csv_later,
+                                                                           sqlite_first, sqlite_later))
+            for store in (csv_store, sqlite_store):
+                store.append(["01/01/2016", "one more task", 5, ""])  # opens whatever the first append opens
+            print("  append one task             {:9.2f} ms  {:9.2f} ms".format(
+                timed(lambda: csv_store.append(["01/01/2016", "one more task", 5, ""])),
+                timed(lambda: sqlite_store.append(["01/01/2016", "one more task", 5, ""]))))
+            sqlite_store.connection.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,102 @@
+"""
+Times turning the dates of a made up log into ordinals and back with the date codec, date_to_ordinal and
+ordinal_to_date, against strptime and strftime as they were used before, and loading the log with each
+
+Run from the repository root:  python benchmarks/bench_dates.py [--rows N] [--runs N]
+
+"""
+import argparse
+import csv
+import os
+import statistics
+import sys
+import tempfile
+import time
+from datetime import date, datetime
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import synthetic
+from worklog import core, stores
+
+
+def strptime_to_ordinal(date_string):
+    return datetime.strptime(date_string, core.DATE_FORMAT).toordinal()
+
+
+def strftime_to_date(ordinal):
+    return date.fromordinal(ordinal).strftime(core.DATE_FORMAT)
+
+
+def median_time(function, runs, before=None):
+    """
+    :param function: function ... called with no arguments
+    :param runs: integer
+    :param before: function ... called before each run, not timed
+    :return: float ... median milliseconds
+    """
+    times = []
+    for _ in range(runs):
+        if before:
+            before()
+        start = time.perf_counter()
+        function()
+        times.append((time.perf_counter() - start) * 1000)
+    return statistics.median(times)
+
+
+def clear_caches():
+    core.date_to_ordinal.cache_clear()
+    core.ordinal_to_date.cache_clear()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--rows", type=int, default=100000, help="tasks in the made up log")
+    parser.add_argument("--runs", type=int, default=5, help="runs of each case")
+    arguments = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        log_file_name = os.path.join(directory, "work_log.csv")
+        synthetic.write_log(log_file_name, arguments.rows)
+        with open(log_file_name, newline="") as f:
+            dates = [row[0] for row in csv.reader(f)]
+        ordinals = [core.date_to_ordinal(task_date) for task_date in dates]
+        print("{} tasks on {} distinct dates\n".format(len(dates), len(set(dates))))
+
+        def parse_every_date(parse):
+            return lambda: [parse(task_date) for task_date in dates]
+
+        def format_every_date(format_date):
+            return lambda: [format_date(ordinal) for ordinal in ordinals]
+
+        unseen_dates = ["{:02d}/{:02d}/{}".format(day, month, year)
+                        for year in range(1990, 2010) for month in range(1, 13) for day in range(1, 29)]
+
+        print("{:<32} {:>14} {:>14} {:>14}".format("ms", "strptime", "codec, cold", "codec, warm"))
+        print("{:<32} {:>14.1f} {:>14.1f} {:>14.1f}".format(
+            "parse the date of every row", median_time(parse_every_date(strptime_to_ordinal), arguments.runs),
+            median_time(parse_every_date(core.date_to_ordinal), arguments.runs, clear_caches),
+            median_time(parse_every_date(core.date_to_ordinal), arguments.runs)))
+        print("{:<32} {:>14.1f} {:>14.1f} {:>14}".format(
+            "parse {} distinct dates".format(len(unseen_dates)),
+            median_time(lambda: [strptime_to_ordinal(task_date) for task_date in unseen_dates], arguments.runs),
+            median_time(lambda: [core.date_to_ordinal(task_date) for task_date in unseen_dates], arguments.runs,
+                        clear_caches), ""))
+        print("{:<32} {:>14.1f} {:>14.1f} {:>14.1f}".format(
+            "format the date of every row", median_time(format_every_date(strftime_to_date), arguments.runs),
+            median_time(format_every_date(core.ordinal_to_date), arguments.runs, clear_caches),
+            median_time(format_every_date(core.ordinal_to_date), arguments.runs)))
+
+        stores.SIDECAR_MIN_SIZE = 2 ** 62  # so that every load parses the whole log
+        store = stores.TaskStore(log_file_name)
+        codec = core.date_to_ordinal
+        core.date_to_ordinal = strptime_to_ordinal
+        strptime_load = median_time(store.load, arguments.runs)
+        core.date_to_ordinal = codec
+        print("{:<32} {:>14.1f} {:>14.1f} {:>14}".format("load the log", strptime_load,
+                                                         median_time(store.load, arguments.runs, clear_caches), ""))
+
+
+if __name__ == "__main__":
+    main()
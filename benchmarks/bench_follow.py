@@ -0,0 +1,83 @@
+"""
+Times keeping a made up log up to date in memory, with every index built, while another store appends tasks to it and
+edits them: reading only what was appended against loading the log again, and how long a LogFollower takes to pick
+up a new task
+
+Run from the repository root:  python benchmarks/bench_follow.py [--rows N] [--runs N]
+
+"""
+import argparse
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import synthetic
+from worklog import core, stores, server
+
+
+def median_time(change, catch_up, runs):
+    """
+    :param change: function ... changes the log, not timed
+    :param catch_up: function ... brings the store up to date with the change
+    :param runs: integer
+    :return: float ... median milliseconds of catching up
+    """
+    times = []
+    for run in range(runs):
+        change(run)
+        start = time.perf_counter()
+        catch_up()
+        times.append((time.perf_counter() - start) * 1000)
+    return statistics.median(times)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--rows", type=int, default=100000, help="tasks in the made up log")
+    parser.add_argument("--runs", type=int, default=10, help="changes caught up with each way")
+    arguments = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        log_file_name = os.path.join(directory, "work_log.csv")
+        synthetic.write_log(log_file_name, arguments.rows)
+        store = stores.TaskStore(log_file_name)
+        writer = stores.TaskStore(log_file_name)  # another process, as far as store can tell
+        store.warm_up()
+        writer.refresh()
+
+        def append(run):
+            writer.append(["01/06/2016", "appended task {}".format(run), "30", ""])
+
+        def edit(run):
+            writer.replace_task(writer.get_task_by_id(run + 1), core.Task("edited task", 45, "", "02/06/2016"))
+
+        def reload():
+            store.load()
+            store.warm_up()
+
+        print("{:<10} {:>18} {:>18}".format("ms", "appended only", "whole log"))
+        for name, change in (("append", append), ("edit", edit)):
+            print("{:<10} {:>18.2f} {:>18.2f}".format(name, median_time(change, store.warm_up, arguments.runs),
+                                                      median_time(change, reload, arguments.runs)))
+
+        follower = server.follow_log(store)
+        lags = []
+        for run in range(arguments.runs):
+            rows = len(store.table)
+            start = time.perf_counter()
+            append(run)
+            while len(store.table) == rows:
+                time.sleep(0.0005)
+            lags.append((time.perf_counter() - start) * 1000)
+        through_inotify = follower.inotify_fd is not None
+        follower.stop()
+        print("\na task appended by another store is in memory, indexed, {:.2f} ms after appending it starts ({})"
+              .format(statistics.median(lags), "inotify" if through_inotify else "polling"))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,85 @@
+"""
+Times finding, editing and deleting tasks by their id against finding them by comparing them with every row, the way
+tasks without an id are found, on a made up log. Also times giving ids to a log written before tasks had them, and an
+append that doesn't load the log to know the ids taken.
+
+Run from the repository root:  python benchmarks/bench_ids.py [--rows N] [--runs N]
+
+"""
+import argparse
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import synthetic
+from worklog import core, stores
+
+
+def median_time(function, arguments):
+    """
+    :param function: function ... called with each argument
+    :param arguments: list
+    :return: float ... median milliseconds of a call
+    """
+    times = []
+    for argument in arguments:
+        start = time.perf_counter()
+        function(argument)
+        times.append((time.perf_counter() - start) * 1000)
+    return statistics.median(times)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--rows", type=int, default=100000, help="tasks in the made up log")
+    parser.add_argument("--runs", type=int, default=20, help="tasks found, edited and deleted each way")
+    arguments = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        log_file_name = os.path.join(directory, "work_log.csv")
+        synthetic.write_log(log_file_name, arguments.rows)  # without ids, as logs were written before
+        start = time.perf_counter()
+        stores.migrate_log(log_file_name)
+        print("{} tasks given ids by migrate in {:.0f} ms".format(arguments.rows, (time.perf_counter() - start) * 1000))
+        start = time.perf_counter()
+        stores.TaskStore(log_file_name).append(["01/01/2016", "appended", "1", ""])
+        print("add from a new store, which doesn't load the log, in {:.1f} ms".format(
+            (time.perf_counter() - start) * 1000))
+        store = stores.TaskStore(log_file_name)
+        table = store.refresh()
+        start = time.perf_counter()
+        store.get_id_index()
+        print("id index built in {:.1f} ms\n".format((time.perf_counter() - start) * 1000))
+
+        random.seed(1)
+        task_ids = random.sample(range(1, table.live_rows + 1), 4 * arguments.runs)
+        by_id, by_content = task_ids[:2 * arguments.runs], task_ids[2 * arguments.runs:]
+
+        def without_id(task_id):
+            task = store.get_task_by_id(task_id)
+            return core.Task(task.description, task.time_spent, task.notes, task.task_date)
+
+        print("{:<10} {:>12} {:>16}".format("ms", "by id", "by every row"))
+        print("{:<10} {:>12.3f} {:>16.3f}".format(
+            "find", median_time(lambda task_id: store.find_row(store.get_task_by_id(task_id)), by_id),
+            median_time(lambda task_id: store.find_row(without_id(task_id)), by_content)))
+        print("{:<10} {:>12.3f} {:>16.3f}".format(
+            "edit", median_time(lambda task_id: store.replace_task(
+                core.Task("", 0, "", "01/01/2016", task_id), core.Task("edited", 1, "", "01/01/2016")),
+                by_id[:arguments.runs]),
+            median_time(lambda task_id: store.replace_task(without_id(task_id), core.Task("edited", 1, "",
+                                                                                          "01/01/2016")),
+                        by_content[:arguments.runs])))
+        print("{:<10} {:>12.3f} {:>16.3f}".format(
+            "delete", median_time(lambda task_id: store.delete_task(core.Task("", 0, "", "01/01/2016", task_id)),
+                                  by_id[arguments.runs:]),
+            median_time(lambda task_id: store.delete_task(without_id(task_id)), by_content[arguments.runs:])))
+
+
+if __name__ == "__main__":
+    main()
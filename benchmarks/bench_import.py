@@ -0,0 +1,73 @@
+"""
+Times how long it takes a fresh Python process to import worklog and run its first query
+
+Run from the repository root:  python benchmarks/bench_import.py [--rows N] [--runs N]
+
+"""
+import argparse
+import os
+import subprocess
+import sys
+import tempfile
+
+import synthetic
+
+REPOSITORY = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# what each fresh process runs, it prints the milliseconds taken by the import and by the import plus the first query
+CHILD = """
+import sys, time
+start = time.perf_counter()
+sys.path.insert(0, {repository!r})
+from worklog import api
+imported = time.perf_counter()
+api.query(date="15/06/2016", log=api.open_log({log!r}))
+queried = time.perf_counter()
+print((imported - start) * 1000, (queried - start) * 1000)
+"""
+
+
+def run(log_file_name, runs):
+    """
+    Imports worklog and queries the log in new processes
+    :param log_file_name: string
+    :param runs: integer
+    :return: ([float], [float]) ... milliseconds to import, milliseconds to import and query
+    """
+    child = CHILD.format(repository=REPOSITORY, log=log_file_name)
+    import_times, query_times = [], []
+    for _ in range(runs):
+        output = subprocess.check_output([sys.executable, "-c", child])
+        import_time, query_time = output.split()
+        import_times.append(float(import_time))
+        query_times.append(float(query_time))
+    return import_times, query_times
+
+
+def describe(name, times):
+    """
+    :param name: string
+    :param times: [float] ... milliseconds
+    :return: string ... fastest and median time
+    """
+    times = sorted(times)
+    return "{:<24} min {:7.2f} ms   median {:7.2f} ms".format(name, times[0], times[len(times) // 2])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--rows", type=int, default=1000, help="tasks in the made up log")
+    parser.add_argument("--runs", type=int, default=20, help="processes to start")
+    arguments = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        log_file_name = os.path.join(directory, "work_log.csv")
+        synthetic.write_log(log_file_name, arguments.rows)
+        run(log_file_name, 1)  # compiles worklog and warms the disk cache
+        import_times, query_times = run(log_file_name, arguments.runs)
+    print(describe("import", import_times))
+    print(describe("import and first query", query_times))
+
+
+if __name__ == "__main__":
+    main()
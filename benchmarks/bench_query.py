@@ -0,0 +1,97 @@
+"""
+Times searches that combine several conditions on a made up log, run by the query planner of run_query against running
+each condition as a search of its own and intersecting the tasks found, the way query did before, and shows the plan
+of each.
+
+Run from the repository root:  python benchmarks/bench_query.py [--rows N] [--runs N]
+
+"""
+import argparse
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import synthetic
+from worklog import core, stores
+
+QUERIES = [
+    {"date": ("01/01/2016", "31/12/2016"), "minutes": (60, None), "pattern": r"deploy"},
+    {"date": ("01/03/2016", "31/03/2016"), "text": "database backup"},
+    {"minutes": 95, "contains": "ploy"},
+    {"text": "deploy client", "pattern": r"#9\d\d\b"},
+    {"date": ("01/01/2013", "31/12/2017"), "minutes": (0, 30), "contains": "e #9", "pattern": r"\d{4}"},
+]
+
+
+def run_separately(store, query):
+    """
+    :param store: TaskStore
+    :param query: Query
+    :return: [Task] ... found by a search for each condition, keeping those that every search found, in log order
+    """
+    found = []
+    if query.dates:
+        found.append(store.find_by_date_range(*query.dates))
+    if query.minutes:
+        found.append(store.find_by_time_spent(*query.minutes))
+    if query.text is not None:
+        found.append(store.find_by_phrase(query.text))
+    if query.contains is not None:
+        found.append(store.find_by_substring(query.contains))
+    if query.pattern is not None:
+        found.append(store.find_by_pattern(query.pattern))
+    row_ids = set.intersection(*({task.row_id for task in tasks} for tasks in found))
+    return sorted((task for task in found[0] if task.row_id in row_ids), key=lambda task: task.row_id)
+
+
+def median_time(function, runs):
+    """
+    :param function: function ... called with no arguments
+    :param runs: integer
+    :return: (float, object) ... median milliseconds, and what the last run returned
+    """
+    times = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        result = function()
+        times.append((time.perf_counter() - start) * 1000)
+    return statistics.median(times), result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--rows", type=int, default=100000, help="tasks in the made up log")
+    parser.add_argument("--runs", type=int, default=5, help="runs of each search")
+    arguments = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        log_file_name = os.path.join(directory, "work_log.csv")
+        synthetic.write_log(log_file_name, arguments.rows)
+        store = stores.TaskStore(log_file_name)
+        store.warm_up()
+        print("{} tasks, indexes built\n".format(store.table.live_rows))
+
+        for conditions in QUERIES:
+            query = core.Query(**conditions)
+            planned_time, planned = median_time(lambda: store.run_query(query), arguments.runs)
+            separate_time, separate = median_time(lambda: run_separately(store, query), arguments.runs)
+            if [task.row_id for task in planned] != [task.row_id for task in separate]:
+                print("the planner and the separate searches found different tasks")
+                return 1
+            plan = core.QueryPlan()
+            store.run_query(query, plan)
+            print("{}\n{} found, planned {:.2f} ms, each condition on its own {:.2f} ms".format(
+                ", ".join(query.describe(condition) for condition in query.get_conditions()), len(planned),
+                planned_time, separate_time))
+            for line in plan.explain():
+                print("    " + line)
+            print()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,145 @@
+"""
+Starts a query server on a made up log and checks it against many clients at once: several threads keep searching while
+others add tasks, and at the end every task added must be in the log exactly once. Also compares a search run by a new
+process on its own with the same search sent to the server.
+
+Run from the repository root:  python benchmarks/bench_serve.py [--rows N] [--readers N] [--writers N]
+
+"""
+import argparse
+import collections
+import os
+import re
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+
+BENCHMARKS_DIRECTORY = os.path.dirname(os.path.abspath(__file__))
+WORKLOG_SCRIPT = [sys.executable, "-m", "worklog"]
+WORKLOG_ENVIRONMENT = dict(os.environ, PYTHONPATH=os.path.dirname(BENCHMARKS_DIRECTORY))  # to find it from anywhere
+sys.path.insert(0, os.path.dirname(BENCHMARKS_DIRECTORY))
+
+import synthetic
+from worklog import stores, server, api
+
+SEARCHES = [  # run by the readers in turn, on their own RemoteStore
+    lambda store: store.find_by_date_range("01/03/2016", "31/03/2016"),
+    lambda store: store.find_by_time_spent(95, 95),
+    lambda store: store.find_by_words("deploy client"),
+    lambda store: store.find_by_phrase("database backup"),
+    lambda store: store.time_spent_percentile(50),
+]
+
+
+def start_server(log_file_name):
+    """
+    :param log_file_name: string
+    :return: (subprocess.Popen, string) ... the server process and its URL, once it is answering
+    """
+    process = subprocess.Popen(WORKLOG_SCRIPT + ["serve", "--log", log_file_name, "--port", "0"],
+                               stderr=subprocess.PIPE, universal_newlines=True, env=WORKLOG_ENVIRONMENT)
+    line = process.stderr.readline()
+    match = re.search(r"http://\S+", line)
+    if not match:
+        process.kill()
+        raise RuntimeError("the server didn't start: {}".format(line + process.stderr.read()))
+    return process, match.group(0)
+
+
+def timed_process(arguments):
+    """
+    :param arguments: [string] ... for the script
+    :return: float ... milliseconds that a new process running the script took
+    """
+    start = time.perf_counter()
+    subprocess.check_call(WORKLOG_SCRIPT + arguments, stdout=subprocess.DEVNULL, env=WORKLOG_ENVIRONMENT)
+    return (time.perf_counter() - start) * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--rows", type=int, default=100000, help="tasks in the made up log")
+    parser.add_argument("--readers", type=int, default=8, help="threads searching")
+    parser.add_argument("--writers", type=int, default=4, help="threads adding tasks")
+    parser.add_argument("--tasks", type=int, default=200, help="tasks added by each writer")
+    arguments = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        log_file_name = os.path.join(directory, "work_log.csv")
+        synthetic.write_log(log_file_name, arguments.rows)
+        process, url = start_server(log_file_name)
+        try:
+            # the script searches its own log, so the process on its own runs in the directory of the made up log
+            own_log = os.path.join(directory, stores.WORK_LOG_FILE_NAME)
+            os.link(log_file_name, own_log)
+            search = ["search", "--text", "database backup"]
+            start_directory = os.getcwd()
+            os.chdir(directory)
+            try:
+                alone = [timed_process(search) for _ in range(3)]
+            finally:
+                os.chdir(start_directory)
+            served = [timed_process(["--server", url] + search) for _ in range(3)]
+            print("search from a new process:  on its own {:8.1f} ms   through the server {:8.1f} ms".format(
+                statistics.median(alone), statistics.median(served)))
+
+            stop = threading.Event()
+            latencies = []  # milliseconds of every search
+            errors = []
+
+            def read():
+                store = server.RemoteStore(url)
+                try:
+                    while not stop.is_set():
+                        for search_function in SEARCHES:
+                            start = time.perf_counter()
+                            search_function(store)
+                            latencies.append((time.perf_counter() - start) * 1000)
+                except Exception as error:
+                    errors.append(error)
+
+            def write(writer_number):
+                store = server.RemoteStore(url)
+                try:
+                    for task_number in range(arguments.tasks):
+                        api.add("w{} n{}".format(writer_number, task_number), 1, task_date="01/01/2016", log=store)
+                except Exception as error:
+                    errors.append(error)
+
+            readers = [threading.Thread(target=read) for _ in range(arguments.readers)]
+            writers = [threading.Thread(target=write, args=(writer_number,))
+                       for writer_number in range(arguments.writers)]
+            start = time.perf_counter()
+            for thread in readers + writers:
+                thread.start()
+            for thread in writers:
+                thread.join()
+            elapsed = time.perf_counter() - start
+            stop.set()
+            for thread in readers:
+                thread.join()
+        finally:
+            process.terminate()
+            process.wait()
+
+        counts = collections.Counter(task.description for task in stores.TaskStore(log_file_name).get_tasks())
+        expected = {"w{} n{}".format(writer_number, task_number)
+                    for writer_number in range(arguments.writers) for task_number in range(arguments.tasks)}
+        lost = expected - set(counts)
+        repeated = [description for description in expected if counts[description] > 1]
+
+    print("{} tasks added in {:.2f} s, {:.0f} tasks/s, while {} readers ran {} searches, median {:.2f} ms, "
+          "95th percentile {:.2f} ms".format(len(expected), elapsed, len(expected) / elapsed, arguments.readers,
+                                            len(latencies), statistics.median(latencies) if latencies else 0,
+                                            sorted(latencies)[int(len(latencies) * 0.95)] if latencies else 0))
+    print("lost {}, repeated {}, errors {}".format(len(lost), len(repeated), len(errors)))
+    for error in errors[:5]:
+        print("  {}: {}".format(type(error).__name__, error))
+    return 1 if lost or repeated or errors else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
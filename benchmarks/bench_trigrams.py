@@ -0,0 +1,87 @@
+"""
+Shows how well the trigram index narrows down searches by pattern and by text on a made up log: for each search, how
+many rows were left to check, the share of them pruned, and how long it took with the index and checking every row
+
+Run from the repository root:  python benchmarks/bench_trigrams.py [--rows N] [--runs N]
+
+"""
+import argparse
+import os
+import re
+import statistics
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import synthetic
+from worklog import core, stores
+
+PATTERNS = [r".*deploy.*", r"#9\d\d\b", r"rel\w+ docs", r"(?i)DATABASE backup", r"waiting for the", r"\d{4}",
+            r"ops team|vpn"]
+SUBSTRINGS = ["deploy", "ploy", "café", "e #9", "payment gateway"]
+FUZZY_TEXTS = ["deplyo clinet", "databse backpu", "secruity adit"]
+
+
+def median_time(function, runs):
+    """
+    :param function: function ... called with no arguments
+    :param runs: integer
+    :return: (float, object) ... median milliseconds, and what the last run returned
+    """
+    times = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        result = function()
+        times.append((time.perf_counter() - start) * 1000)
+    return statistics.median(times), result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--rows", type=int, default=100000, help="tasks in the made up log")
+    parser.add_argument("--runs", type=int, default=5, help="runs of each search")
+    arguments = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        log_file_name = os.path.join(directory, "work_log.csv")
+        synthetic.write_log(log_file_name, arguments.rows)
+        store = stores.TaskStore(log_file_name)
+        table = store.refresh()
+        start = time.perf_counter()
+        trigram_index = store.get_trigram_index()
+        print("{} tasks, trigram index of {} trigrams built in {:.0f} ms\n".format(
+            table.live_rows, len(trigram_index.postings), (time.perf_counter() - start) * 1000))
+
+        print("{:<28} {:>8} {:>10} {:>8} {:>12} {:>12}".format("search", "found", "checked", "pruned", "index ms",
+                                                                  "every row ms"))
+        searches = [(pattern, re.compile(pattern)) for pattern in PATTERNS] + [(text, text) for text in SUBSTRINGS]
+        for name, search in searches:
+            if isinstance(search, str):
+                folded_text = search.casefold()
+                candidates = trigram_index.find([folded_text])
+                index_time, found = median_time(lambda: store.find_by_substring(search), arguments.runs)
+                every_row_time, _ = median_time(lambda: [row_id for row_id in table.live_row_ids()
+                                                         if folded_text in table.get_description(row_id).casefold() or
+                                                         folded_text in table.get_notes(row_id).casefold()],
+                                                arguments.runs)
+            else:
+                candidates = trigram_index.find(core.required_texts(search))
+                index_time, found = median_time(lambda: store.find_by_pattern(search), arguments.runs)
+                every_row_time, _ = median_time(lambda: [row_id for row_id in table.live_row_ids()
+                                                         if search.search(table.get_description(row_id)) or
+                                                         search.search(table.get_notes(row_id))], arguments.runs)
+            checked = table.live_rows if candidates is None else len(candidates)
+            print("{:<28} {:>8} {:>10} {:>7.1%} {:>12.2f} {:>12.2f}".format(
+                name, len(found), checked, 1 - checked / table.live_rows, index_time, every_row_time))
+
+        print("\n{:<28} {:>8} {:>12}  {}".format("fuzzy search", "found", "ms", "best match"))
+        for text in FUZZY_TEXTS:
+            fuzzy_time, found = median_time(lambda: store.find_fuzzy(text), arguments.runs)
+            best_match = "{:.2f} {}".format(found[0][0], found[0][1].description) if found else ""
+            print("{:<28} {:>8} {:>12.2f}  {}".format(text, len(found), fuzzy_time, best_match))
+
+
+if __name__ == "__main__":
+    main()
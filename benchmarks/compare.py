@@ -0,0 +1,54 @@
+"""
+Compares two result files of run_benchmarks.py, e.g. from two commits
+
+Run from the repository root:  python benchmarks/compare.py OLD.json NEW.json [--threshold 1.2]
+
+Exits with status 1 if any case got slower than the threshold allows.
+
+"""
+import argparse
+import json
+import sys
+
+
+def load_results(file_name):
+    """
+    :param file_name: string ... written by run_benchmarks.py
+    :return: (dictionary, dictionary) ... the whole file, and its results by (backend, rows, name)
+    """
+    with open(file_name) as f:
+        run = json.load(f)
+    return run, {(result["backend"], result["rows"], result["name"]): result for result in run["results"]}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("old")
+    parser.add_argument("new")
+    parser.add_argument("--threshold", type=float, default=1.2,
+                        help="how many times slower a case may get before it counts as a regression")
+    parser.add_argument("--figure", choices=["median_ms", "min_ms", "first_ms"], default="median_ms")
+    arguments = parser.parse_args()
+
+    old_run, old_results = load_results(arguments.old)
+    new_run, new_results = load_results(arguments.new)
+    print("old: {} on Python {}\nnew: {} on Python {}\n".format(
+        (old_run["commit"] or "?")[:12], old_run["python"], (new_run["commit"] or "?")[:12], new_run["python"]))
+    regressions = 0
+    for key in sorted(set(old_results) & set(new_results)):
+        old_time, new_time = old_results[key][arguments.figure], new_results[key][arguments.figure]
+        ratio = new_time / old_time if old_time else float("inf")
+        slower = ratio > arguments.threshold
+        regressions += slower
+        print("{:<8} {:>9} {:<30} {:10.2f} ms -> {:10.2f} ms  x{:6.2f}{}".format(
+            key[0], key[1], key[2], old_time, new_time, ratio, "  SLOWER" if slower else ""))
+    for key in sorted(set(old_results) ^ set(new_results)):
+        print("{:<8} {:>9} {:<30} only in {}".format(key[0], key[1], key[2],
+                                                     "old" if key in old_results else "new"))
+    print("\n{} of {} cases slower than x{}".format(regressions, len(set(old_results) & set(new_results)),
+                                                   arguments.threshold))
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,200 @@
+"""
+Times every way the script reads, searches and writes a log, on made up logs of several sizes, and saves the timings
+as json so that they can be compared between commits with compare.py
+
+Run from the repository root:  python benchmarks/run_benchmarks.py [--sizes N [N ...]] [--backends csv sqlite]
+
+The menu functions are run as they are, with their input() prompts answered by the benchmark and what they print
+thrown away.
+
+"""
+import argparse
+import builtins
+import contextlib
+import io
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+BENCHMARKS_DIRECTORY = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(BENCHMARKS_DIRECTORY))
+
+import synthetic
+from worklog import stores, cli
+
+
+@contextlib.contextmanager
+def answering(answers):
+    """
+    Answers the input() prompts of the script with the given answers, in order, and hides what it prints
+    :param answers: [string]
+    :return: None
+    """
+    remaining_answers = iter(answers)
+
+    def answer(prompt=""):
+        try:
+            return next(remaining_answers)
+        except StopIteration:
+            raise RuntimeError("the benchmark ran out of answers at the prompt {!r}".format(prompt))
+
+    original_input, builtins.input = builtins.input, answer
+    try:
+        with contextlib.redirect_stdout(io.StringIO()):
+            yield
+    finally:
+        builtins.input = original_input
+
+
+def menu_search(search_function, answers):
+    """
+    :param search_function: function ... one of the find_by_ functions of the search menu
+    :param answers: [string] ... for its prompts, the answer to go back from the task list is added
+    :return: function ... runs the search
+    """
+    def run():
+        with answering(answers + ["b"]):
+            search_function()
+    return run
+
+
+def delete_first_task(use_journal):
+    """
+    :param use_journal: boolean ... whether the delete goes to the journal or rewrites the log
+    :return: function ... deletes the first task through the menu function, after confirming it
+    """
+    def run():
+        stores.USE_JOURNAL = use_journal
+        try:
+            with answering(["y"]):
+                cli.delete_task(stores.get_task_store().get_tasks()[0])
+        finally:
+            stores.USE_JOURNAL = True
+    return run
+
+
+def make_cases(store):
+    """
+    What to time on a log
+    :param store: stores.LogStore ... the log, already made the script's TASK_STORE
+    :return: [(string, function, boolean)] ... name, what to run and whether it changes the log
+    """
+    tasks = stores.read_log_file()
+    dates = store.get_dates_with_tasks()
+    middle_date = str(len(dates) // 2)
+    month_later = str(min(len(dates) // 2 + 22, len(dates) - 1))
+    return [
+        ("read_log_file", stores.read_log_file, False),
+        ("find_dates_with_tasks", lambda: cli.find_dates_with_tasks(tasks), False),
+        ("order_dates", lambda: cli.order_dates([task.task_date for task in tasks]), False),
+        ("get_dates_with_tasks", store.get_dates_with_tasks, False),
+        ("find_by_date one day", menu_search(cli.find_by_date, ["n", middle_date]), False),
+        ("find_by_date a month", menu_search(cli.find_by_date, ["y", middle_date, month_later]), False),
+        ("find_by_time_spent exact", menu_search(cli.find_by_time_spent, ["n", "95"]), False),
+        ("find_by_time_spent range", menu_search(cli.find_by_time_spent, ["y", "30", "45"]), False),
+        ("find_by_exact_search word", menu_search(cli.find_by_exact_search, ["rollback"]), False),
+        ("find_by_exact_search phrase", menu_search(cli.find_by_exact_search, ["database backup"]), False),
+        ("find_by_pattern", menu_search(cli.find_by_pattern, [r"#9\d\d\b"]), False),
+        ("find_by_text_anywhere", menu_search(cli.find_by_text_anywhere, ["ploy cli"]), False),
+        ("find_by_similar_text", menu_search(cli.find_by_similar_text, ["databse backpu"]), False),
+        ("append_task_to_log", lambda: stores.append_task_to_log(["31/12/2018", "one more", "5", ""]), True),
+        ("delete_task journal", delete_first_task(True), True),
+        ("delete_task rewrite", delete_first_task(False), True),
+        ("rewrite_log_file", lambda: stores.rewrite_log_file(stores.read_log_file()), True),
+    ]
+
+
+def timed(function):
+    """
+    :param function: function ... called with no arguments
+    :return: float ... milliseconds it took
+    """
+    start = time.perf_counter()
+    function()
+    return (time.perf_counter() - start) * 1000
+
+
+def benchmark_log(file_name, backend, rows, runs):
+    """
+    Times everything on one log
+    :param file_name: string ... csv log
+    :param backend: string ... csv or sqlite
+    :param rows: integer
+    :param runs: integer ... runs of each case after the first one
+    :return: [dictionary] ... a result for each case
+    """
+    if backend == "sqlite":
+        database_file_name = os.path.splitext(file_name)[0] + ".sqlite"
+        stores.migrate_log(file_name, database_file_name)
+        file_name = database_file_name
+    results = []
+
+    def result(name, times):
+        results.append({"backend": backend, "rows": rows, "name": name, "first_ms": times[0],
+                        "median_ms": statistics.median(times[1:] or times), "min_ms": min(times), "runs": len(times)})
+        print("  {:<8} {:>9} {:<30} first {:10.2f} ms   median {:10.2f} ms".format(
+            backend, rows, name, times[0], results[-1]["median_ms"]), file=sys.stderr)
+
+    # a new store each time, so that the log is read from the file, with the sidecar of the csv log from the second on
+    result("open and read", [timed(lambda: stores.make_store(file_name).get_tasks()) for _ in range(runs + 1)])
+
+    store = stores.make_store(file_name)
+    stores.set_task_store(store)
+    for name, function, changes_log in make_cases(store):
+        result(name, [timed(function) for _ in range(1 if changes_log and rows > 100000 else runs + 1)])
+    return results
+
+
+def get_commit():
+    """
+    :return: (string, boolean) ... commit of the repository and whether there are changes not committed, None if the
+    repository can't be asked
+    """
+    try:
+        commit = subprocess.check_output(["git", "rev-parse", "HEAD"], cwd=BENCHMARKS_DIRECTORY,
+                                         stderr=subprocess.DEVNULL).decode().strip()
+        status = subprocess.check_output(["git", "status", "--porcelain", "--untracked-files=no"],
+                                         cwd=BENCHMARKS_DIRECTORY, stderr=subprocess.DEVNULL)
+    except (OSError, subprocess.CalledProcessError):
+        return None, None
+    return commit, bool(status.strip())
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10000, 100000, 1000000],
+                        help="rows of each made up log, up to a few million")
+    parser.add_argument("--backends", nargs="+", choices=["csv", "sqlite"], default=["csv"])
+    parser.add_argument("--runs", type=int, default=5, help="runs of each case after the first one")
+    parser.add_argument("--output", help="json file for the results, by default results/<commit>.json here")
+    arguments = parser.parse_args()
+
+    commit, changed = get_commit()
+    output_file_name = arguments.output or os.path.join(
+        BENCHMARKS_DIRECTORY, "results", "{}{}.json".format((commit or "unknown")[:12], "-changed" if changed else ""))
+    results = []
+    for rows in arguments.sizes:
+        with tempfile.TemporaryDirectory() as directory:
+            log_file_name = os.path.join(directory, "work_log.csv")
+            synthetic.write_log(log_file_name, rows)
+            for backend in arguments.backends:
+                copy_file_name = os.path.join(directory, "{}_log.csv".format(backend))
+                with open(log_file_name, 'rb') as source, open(copy_file_name, 'wb') as copy:
+                    copy.write(source.read())
+                results.extend(benchmark_log(copy_file_name, backend, rows, arguments.runs))
+
+    os.makedirs(os.path.dirname(os.path.abspath(output_file_name)), exist_ok=True)
+    with open(output_file_name, 'w') as f:
+        json.dump({"commit": commit, "changed": changed, "python": platform.python_version(),
+                   "platform": platform.platform(), "cpus": os.cpu_count(),
+                   "time": time.strftime("%Y-%m-%dT%H:%M:%S%z"), "results": results}, f, indent=1)
+    print("results written to {}".format(output_file_name), file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
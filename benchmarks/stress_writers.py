@@ -0,0 +1,107 @@
+"""
+Several processes, each with several threads, append to one log while another process keeps rewriting it. At the end
+every appended task must be in the log exactly once.
+
+Run from the repository root:  python benchmarks/stress_writers.py [--processes N] [--threads N] [--tasks N]
+
+"""
+import argparse
+import collections
+import multiprocessing
+import os
+import sys
+import tempfile
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from worklog import stores, api
+
+
+def append_tasks(log_file_name, process_number, threads, tasks):
+    """
+    Appends tasks from several threads at once, runs in a writer process
+    :param log_file_name: string
+    :param process_number: integer
+    :param threads: integer
+    :param tasks: integer ... tasks appended by each thread
+    :return: None
+    """
+    log = api.open_log(log_file_name)
+
+    def append_from_thread(thread_number):
+        for task_number in range(tasks):
+            api.add("p{} t{} n{}".format(process_number, thread_number, task_number), 1,
+                    task_date="01/01/2016", log=log)
+
+    appenders = [threading.Thread(target=append_from_thread, args=(thread_number,)) for thread_number in range(threads)]
+    for appender in appenders:
+        appender.start()
+    for appender in appenders:
+        appender.join()
+
+
+def rewrite_tasks(log_file_name, stop, interval, rewrites):
+    """
+    Writes the whole log over again until told to stop, runs in the rewriting process
+    :param log_file_name: string
+    :param stop: multiprocessing.Event
+    :param interval: float ... seconds between rewrites
+    :param rewrites: multiprocessing.Value ... counts the rewrites
+    :return: None
+    """
+    log = api.open_log(log_file_name)
+    while not stop.wait(interval):
+        log.save()
+        rewrites.value += 1
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--processes", type=int, default=4, help="writer processes")
+    parser.add_argument("--threads", type=int, default=8, help="threads in each writer process")
+    parser.add_argument("--tasks", type=int, default=200, help="tasks appended by each thread")
+    parser.add_argument("--rewrite-interval", type=float, default=0.02,
+                        help="seconds between rewrites of the whole log, 0 for none")
+    arguments = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        log_file_name = os.path.join(directory, "work_log.csv")
+        stop = multiprocessing.Event()
+        rewrites = multiprocessing.Value("i", 0)
+        rewriter = multiprocessing.Process(target=rewrite_tasks,
+                                           args=(log_file_name, stop, arguments.rewrite_interval, rewrites))
+        writers = [multiprocessing.Process(target=append_tasks,
+                                           args=(log_file_name, process_number, arguments.threads, arguments.tasks))
+                   for process_number in range(arguments.processes)]
+        start = time.perf_counter()
+        if arguments.rewrite_interval:
+            rewriter.start()
+        for writer in writers:
+            writer.start()
+        for writer in writers:
+            writer.join()
+        elapsed = time.perf_counter() - start
+        stop.set()
+        if arguments.rewrite_interval:
+            rewriter.join()
+
+        counts = collections.Counter(task.description for task in stores.TaskStore(log_file_name).get_tasks())
+        expected = {"p{} t{} n{}".format(process_number, thread_number, task_number)
+                    for process_number in range(arguments.processes)
+                    for thread_number in range(arguments.threads)
+                    for task_number in range(arguments.tasks)}
+        lost = expected - set(counts)
+        repeated = [description for description, count in counts.items() if count > 1]
+        unexpected = set(counts) - expected
+
+    print("{} tasks appended in {:.2f} s, {:.0f} tasks/s, {} rewrites meanwhile".format(
+        len(expected), elapsed, len(expected) / elapsed, rewrites.value))
+    print("lost {}, repeated {}, unexpected {}".format(len(lost), len(repeated), len(unexpected)))
+    failed = lost or repeated or unexpected or any(writer.exitcode for writer in writers) or rewriter.exitcode
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,97 @@
+"""
+Made up work logs for the benchmarks, written the way the script writes them
+
+Run from the repository root:  python benchmarks/synthetic.py ROWS FILE  to write one on its own
+
+"""
+import csv
+import random
+import sys
+from bisect import bisect_right
+from datetime import date, timedelta
+
+VERBS = ["fix", "review", "deploy", "write", "update", "test", "plan", "refactor", "document", "migrate", "support",
+         "investigate", "prepare", "call", "meet"]
+OBJECTS = ["login page", "invoice report", "database backup", "client portal", "release notes", "build server",
+           "payment gateway", "search index", "mobile app", "user survey", "api docs", "monthly budget", "ci pipeline",
+           "email templates", "sprint board", "security audit"]
+NOTE_WORDS = ["waiting", "for", "the", "client", "to", "confirm", "bug", "found", "in", "staging", "asked", "about",
+              "deadline", "moved", "next", "week", "needs", "review", "done", "tests", "pass", "see", "ticket", "with",
+              "ops", "team", "rollback", "plan", "ready", "blocked", "by", "vpn", "access", "notes", "sent", "call",
+              "tomorrow", "morning", "numbers", "look", "odd", "checked", "twice", "\"quoted\"", "comma,", "café"]
+
+
+def day_weights(first_day, last_day):
+    """
+    How likely each day is to have a task: weekends far less than weekdays, and the team grows over time so later
+    days have more tasks than earlier ones
+    :param first_day: datetime.date
+    :param last_day: datetime.date
+    :return: ([integer], [float]) ... ordinals of the days and running totals of their weights
+    """
+    ordinals, running_totals, running_total = [], [], 0.0
+    days = (last_day - first_day).days + 1
+    for day_number in range(days):
+        day = first_day + timedelta(days=day_number)
+        weight = (0.08 if day.weekday() >= 5 else 1.0) * (1 + 2 * day_number / days)
+        running_total += weight
+        ordinals.append(day.toordinal())
+        running_totals.append(running_total)
+    return ordinals, running_totals
+
+
+def make_notes(random_number):
+    """
+    Notes as input_task_notes makes them: no notes at all half of the time, else a few lines joined by new lines
+    :param random_number: function ... random.Random.random, which is much quicker than choice
+    :return: string
+    """
+    if random_number() < 0.5:
+        return ""
+    lines = [" ".join([NOTE_WORDS[int(random_number() * len(NOTE_WORDS))] for _ in range(3 + int(random_number() * 8))])
+             for _ in range((1, 1, 1, 2, 2, 3, 4)[int(random_number() * 7)])]
+    return "\n".join(lines)
+
+
+def make_rows(rows, seed=0, last_day=date(2018, 12, 31), years=5):
+    """
+    Makes log rows spread over some years, mostly in date order as tasks are logged on the day they are done, with
+    some logged a few days late
+    :param rows: integer ... number of rows
+    :param seed: integer
+    :param last_day: datetime.date ... date of the most recent task
+    :param years: integer ... years that the log goes back
+    :return: generator of [string] ... date, description, minutes, notes
+    """
+    generator = random.Random(seed)
+    random_number = generator.random
+    ordinals, running_totals = day_weights(last_day - timedelta(days=365 * years), last_day)
+    picks = sorted(bisect_right(running_totals, random_number() * running_totals[-1]) for _ in range(rows))
+    dates = {}  # ordinal: dd/mm/yyyy
+    for pick in picks:
+        ordinal = ordinals[min(pick, len(ordinals) - 1)]
+        if random_number() < 0.05:
+            ordinal -= 1 + int(random_number() * 10)  # logged late
+        if ordinal not in dates:
+            dates[ordinal] = date.fromordinal(ordinal).strftime("%d/%m/%Y")
+        description = VERBS[int(random_number() * len(VERBS))] + " " + OBJECTS[int(random_number() * len(OBJECTS))]
+        if random_number() < 0.3:
+            description += " #{}".format(100 + int(random_number() * 9900))
+        minutes = min(480, max(5, int(round(generator.lognormvariate(3.8, 0.8) / 5)) * 5))
+        yield [dates[ordinal], description, str(minutes), make_notes(random_number)]
+
+
+def write_log(file_name, rows, seed=0):
+    """
+    Writes a made up csv log
+    :param file_name: string
+    :param rows: integer ... number of rows
+    :param seed: integer
+    :return: None
+    """
+    with open(file_name, 'w', newline='') as f:
+        csv.writer(f).writerows(make_rows(rows, seed))
+
+
+if __name__ == "__main__":
+    write_log(sys.argv[2], int(sys.argv[1]))
@@ -0,0 +1,150 @@
+"""
+Archiving a log moves its old tasks to compressed segments, one for each year, and the archived log finds, edits and
+deletes its tasks as the log did before, even when an archive or an edit is cut short
+
+Run from the repository root:  python -m pytest tests  (or python -m unittest discover tests)
+
+"""
+import csv
+import gzip
+import io
+import os
+import re
+import sys
+import tempfile
+import unittest
+from unittest import mock
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from worklog import core, stores
+
+TASKS = [["{:02d}/{:02d}/{}".format(day, month, year), "{} task {} {} {}".format(
+    "review" if day == 10 else "deploy", year, month, day), str((day * month) % 50 + 1), "notes" if day > 1 else ""]
+    for year in (2014, 2015, 2016) for month in (1, 6, 12) for day in (1, 10, 20)]
+ROWS = [task + [str(task_id)] for task_id, task in enumerate(TASKS, 1)]  # as appended, with their ids
+
+
+def in_order(tasks):
+    """
+    :param tasks: [Task]
+    :return: [[string]] ... the tasks as rows, by date then description, to compare searches that order them apart
+    """
+    return sorted((core.task_to_row(task) for task in tasks), key=lambda row: (core.date_to_ordinal(row[0]),
+                                                                                    row[1]))
+
+
+class TestArchive(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.log_file_name = os.path.join(self.directory.name, "work_log.csv")
+        stores.TaskStore(self.log_file_name).append_rows([core.normalize_row(task) for task in TASKS])
+        self.archive_directory = self.log_file_name + stores.ARCHIVE_EXTENSION
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def test_old_tasks_go_to_a_segment_for_each_year(self):
+        self.assertEqual(stores.archive_log(self.log_file_name, "01/01/2016"), 18)
+        self.assertEqual(sorted(os.listdir(self.archive_directory)),
+                         ["0001_2014-01-01_2014-12-20.csv.gz", "0002_2015-01-01_2015-12-20.csv.gz", "segments.csv",
+                          "segments.lock"])
+        for year, segment_file_name in ((2014, "0001_2014-01-01_2014-12-20.csv.gz"),
+                                        (2015, "0002_2015-01-01_2015-12-20.csv.gz")):
+            with gzip.open(os.path.join(self.archive_directory, segment_file_name), "rt", newline="") as f:
+                self.assertEqual(list(csv.reader(f)), [row for row in ROWS if row[0].endswith(str(year))])
+        with open(os.path.join(self.archive_directory, "segments.csv"), newline="") as f:
+            self.assertEqual(list(csv.reader(f)), [
+                ["1", "0001_2014-01-01_2014-12-20.csv.gz", "01/01/2014", "20/12/2014", "9",
+                 str(sum(int(task[2]) for task in TASKS[:9])), "9"],
+                ["2", "0002_2015-01-01_2015-12-20.csv.gz", "01/01/2015", "20/12/2015", "9",
+                 str(sum(int(task[2]) for task in TASKS[9:18])), "18"]])
+        self.assertEqual([core.task_to_row(task) for task in stores.TaskStore(self.log_file_name).get_tasks()],
+                         TASKS[18:])
+        log = stores.make_store(self.log_file_name)
+        self.assertIsInstance(log, stores.ArchivedStore)
+        self.assertEqual([core.task_to_row(task) for task in log.get_tasks()], TASKS)
+        self.assertEqual(stores.archive_log(self.log_file_name, "01/01/2016"), 0)
+
+    def test_searches_find_as_a_scan(self):
+        stores.archive_log(self.log_file_name, "01/01/2016")
+        log = stores.make_store(self.log_file_name)
+        pattern = re.compile(r"review task 201[45]")
+        searches = [
+            (log.find_by_date_range("05/06/2014", "15/06/2015"),
+             [task for task in TASKS if core.date_to_ordinal("05/06/2014") <= core.date_to_ordinal(task[0]) <=
+              core.date_to_ordinal("15/06/2015")]),
+            (log.find_by_date_range("01/01/2016", "31/12/2016"), TASKS[18:]),
+            (log.find_by_time_spent(10, 20), [task for task in TASKS if 10 <= int(task[2]) <= 20]),
+            (log.find_by_words("review notes"), [task for task in TASKS if "review" in task[1] and task[3]]),
+            (log.find_by_pattern(pattern), [task for task in TASKS if pattern.search(task[1])]),
+            (log.find_by_substring("TASK 2015 6"), [task for task in TASKS if "task 2015 6" in task[1]]),
+        ]
+        for found, scanned in searches:
+            self.assertEqual(in_order(found), in_order(core.task_from_row(task) for task in scanned))
+        self.assertEqual(log.get_dates_with_tasks(), [task[0] for task in TASKS])
+        minutes = sorted(int(task[2]) for task in TASKS)
+        for percent in (1, 50, 90, 100):
+            self.assertEqual(log.time_spent_percentile(percent),
+                             minutes[core.nearest_rank(percent, len(minutes))], percent)
+        self.assertEqual(log.find_fuzzy("reviw task 2015 6 10", 1)[0][1].description, "review task 2015 6 10")
+
+    def test_edits_and_deletes_of_archived_tasks(self):
+        stores.archive_log(self.log_file_name, "01/01/2016")
+        log = stores.make_store(self.log_file_name)
+        edited_task = log.find_by_words("review task 2014 6")[0]
+        log.replace_task(edited_task, core.Task("edited", 5, "", edited_task.task_date))
+        log.delete_task(log.find_by_words("deploy task 2015 12 20")[0])
+        rows = [task for task in TASKS if task[1] not in (edited_task.description, "deploy task 2015 12 20")]
+        self.assertEqual(in_order(stores.make_store(self.log_file_name).get_tasks()),
+                         in_order(core.task_from_row(task) for task in
+                                  rows + [[edited_task.task_date, "edited", "5", ""]]))
+        self.assertEqual(stores.TaskStore(self.log_file_name).get_tasks()[-1].description, "edited")
+        self.assertEqual(sorted(name for name in os.listdir(self.archive_directory) if name.endswith(".gz")),
+                         ["0003_2014-01-01_2014-12-20.csv.gz", "0004_2015-01-01_2015-12-10.csv.gz"])
+
+    def test_write_rows_keeps_the_old_tasks_archived(self):
+        stores.archive_log(self.log_file_name, "01/01/2016")
+        log = stores.make_store(self.log_file_name)
+        log.write_rows([["01/01/2015", "old", "1", ""], ["01/01/2016", "new", "2", ""]])
+        self.assertEqual([task.description for task in stores.make_store(self.log_file_name).get_tasks()],
+                         ["old", "new"])
+        self.assertEqual([task.description for task in stores.TaskStore(self.log_file_name).get_tasks()], ["new"])
+
+    def test_archive_cut_short_loses_nothing(self):
+        with mock.patch.object(stores.TaskStore, "write_rows", side_effect=OSError("crashed")):
+            with self.assertRaises(OSError):
+                stores.archive_log(self.log_file_name, "01/01/2016")
+        tasks = [core.task_to_row(task) for task in stores.make_store(self.log_file_name).get_tasks()]
+        self.assertEqual(tasks, TASKS[:18] + TASKS)  # the moved tasks twice, none lost
+
+    def test_edit_of_a_segment_written_again_is_refused(self):
+        stores.archive_log(self.log_file_name, "01/01/2016")
+        log = stores.make_store(self.log_file_name)
+        task = log.find_by_words("review task 2014 6")[0]
+        archived = log.find_in_archive(task)
+        stores.make_store(self.log_file_name).delete_task(task)
+        with mock.patch.object(log, "find_in_archive", return_value=archived):  # found just before the delete
+            with self.assertRaises(ValueError):
+                log.replace_task(task, core.Task("edited", 5, "", task.task_date))
+        self.assertEqual(in_order(stores.make_store(self.log_file_name).get_tasks()),
+                         in_order(core.task_from_row(row) for row in TASKS if row[1] != task.description))
+
+    def test_compressions(self):
+        for compression in sorted(stores.ARCHIVE_COMPRESSIONS):
+            contents = io.BytesIO()
+            try:
+                with stores.compressed_file(contents, compression, "wb") as cf:
+                    cf.write(b"01/01/2015,old,1,\r\n")
+            except ValueError:  # zstd without Python 3.14 or the zstandard package
+                continue
+            contents.seek(0)
+            with stores.compressed_file(contents, compression) as cf:
+                self.assertEqual(cf.read(), b"01/01/2015,old,1,\r\n", compression)
+            self.assertEqual(stores.get_compression("0001" + stores.ARCHIVE_COMPRESSIONS[compression]), compression)
+        with self.assertRaises(ValueError):
+            stores.get_compression("0001.csv")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,74 @@
+"""
+The benchmarks run, their made up logs are logs the script reads back as written, and compare.py tells a slowdown
+
+Run from the repository root:  python -m pytest tests  (or python -m unittest discover tests)
+
+"""
+import csv
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import unittest
+from datetime import date, datetime
+
+BENCHMARKS_DIRECTORY = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "benchmarks")
+sys.path.insert(0, os.path.dirname(BENCHMARKS_DIRECTORY))
+sys.path.insert(0, BENCHMARKS_DIRECTORY)
+
+import synthetic
+from worklog import core, stores
+
+
+class TestBenchmarks(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def test_made_up_logs_are_valid(self):
+        rows = list(synthetic.make_rows(2000, seed=3))
+        self.assertEqual(rows, list(synthetic.make_rows(2000, seed=3)))
+        self.assertNotEqual(rows, list(synthetic.make_rows(2000, seed=4)))
+        for row in rows:
+            self.assertEqual(core.normalize_row(row), row)
+            self.assertLessEqual(datetime.strptime(row[0], "%d/%m/%Y").date(), date(2018, 12, 31))
+            self.assertTrue(5 <= int(row[2]) <= 480)
+        log_file_name = os.path.join(self.directory.name, "work_log.csv")
+        synthetic.write_log(log_file_name, 2000, seed=3)
+        with open(log_file_name, newline="") as f:
+            self.assertEqual(list(csv.reader(f)), rows)
+        self.assertEqual([core.task_to_row(task) for task in stores.TaskStore(log_file_name).get_tasks()], rows)
+
+    def run_script(self, *arguments):
+        """
+        :param arguments: strings ... the script in benchmarks and its arguments
+        :return: subprocess.CompletedProcess
+        """
+        return subprocess.run([sys.executable, os.path.join(BENCHMARKS_DIRECTORY, arguments[0])] + list(arguments[1:]),
+                              capture_output=True, text=True)
+
+    def test_run_and_compare(self):
+        old_file_name = os.path.join(self.directory.name, "old.json")
+        result = self.run_script("run_benchmarks.py", "--sizes", "200", "--backends", "csv", "sqlite", "--runs", "1",
+                                 "--output", old_file_name)
+        self.assertEqual(result.returncode, 0, result.stderr)
+        with open(old_file_name) as f:
+            run = json.load(f)
+        self.assertEqual({(result["backend"], result["rows"]) for result in run["results"]},
+                         {("csv", 200), ("sqlite", 200)})
+
+        self.assertEqual(self.run_script("compare.py", old_file_name, old_file_name).returncode, 0)
+        run["results"][0]["median_ms"] = run["results"][0]["median_ms"] * 2 + 1
+        new_file_name = os.path.join(self.directory.name, "new.json")
+        with open(new_file_name, "w") as f:
+            json.dump(run, f)
+        result = self.run_script("compare.py", old_file_name, new_file_name)
+        self.assertEqual(result.returncode, 1)
+        self.assertIn("1 of {} cases slower".format(len(run["results"])), result.stdout)
+
+
+if __name__ == "__main__":
+    unittest.main()
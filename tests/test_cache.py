@@ -0,0 +1,76 @@
+"""
+The tasks kept in memory are those of the log file, read again only when the file changes
+
+Run from the repository root:  python -m pytest tests  (or python -m unittest discover tests)
+
+"""
+import csv
+import os
+import sys
+import tempfile
+import unittest
+from unittest import mock
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from worklog import core, stores
+
+ROWS = [
+    ["01/02/2016", "first", "5", ""],
+    ["02/02/2016", "second, with a comma", "10", "notes\non two lines"],
+    ["02/02/2016", "third", "15", "\"quoted\""],
+]
+
+
+class TestCache(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.log_file_name = os.path.join(self.directory.name, "work_log.csv")
+        self.write_log(ROWS)
+        self.store = stores.TaskStore(self.log_file_name)
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def write_log(self, rows):
+        with open(self.log_file_name, "w", newline="") as f:
+            csv.writer(f).writerows(rows)
+
+    def rows_in_log(self):
+        with open(self.log_file_name, newline="") as f:
+            return list(csv.reader(f))
+
+    def rows_in_memory(self):
+        return [core.task_to_row(task, with_id=True) for task in self.store.get_tasks()]
+
+    def test_tasks_are_those_of_the_log(self):
+        self.assertEqual(self.rows_in_memory(), ROWS)
+        with mock.patch.object(stores, "TASK_STORE", self.store):
+            self.assertEqual([core.task_to_row(task) for task in stores.read_log_file()], ROWS)
+
+    def test_log_is_read_once(self):
+        self.store.get_tasks()
+        with mock.patch.object(self.store, "load", side_effect=AssertionError("read again")):
+            self.assertEqual(self.rows_in_memory(), ROWS)
+
+    def test_changed_log_is_read_again(self):
+        self.store.get_tasks()
+        self.write_log(ROWS[:1] + [["03/02/2016", "changed by someone else", "20", ""]])
+        self.assertEqual(self.rows_in_memory(), self.rows_in_log())
+
+    def test_appends_reach_the_log_and_the_tasks(self):
+        self.store.get_tasks()
+        self.store.append(["03/02/2016", "appended", "20", ""])
+        with mock.patch.object(self.store, "load", side_effect=AssertionError("read again")):
+            self.assertEqual(self.rows_in_memory(), ROWS + [["03/02/2016", "appended", "20", "", "1"]])
+        self.assertEqual(self.rows_in_log(), self.rows_in_memory())
+
+    def test_missing_log_is_empty(self):
+        os.remove(self.log_file_name)
+        self.assertEqual(self.store.get_tasks(), [])
+        self.store.append(["03/02/2016", "first of a new log", "20", ""])
+        self.assertEqual(self.rows_in_log(), [["03/02/2016", "first of a new log", "20", "", "1"]])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,123 @@
+"""
+The dates with tasks and the tasks of a range of dates, found through the date index, are those a plain scan of the
+log finds, also after appends, edits and deletes, and dates are parsed and formatted as strptime and strftime do
+
+Run from the repository root:  python -m pytest tests  (or python -m unittest discover tests)
+
+"""
+import csv
+import os
+import random
+import sys
+import tempfile
+import unittest
+from datetime import date, datetime
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from worklog import core, stores, cli
+
+
+def make_rows(count, seed):
+    """
+    :return: [[string]] ... rows of a made up log, its dates out of order
+    """
+    randomness = random.Random(seed)
+    first_ordinal = date(2015, 1, 1).toordinal()
+    return [[date.fromordinal(first_ordinal + randomness.randrange(60)).strftime("%d/%m/%Y"), "task {}".format(i),
+             str(randomness.randrange(1, 120)), ""] for i in range(count)]
+
+
+def to_date(task_date):
+    return datetime.strptime(task_date, "%d/%m/%Y")
+
+
+def scan_range(rows, first_date, last_date):
+    """
+    :return: [[string]] ... the rows between two dates, both included, ordered by date and then as in the log
+    """
+    found_rows = [row for row in rows if to_date(first_date) <= to_date(row[0]) <= to_date(last_date)]
+    return sorted(found_rows, key=lambda row: to_date(row[0]))
+
+
+class TestDateIndex(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.log_file_name = os.path.join(self.directory.name, "work_log.csv")
+        with open(self.log_file_name, "w", newline="") as f:
+            csv.writer(f).writerows(make_rows(300, 1))
+        self.store = stores.TaskStore(self.log_file_name)
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def rows_in_log(self):
+        return [core.task_to_row(task) for task in self.store.get_tasks()]
+
+    def assert_found_as_by_a_scan(self):
+        rows = self.rows_in_log()
+        self.assertEqual(self.store.get_dates_with_tasks(), sorted({row[0] for row in rows}, key=to_date))
+        for first_date, last_date in (("01/01/2015", "01/01/2015"), ("10/01/2015", "20/01/2015"),
+                                      ("01/01/2014", "31/12/2015"), ("01/03/2015", "01/04/2015")):
+            self.assertEqual([core.task_to_row(task) for task in self.store.find_by_date_range(first_date,
+                                                                                               last_date)],
+                             scan_range(rows, first_date, last_date), (first_date, last_date))
+
+    def test_dates_and_ranges(self):
+        self.assert_found_as_by_a_scan()
+
+    def test_index_follows_changes(self):
+        self.assert_found_as_by_a_scan()
+        for row in make_rows(20, 2) + [["31/12/2014", "before every other", "5", ""]]:
+            self.store.append(row)
+        tasks = self.store.get_tasks()
+        self.store.replace_task(tasks[5], core.task_from_row(["15/06/2016", "moved to a new date", "30", ""]))
+        self.store.delete_task(self.store.get_tasks()[7])
+        self.store.delete_task(self.store.find_by_date_range("01/01/2015", "01/01/2015")[0])
+        self.assert_found_as_by_a_scan()
+
+    def test_dates_are_ordered(self):
+        dates = ["02/01/2016", "01/02/2015", "31/12/2015", "01/01/2016"]
+        self.assertEqual(cli.order_dates(dates), ["01/02/2015", "31/12/2015", "01/01/2016", "02/01/2016"])
+        tasks = [core.task_from_row([task_date, "task", "1", ""]) for task_date in dates + dates]
+        self.assertEqual(cli.find_dates_with_tasks(tasks), cli.order_dates(dates))
+
+
+class TestDateCodec(unittest.TestCase):
+    def test_dates_are_parsed_and_formatted_as_by_strptime_and_strftime(self):
+        randomness = random.Random(3)
+        ordinals = [date(1000, 1, 1).toordinal(), date(9999, 12, 31).toordinal(), date(2016, 2, 29).toordinal()]
+        ordinals += [randomness.randint(ordinals[0], ordinals[1]) for _ in range(2000)]
+        for ordinal in ordinals:
+            task_date = date.fromordinal(ordinal).strftime("%d/%m/%Y")
+            self.assertEqual(core.ordinal_to_date(ordinal), task_date)
+            self.assertEqual(core.date_to_ordinal(task_date), to_date(task_date).toordinal())
+        for task_date in ("1/2/2016", "01/2/2016", "1/02/2016", " 1/02/2016", "01/02/0016", "1/2/16"):
+            try:
+                expected = to_date(task_date).toordinal()
+            except ValueError:
+                continue
+            self.assertEqual(core.date_to_ordinal(task_date), expected, task_date)
+
+    def test_invalid_dates_raise_as_strptime(self):
+        for task_date in ("31/02/2016", "29/02/2015", "00/01/2016", "32/01/2016", "01/13/2016", "01/00/2016",
+                          "aa/bb/cccc", "01-02-2016", "01/02/2016 ", "\u0661\u0662/02/2016", "",
+                          "+1/02/2016", "01/02/-016"):
+            with self.assertRaises(ValueError, msg=task_date) as raised:
+                to_date(task_date)
+            with self.assertRaises(ValueError, msg=task_date) as raised_by_the_codec:
+                core.date_to_ordinal(task_date)
+            self.assertEqual(str(raised_by_the_codec.exception), str(raised.exception), task_date)
+
+    def test_dates_are_remembered(self):
+        for function, argument in ((core.date_to_ordinal, "17/05/2016"),
+                                   (core.ordinal_to_date, date(2016, 5, 17).toordinal())):
+            self.assertEqual(function.cache_info().maxsize, core.DATE_CACHE_SIZE)
+            function(argument)
+            hits = function.cache_info().hits
+            function(argument)
+            self.assertEqual(function.cache_info().hits, hits + 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,105 @@
+"""
+Editing a task that another process deleted meanwhile changes nothing, in every kind of log, and the edit command says
+so. Every kind of log is a LogStore that has all its methods.
+
+Run from the repository root:  python -m pytest tests  (or python -m unittest discover tests)
+
+"""
+import argparse
+import io
+import os
+import sys
+import tempfile
+import unittest
+from unittest import mock
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from worklog import core, stores, server, cli
+
+TASKS = [
+    ["01/02/2015", "archived", "30", ""],
+    ["01/02/2016", "first", "5", ""],
+    ["02/02/2016", "second", "10", ""],
+]
+
+
+class TestEditsOfDeletedTasks(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def make_log(self, file_name):
+        """
+        :param file_name: string ... in the temporary directory, tasks before 2016 are archived in archived.csv
+        :return: (function, LogStore) ... what opens the log again, as another process would, and the log with TASKS
+        """
+        file_name = os.path.join(self.directory.name, file_name)
+        stores.make_store(file_name).append_rows([core.normalize_row(task) for task in TASKS])
+        if file_name.endswith("archived.csv"):
+            stores.archive_log(file_name, "01/01/2016")
+        return lambda: stores.make_store(file_name), stores.make_store(file_name)
+
+    def assert_not_replaced(self, file_name, new_task):
+        open_log, log = self.make_log(file_name)
+        task = log.find_by_phrase("first")[0]
+        open_log().delete_task(task)
+        with self.assertRaises(ValueError, msg=file_name):
+            log.replace_task(task, new_task)
+        self.assertEqual(sorted(task.description for task in open_log().get_tasks()), ["archived", "second"],
+                         file_name)
+
+    def test_deleted_tasks_are_not_replaced(self):
+        for file_name in ("work_log.csv", "work_log.sqlite", "work_log.months", "archived.csv"):
+            self.assert_not_replaced(file_name, core.Task("edited", 5, "", "01/02/2016"))
+
+    def test_deleted_tasks_are_not_moved_to_another_month(self):
+        self.assert_not_replaced("work_log.months", core.Task("edited", 5, "", "01/04/2016"))
+
+    def test_deleted_archived_tasks_are_not_replaced(self):
+        open_log, log = self.make_log("archived.csv")
+        task = log.find_by_phrase("archived")[0]
+        open_log().delete_task(task)
+        with self.assertRaises(ValueError):
+            log.replace_task(task, core.Task("edited", 5, "", "01/02/2015"))
+        self.assertEqual([task.description for task in open_log().get_tasks()], ["first", "second"])
+
+    def test_deleted_tasks_are_not_replaced_without_the_journal(self):
+        with mock.patch.object(stores, "USE_JOURNAL", False):
+            self.assert_not_replaced("work_log.csv", core.Task("edited", 5, "", "01/02/2016"))
+
+    def test_edit_command_reports_a_deleted_task(self):
+        open_log, log = self.make_log("work_log.csv")
+        task = log.get_task_by_id(2)
+        open_log().delete_task(task)
+        arguments = argparse.Namespace(id=2, description="edited", minutes=None, notes=None, date=None)
+        with mock.patch.object(stores, "TASK_STORE", log), \
+                mock.patch.object(log, "get_task_by_id", return_value=task), \
+                mock.patch("sys.stderr", new_callable=io.StringIO) as stderr:
+            self.assertEqual(cli.batch_edit(arguments), 1)
+        self.assertEqual(stderr.getvalue(), "There is no task 2\n")
+        self.assertEqual([task.description for task in open_log().get_tasks()], ["archived", "second"])
+
+
+class TestLogStore(unittest.TestCase):
+    def test_stores_have_every_method(self):
+        for store_class in (stores.TaskStore, stores.SqliteStore, stores.PartitionedStore, stores.ArchivedStore,
+                            server.RemoteStore):
+            self.assertTrue(issubclass(store_class, stores.LogStore), store_class)
+            self.assertEqual(store_class.__abstractmethods__, frozenset(), store_class)
+
+    def test_a_store_without_a_method_is_refused(self):
+        class Incomplete(stores.LogStore):
+            def get_version(self):
+                return 0
+
+        with self.assertRaises(TypeError):
+            stores.LogStore("work_log.csv")
+        with self.assertRaises(TypeError):
+            Incomplete("work_log.csv")
+
+
+if __name__ == "__main__":
+    unittest.main()
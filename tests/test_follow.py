@@ -0,0 +1,101 @@
+"""
+A store that has read its log catches up with what other stores append to the log and its journal by reading only
+that, its indexes answer as those of a store that reads the log afresh, anything but an append loads the log again,
+and a LogFollower catches up in the background
+
+Run from the repository root:  python -m pytest tests  (or python -m unittest discover tests)
+
+"""
+import os
+import re
+import sys
+import tempfile
+import time
+import unittest
+from unittest import mock
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from worklog import core, stores
+
+ROWS = [["{:02d}/03/2016".format(day % 28 + 1), "deploy task {}".format(day), str(day % 50 + 1),
+         "notes {}".format(day % 7)] for day in range(200)]
+
+
+def answers(log):
+    """
+    :param log: TaskStore
+    :return: list ... what the log answers to a search of each kind, as rows with their ids
+    """
+    def rows(tasks):
+        return sorted(core.task_to_row(task, with_id=True) for task in tasks)
+
+    return [rows(log.get_tasks()), rows(log.find_by_date_range("05/03/2016", "09/03/2016")),
+            rows(log.find_by_time_spent(10, 20)), rows(log.find_by_words("deploy notes 3")),
+            rows(log.find_by_substring("SK 19")), rows(log.find_by_pattern(re.compile(r"task \d5$"))),
+            log.get_dates_with_tasks(), log.time_spent_percentile(50)]
+
+
+class TestFollow(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.log_file_name = os.path.join(self.directory.name, "work_log.csv")
+        stores.TaskStore(self.log_file_name).append_rows([core.normalize_row(row) for row in ROWS])
+        self.log = stores.TaskStore(self.log_file_name)
+        answers(self.log)  # loads the log and builds the indexes
+        self.writer = stores.TaskStore(self.log_file_name)
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def test_appends_and_journal_records_are_read_in_place(self):
+        self.writer.append_rows([core.normalize_row(["30/03/2016", "deploy task 195", "15", "notes 3"]),
+                                 core.normalize_row(["01/04/2016", "new task 19", "99", ""])])
+        self.writer.replace_task(self.writer.get_task_by_id(6), core.Task("edited task 15", 12, "", "07/03/2016"))
+        self.writer.delete_task(self.writer.get_task_by_id(8))
+        with mock.patch.object(self.log, "load", side_effect=AssertionError("loaded again")):
+            found = answers(self.log)
+        self.assertEqual(found, answers(stores.TaskStore(self.log_file_name)))
+        self.assertIn("01/04/2016", found[-2])
+
+    def test_other_changes_load_the_log_again(self):
+        def rewrite():
+            self.writer.write_rows([core.normalize_row(row) for row in ROWS[:100]])
+
+        def replace_with_the_same_size():
+            with open(self.log_file_name, "rb") as f:
+                contents = f.read()
+            with open(self.log_file_name + ".new", "wb") as f:
+                f.write(contents.replace(b"deploy task 1,", b"deploy task X,"))
+            os.replace(self.log_file_name + ".new", self.log_file_name)
+
+        def truncate():
+            with open(self.log_file_name, "r+b") as f:
+                row_ends = [match.end() for match in re.finditer(b"\r\n", f.read())]
+                f.truncate(row_ends[len(row_ends) // 2])
+
+        for change in (rewrite, replace_with_the_same_size, truncate):
+            with mock.patch.object(self.log, "load", wraps=self.log.load) as load:
+                change()
+                self.assertEqual(answers(self.log), answers(stores.TaskStore(self.log_file_name)),
+                                 change.__name__)
+                self.assertEqual(load.call_count, 1, change.__name__)
+
+    def test_follower_catches_up_in_the_background(self):
+        for inotify in (True, False):
+            follower = stores.LogFollower(self.log, poll_interval=0.05)
+            with mock.patch.object(stores, "open_inotify", wraps=stores.open_inotify if inotify else lambda d: None):
+                follower.start()
+            try:
+                self.writer.append(["02/04/2016", "followed {}".format(inotify), "5", ""])
+                deadline = time.monotonic() + 10
+                while self.log.table.get_description(len(self.log.table) - 1) != "followed {}".format(inotify):
+                    self.assertLess(time.monotonic(), deadline, "not followed")
+                    time.sleep(0.01)
+                self.assertGreater(follower.refreshes, 0)
+            finally:
+                follower.stop()
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,84 @@
+"""
+Every task gets an id of its own when it is appended, found by it as a scan of the log would and kept by edits, in
+every kind of log. Appends know the ids taken from the sidecar without loading the log, and a log written before
+tasks had ids is only given them by the migrate command.
+
+Run from the repository root:  python -m pytest tests  (or python -m unittest discover tests)
+
+"""
+import csv
+import os
+import sys
+import tempfile
+import unittest
+from unittest import mock
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from worklog import core, stores
+
+ROWS = [["{:02d}/{:02d}/2015".format(day, month), "task {} {}".format(month, day), str(day), ""]
+        for month in (1, 6, 12) for day in (1, 15)] + [["01/02/2016", "recent", "5", ""]]
+
+
+class TestIds(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.log_file_name = os.path.join(self.directory.name, "work_log.csv")
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def rows_in_log(self):
+        with open(self.log_file_name, newline="") as f:
+            return list(csv.reader(f))
+
+    def test_ids_find_and_keep_tasks_as_a_scan(self):
+        for file_name in ("work_log.csv", "work_log.sqlite", "work_log.months", "archived.csv"):
+            file_name = os.path.join(self.directory.name, file_name)
+            stores.make_store(file_name).append_rows([core.normalize_row(row) for row in ROWS])
+            if file_name.endswith("archived.csv"):
+                stores.archive_log(file_name, "01/01/2016")
+            log = stores.make_store(file_name)
+            tasks = log.get_tasks()
+            self.assertEqual(len({task.task_id for task in tasks}), len(ROWS), file_name)
+            for task in tasks:
+                self.assertEqual(core.task_to_row(log.get_task_by_id(task.task_id), with_id=True),
+                                 core.task_to_row(task, with_id=True), file_name)
+            edited_task = tasks[2]
+            log.replace_task(edited_task, core.Task("edited", 5, "", edited_task.task_date))
+            self.assertEqual(stores.make_store(file_name).get_task_by_id(edited_task.task_id).description, "edited",
+                             file_name)
+            self.assertIsNone(log.get_task_by_id(10 ** 9), file_name)
+
+    def test_appends_do_not_load_the_log(self):
+        stores.TaskStore(self.log_file_name).append_rows([core.normalize_row(row) for row in ROWS])
+        with mock.patch.object(stores.TaskStore, "load", side_effect=AssertionError("loaded")):
+            stores.TaskStore(self.log_file_name).append(["02/02/2016", "appended", "5", ""])
+            stores.TaskStore(self.log_file_name).append(["03/02/2016", "appended again", "5", ""])
+        self.assertEqual([row[4] for row in self.rows_in_log()], [str(task_id) for task_id in range(1, len(ROWS) + 3)])
+
+    def test_appends_after_another_writer_load_the_log(self):
+        stores.TaskStore(self.log_file_name).append_rows([core.normalize_row(row) for row in ROWS])
+        with open(self.log_file_name, "a", newline="") as f:  # a writer that doesn't keep the sidecar
+            csv.writer(f).writerow(["02/02/2016", "by hand", "5", "", "50"])
+        stores.TaskStore(self.log_file_name).append(["03/02/2016", "appended", "5", ""])
+        self.assertEqual(self.rows_in_log()[-1], ["03/02/2016", "appended", "5", "", "51"])
+
+    def test_a_log_without_ids_is_given_them_by_migrate(self):
+        with open(self.log_file_name, "w", newline="") as f:
+            csv.writer(f).writerows(ROWS)
+        with open(self.log_file_name, "rb") as f:
+            contents = f.read()
+        log = stores.TaskStore(self.log_file_name)
+        self.assertEqual([core.task_to_row(task) for task in log.get_tasks()], ROWS)
+        self.assertEqual([task.task_id for task in log.get_tasks()], [None] * len(ROWS))
+        with open(self.log_file_name, "rb") as f:
+            self.assertEqual(f.read(), contents)  # reading leaves it as it was
+        self.assertEqual(stores.migrate_log(self.log_file_name), len(ROWS))
+        self.assertEqual(self.rows_in_log(), [row + [str(task_id)] for task_id, row in enumerate(ROWS, 1)])
+        self.assertEqual(log.get_task_by_id(3).description, ROWS[2][1])
+
+
+if __name__ == "__main__":
+    unittest.main()
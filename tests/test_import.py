@@ -0,0 +1,73 @@
+"""
+Importing reports each bad line and goes on with the rest, whatever the size of the batches, and the imported tasks get
+new ids, even rows exported with theirs
+
+Run from the repository root:  python -m pytest tests  (or python -m unittest discover tests)
+
+"""
+import csv
+import os
+import subprocess
+import sys
+import tempfile
+import unittest
+
+REPOSITORY = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+SCRIPT = [sys.executable, "-m", "worklog"]  # run with the repository in PYTHONPATH
+
+JSON_LINES = """{"date": "01/02/2016", "description": "first", "minutes": 5}
+{not json
+[1, 2]
+"a string"
+{"date": "02/02/2016", "description": "negative", "minutes": -5}
+{"date": "03/02/2016", "description": "second", "minutes": "7", "notes": "n"}
+{"date": "31/02/2016", "description": "no such day", "minutes": 1}
+
+{"task_date": "04/02/2016", "description": "third", "time_spent": 8}
+"""
+CSV_ROWS = """01/02/2016,first,5,
+02/02/2016,negative,-1,
+03/02/2016,not minutes,x,
+03/02/2016,signed,+3,
+04/02/2016,too few fields
+05/02/2016,second,6,"notes
+on two lines"
+06/02/2016,with an id,4,,7
+07/02/2016,too many fields,4,,7,8
+"""
+
+
+class TestImport(unittest.TestCase):
+    def import_lines(self, lines, *options):
+        """
+        Imports into a new log
+        :return: (integer, string, [[string]]) ... exit status, standard error and the rows of the log
+        """
+        with tempfile.TemporaryDirectory() as directory:
+            result = subprocess.run(SCRIPT + ["import"] + list(options), input=lines, cwd=directory,
+                                    capture_output=True, text=True, env=dict(os.environ, PYTHONPATH=REPOSITORY))
+            log_file_name = os.path.join(directory, "work_log_developing.csv")
+            with open(log_file_name, newline="") as f:
+                return result.returncode, result.stderr, list(csv.reader(f))
+
+    def test_bad_json_lines_are_rejected(self):
+        for batch_size in ("1", "2", "3", "1000"):
+            status, errors, rows = self.import_lines(JSON_LINES, "--format", "jsonl", "--batch-size", batch_size)
+            self.assertEqual(status, 1)
+            self.assertNotIn("Traceback", errors)
+            self.assertEqual([row[1] for row in rows], ["first", "second", "third"])
+            self.assertIn("3 tasks imported, 5 rejected", errors)
+            for line_number in (2, 3, 4, 5, 7):
+                self.assertIn("line {}:".format(line_number), errors)
+
+    def test_minutes_as_add_takes_them(self):
+        status, errors, rows = self.import_lines(CSV_ROWS, "--batch-size", "2")
+        self.assertEqual(status, 1)
+        self.assertEqual(rows, [["01/02/2016", "first", "5", "", "1"],
+                                ["05/02/2016", "second", "6", "notes\non two lines", "2"],
+                                ["06/02/2016", "with an id", "4", "", "3"]])
+        self.assertIn("3 tasks imported, 5 rejected", errors)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,147 @@
+"""
+Edits and deletes are appended to a journal, replayed when the log is loaded and folded back into the log later. A
+record only applies to the task it was written for, not to another one with the same fields that has taken its row
+since, and journals written before tasks had ids are still replayed.
+
+Run from the repository root:  python -m pytest tests  (or python -m unittest discover tests)
+
+"""
+import csv
+import os
+import shutil
+import sys
+import tempfile
+import unittest
+from unittest import mock
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from worklog import core, stores
+
+ROWS = [["{:02d}/03/2016".format(day), "task {}".format(day), str(day * 5), "notes of {}".format(day)]
+        for day in range(1, 21)]
+
+
+class TestJournal(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.log_file_name = os.path.join(self.directory.name, "work_log.csv")
+        with open(self.log_file_name, "w", newline="") as f:
+            csv.writer(f).writerows(ROWS)
+        self.store = stores.TaskStore(self.log_file_name)
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def rows_in_log(self):
+        """
+        :return: [[string]] ... the rows of the log file without their ids, which are checked apart by check_ids
+        """
+        with open(self.log_file_name, newline="") as f:
+            return [row[:4] for row in csv.reader(f)]
+
+    def check_ids(self):
+        """
+        Checks that every task of a log written again has an id of its own
+        """
+        with open(self.log_file_name, newline="") as f:
+            ids = [row[4] for row in csv.reader(f)]
+        self.assertEqual(len(set(ids)), len(ids))
+        self.assertTrue(all(task_id.isdigit() for task_id in ids))
+
+    def rows_of(self, store):
+        return [core.task_to_row(task) for task in store.get_tasks()]
+
+    def edit_and_delete(self):
+        """
+        :return: [[string]] ... the rows expected afterwards, worked out on the plain list of rows
+        """
+        tasks = list(self.store.get_tasks())
+        self.store.replace_task(tasks[3], core.task_from_row(["04/03/2016", "edited", "7", "new notes"]))
+        self.store.delete_task(tasks[10])
+        self.store.delete_task(tasks[0])
+        expected = [list(row) for row in ROWS]
+        expected[3] = ["04/03/2016", "edited", "7", "new notes"]
+        del expected[10]
+        del expected[0]
+        return expected
+
+    def test_changes_are_replayed_from_the_journal(self):
+        expected = self.edit_and_delete()
+        self.assertEqual(self.rows_in_log(), ROWS)
+        self.assertTrue(os.path.exists(self.store.journal_file_name))
+        self.assertEqual(self.rows_of(self.store), expected)
+        self.assertEqual(self.rows_of(stores.TaskStore(self.log_file_name)), expected)
+
+    def test_journal_is_folded_into_the_log(self):
+        with mock.patch.object(stores, "JOURNAL_COMPACTION_SIZE", 1):
+            expected = self.edit_and_delete()
+        self.store.compaction.join()
+        self.assertEqual(self.rows_in_log(), expected)
+        self.check_ids()
+        self.assertFalse(os.path.exists(self.store.journal_file_name))
+        self.assertEqual(self.rows_of(stores.TaskStore(self.log_file_name)), expected)
+
+    def test_records_not_matching_the_log_are_skipped(self):
+        with open(self.store.journal_file_name, "w", newline="") as f:
+            writer = csv.writer(f)
+            writer.writerow(["D", "1", core.row_fingerprint(ROWS[0])])  # the row has changed since
+            writer.writerow(["D", "99", core.row_fingerprint(ROWS[0])])  # past the end of the log
+            writer.writerow(["E", "2"])  # cut short by a crash
+            writer.writerow(["D", "0", core.row_fingerprint(ROWS[0])])
+        self.assertEqual(self.rows_of(self.store), ROWS[1:])
+
+    def test_without_the_journal_the_log_is_rewritten(self):
+        with mock.patch.object(stores, "USE_JOURNAL", False):
+            expected = self.edit_and_delete()
+        # without the journal the edited task goes to the end
+        expected.append(expected.pop(2))
+        self.assertEqual(self.rows_in_log(), expected)
+        self.check_ids()
+        self.assertEqual(self.rows_of(self.store), expected)
+        self.assertFalse(os.path.exists(self.store.journal_file_name))
+
+    def test_failed_journal_write_keeps_the_tasks(self):
+        tasks = list(self.store.get_tasks())
+        with mock.patch.object(self.store, "append_to_journal", side_effect=OSError("disk full")):
+            with self.assertRaises(OSError):
+                self.store.replace_task(tasks[3], core.task_from_row(["04/03/2016", "edited", "7", ""]))
+            with self.assertRaises(OSError):
+                self.store.delete_task(tasks[5])
+        self.assertEqual(self.rows_of(self.store), ROWS)
+        found_tasks = self.store.find_by_date_range("04/03/2016", "06/03/2016")
+        self.assertEqual([core.task_to_row(task) for task in found_tasks], ROWS[3:6])
+
+
+class TestJournalIds(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.log = stores.TaskStore(os.path.join(self.directory.name, "work_log.csv"))
+        self.log.append_rows([core.normalize_row(row) for row in (["01/02/2016", "same", "5", ""],
+                                                                  ["01/02/2016", "same", "5", ""],
+                                                                  ["02/02/2016", "other", "10", ""])])
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def ids_on_disk(self):
+        return [task.task_id for task in stores.TaskStore(self.log.file_name).get_tasks()]
+
+    def test_left_over_record_skips_an_equal_task(self):
+        self.log.delete_task(self.log.get_task_by_id(1))
+        journal_file_name = self.log.journal_file_name
+        shutil.copy(journal_file_name, journal_file_name + ".kept")
+        self.log.compact()  # the second task now is on the first row, where the record points
+        self.assertFalse(os.path.exists(journal_file_name))
+        os.replace(journal_file_name + ".kept", journal_file_name)  # as if a crash had left it behind
+        self.assertEqual(self.ids_on_disk(), [2, 3])
+
+    def test_records_without_ids_are_replayed(self):
+        self.log.get_tasks()
+        with open(self.log.journal_file_name, "w", newline="") as f:
+            f.write("D,2,{}\r\n".format(core.row_fingerprint(self.log.table.get_row(2), with_id=False)))
+        self.assertEqual(self.ids_on_disk(), [1, 2])
+
+
+if __name__ == '__main__':
+    unittest.main()
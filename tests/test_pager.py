@@ -0,0 +1,113 @@
+"""
+Search results are paged as the list they come from, a generator is only pulled as far as the pages shown and keeps
+PAGES_KEPT pages at most, and going through many pages or answers in the menu doesn't build up stack depth
+
+Run from the repository root:  python -m pytest tests  (or python -m unittest discover tests)
+
+"""
+import io
+import os
+import sys
+import unittest
+from unittest import mock
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from worklog import core, cli
+
+TASKS = [core.Task("task {}".format(number), number % 60 + 1, "", core.ordinal_to_date(735000 + number // 7))
+         for number in range(2000)]
+
+
+class Pulled():
+    def __init__(self, tasks):
+        """
+        A generator of tasks that counts how many were pulled from it
+
+        :param tasks: [Task]
+        """
+        self.tasks = tasks
+        self.pulled = 0
+
+    def __iter__(self):
+        for task in self.tasks:
+            self.pulled += 1
+            yield task
+
+
+class TestTaskPager(unittest.TestCase):
+    def test_pages_as_the_list(self):
+        for tasks in (TASKS[:95], TASKS[:100], []):
+            for source in (tasks, iter(tasks)):
+                pager = cli.TaskPager(source, 10)
+                for page_number in range(len(tasks) // 10 + 2):
+                    self.assertEqual(pager.get_page(page_number),
+                                     list(enumerate(tasks))[page_number * 10:(page_number + 1) * 10])
+                self.assertEqual(pager.total, len(tasks))
+
+    def test_generators_are_pulled_a_page_at_a_time(self):
+        source = Pulled(TASKS)
+        pager = cli.TaskPager(source, 10)
+        self.assertEqual(pager.get_task(0), TASKS[0])
+        self.assertEqual(source.pulled, 10)
+        self.assertIsNone(pager.total)
+        self.assertEqual(pager.get_task(15), TASKS[15])
+        self.assertEqual(source.pulled, 20)
+
+    def test_only_the_last_pages_are_kept(self):
+        pager = cli.TaskPager(Pulled(TASKS), 10)
+        with mock.patch.object(cli, "PAGES_KEPT", 5):
+            for page_number in range(len(TASKS) // 10):
+                self.assertEqual(pager.get_page(page_number)[0], (page_number * 10, TASKS[page_number * 10]))
+                self.assertLessEqual(len(pager.tasks), 5 * 10)
+        self.assertIsNone(pager.get_task(0))
+        self.assertEqual(pager.get_page(len(TASKS) // 10 - 5), list(enumerate(TASKS))[-50:-40])
+        self.assertIsNone(pager.get_task(len(TASKS)))
+        self.assertEqual(pager.total, len(TASKS))
+
+    def test_find_date(self):
+        pager = cli.TaskPager(Pulled(TASKS), 10)
+        self.assertEqual(pager.find_date(735000 + 100), 700)
+        self.assertEqual(pager.get_task(700).task_date, core.ordinal_to_date(735100))
+        self.assertIsNone(pager.find_date(735000 - 1))
+
+
+class TestMenus(unittest.TestCase):
+    def answer(self, answers, function, *args):
+        """
+        Runs a function of the menu with its input answered, and its output thrown away
+        :param answers: [string] ... answers to input, in order
+        :param function: function
+        :return: what the function returned
+        """
+        with mock.patch("builtins.input", side_effect=answers), mock.patch("sys.stdout", new_callable=io.StringIO), \
+                mock.patch.object(core.Task, "show_task"):
+            return function(*args)
+
+    def test_show_tasks_goes_through_many_pages(self):
+        pages = sys.getrecursionlimit() + 10
+        answers = ["n"] * pages + ["p", "g 25", "x", "s {}".format((pages - 1) * 10 + 3)]
+        self.assertIs(self.answer(answers, cli.show_tasks, Pulled(TASKS * 10), "", 10),
+                      (TASKS * 10)[(pages - 1) * 10 + 2])
+        self.assertIsNone(self.answer(["s 0", "p", "n", "b"], cli.show_tasks, TASKS[:10], "", 10))
+
+    def test_show_tasks_after_a_jump_past_the_kept_pages(self):
+        for jump in ("d 03/03/2013", "g 20001"):  # neither is found, all the tasks are pulled looking for them
+            self.assertIs(self.answer([jump, "s 20000"], cli.show_tasks, Pulled(TASKS * 10), "", 10), TASKS[-1],
+                          jump)
+
+    def test_show_tasks_jumps_to_a_date(self):
+        date = core.ordinal_to_date(735000 + 100)
+        self.assertIs(self.answer(["d {}".format(date), "s 701"], cli.show_tasks, TASKS, "", 10), TASKS[700])
+
+    def test_inputs_ask_again_without_recursion(self):
+        wrong_answers = ["wrong"] * (sys.getrecursionlimit() + 10)
+        self.assertEqual(self.answer(wrong_answers + ["25"], cli.input_time_spent, ""), 25)
+        self.assertEqual(self.answer(wrong_answers + ["2"], cli.input_date_to_search, "", 3), 2)
+        with mock.patch.object(cli, "clear_screen"):
+            self.assertEqual(self.answer(wrong_answers + ["a"], cli.ask_for_choice, "", {"a": "add"}), "a")
+        self.assertEqual(self.answer(["first", "second", ""], cli.input_task_notes, ""), "first\nsecond\n")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,75 @@
+"""
+Searches by pattern give the same tasks whether the log is scanned in parallel or in this process
+
+Run from the repository root:  python -m pytest tests  (or python -m unittest discover tests)
+
+"""
+import csv
+import os
+import random
+import re
+import sys
+import tempfile
+import unittest
+from unittest import mock
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from worklog import core, stores
+
+WORDS = ["deploy", "review", "meeting", "bug", "fix", "café", "notes, with a comma", "line\nbreak", "\"quoted\""]
+PATTERNS = ["bug", "^fix", r"caf\w", "comma$", "line\nbreak", "(?i)MEETING", "nothing like this"]
+
+
+def make_rows(count, seed):
+    """
+    :param count: integer
+    :param seed: integer
+    :return: [[string]] ... rows of a log with random words in the description and notes
+    """
+    generator = random.Random(seed)
+    return [["{:02d}/05/2016".format(generator.randint(1, 31)), " ".join(generator.sample(WORDS, 3)),
+             str(generator.randint(1, 120)), generator.choice(["", " ".join(generator.sample(WORDS, 2))])]
+            for _ in range(count)]
+
+
+class TestParallelScan(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.log_file_name = os.path.join(self.directory.name, "work_log.csv")
+        with open(self.log_file_name, "w", newline="") as f:
+            csv.writer(f).writerows(make_rows(3000, 1))
+        self.store = stores.TaskStore(self.log_file_name)
+        tasks = list(self.store.get_tasks())
+        self.store.replace_task(tasks[7], core.task_from_row(["07/05/2016", "edited bug", "5", ""]))
+        self.store.delete_task(tasks[11])
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def find_by_pattern(self, pattern, cpus):
+        """
+        :param pattern: string
+        :param cpus: integer ... CPUs the machine seems to have
+        :return: [[string]] ... rows of the tasks found
+        """
+        with mock.patch.object(stores, "PARALLEL_SCAN_SIZE", 0), \
+                mock.patch.object(stores, "PARALLEL_SCAN_CHUNK_SIZE", 4096), \
+                mock.patch.object(os, "cpu_count", return_value=cpus):
+            return [core.task_to_row(task) for task in self.store.find_by_pattern(re.compile(pattern))]
+
+    def test_parallel_and_serial_scans_agree(self):
+        rows = [core.task_to_row(task) for task in self.store.get_tasks()]
+        for pattern in PATTERNS:
+            compiled_pattern = re.compile(pattern)
+            expected = [row for row in rows if compiled_pattern.search(row[1]) or compiled_pattern.search(row[3])]
+            self.assertEqual(self.find_by_pattern(pattern, 4), expected, pattern)
+            self.assertEqual(self.find_by_pattern(pattern, 1), expected, pattern)
+
+    def test_single_cpu_scans_in_process(self):
+        with mock.patch.object(stores, "scan_log_in_parallel", side_effect=AssertionError("parallel scan")):
+            self.assertTrue(self.find_by_pattern("bug", 1))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,64 @@
+"""
+Moving a task of a partitioned log to another month keeps it, and its id, even if the move fails halfway
+
+Run from the repository root:  python -m pytest tests  (or python -m unittest discover tests)
+
+"""
+import os
+import sys
+import tempfile
+import unittest
+from unittest import mock
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from worklog import core, stores
+
+
+class TestMoves(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.log = stores.PartitionedStore(os.path.join(self.directory.name, "work_log.months"))
+        self.log.append_rows([core.normalize_row(row) for row in (["01/02/2016", "first", "5", ""],
+                                                                  ["02/02/2016", "second", "10", ""])])
+        self.task = self.log.find_by_phrase("first")[0]
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def descriptions_by_month(self):
+        log = stores.PartitionedStore(self.log.file_name)
+        return {month: [task.description for task in partition.get_tasks()] for month, partition in
+                log.get_partitions()}, {month: entry[2] for month, entry in log.refresh_manifest().items()}
+
+    def test_move_keeps_the_id(self):
+        self.log.replace_task(self.task, core.Task("moved", 5, "", "03/04/2016"))
+        tasks, rows = self.descriptions_by_month()
+        self.assertEqual(tasks, {"2016-02": ["second"], "2016-04": ["moved"]})
+        self.assertEqual(rows, {"2016-02": 1, "2016-04": 1})
+        moved_task = self.log.get_task_by_id(self.task.task_id)
+        self.assertEqual((moved_task.description, moved_task.task_date), ("moved", "03/04/2016"))
+        self.assertEqual([task.description for task in self.log.find_by_date_range("01/04/2016", "30/04/2016")],
+                         ["moved"])
+
+    def test_failed_move_loses_nothing(self):
+        with mock.patch.object(stores.TaskStore, "delete_task", side_effect=OSError("crashed")):
+            with self.assertRaises(OSError):
+                self.log.replace_task(self.task, core.Task("moved", 5, "", "03/04/2016"))
+        tasks, rows = self.descriptions_by_month()
+        self.assertEqual(tasks, {"2016-02": ["first", "second"], "2016-04": ["moved"]})
+        copies = [task for task in stores.PartitionedStore(self.log.file_name).get_tasks()
+                  if task.task_id == self.task.task_id]
+        self.assertEqual(len(copies), 2)
+
+    def test_move_of_a_deleted_task_is_refused(self):
+        self.log.delete_task(self.task)
+        with self.assertRaises(ValueError):
+            self.log.replace_task(self.task, core.Task("moved", 5, "", "03/04/2016"))
+        tasks, rows = self.descriptions_by_month()
+        self.assertEqual(tasks, {"2016-02": ["second"]})
+        self.assertEqual(rows, {"2016-02": 1})
+
+
+if __name__ == "__main__":
+    unittest.main()
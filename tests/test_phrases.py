@@ -0,0 +1,73 @@
+"""
+Searches by exact words find a phrase only as whole words
+
+Run from the repository root:  python -m pytest tests  (or python -m unittest discover tests)
+
+"""
+import os
+import sys
+import tempfile
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from worklog import core, stores, api
+
+TASKS = [
+    ["01/02/2015", "deploy the app", "30", ""],
+    ["02/02/2015", "the apple app", "20", ""],
+    ["03/02/2016", "review", "10", "bathe app icons"],
+    ["04/02/2016", "write notes", "5", "about the app."],
+    ["05/02/2016", "fix C++ build", "15", ""],
+    ["06/02/2016", "fix C++ builds", "15", "The App"],
+]
+PHRASES = {  # phrase: descriptions of the tasks that have it, in order
+    "the app": ["deploy the app", "write notes"], "app": ["deploy the app", "review", "the apple app", "write notes"],
+    "C++ build": ["fix C++ build"], "C++": ["fix C++ build", "fix C++ builds"], "++ b": [], "App": ["fix C++ builds"],
+}
+
+
+class TestPhraseSearches(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def make_logs(self):
+        """
+        :return: [LogStore] ... a log of each kind with TASKS
+        """
+        logs = []
+        for file_name in ("work_log.csv", "work_log.sqlite", "work_log.months", "archived.csv"):
+            file_name = os.path.join(self.directory.name, file_name)
+            stores.make_store(file_name).append_rows([core.normalize_row(task) for task in TASKS])
+            if file_name.endswith("archived.csv"):
+                stores.archive_log(file_name, "01/01/2016")
+            logs.append(stores.make_store(file_name))
+        return logs
+
+    def test_whole_words_only(self):
+        for log in self.make_logs():
+            for phrase, descriptions in PHRASES.items():
+                message = "{} in {}".format(phrase, log.file_name)
+                self.assertEqual(sorted(task.description for task in log.find_by_phrase(phrase)), descriptions,
+                                 message)
+                self.assertEqual(sorted(task.description for task in api.query(text=phrase, log=log)),
+                                 descriptions, message)
+
+    def test_index_follows_changes(self):
+        for log in self.make_logs():
+            log.find_by_phrase("app")
+            tasks = list(log.get_tasks())
+            log.replace_task(tasks[0], core.task_from_row(["01/02/2015", "deploy the apple", "30", ""]))
+            log.delete_task(tasks[3])
+            log.append_rows([["07/02/2016", "app review", "10", "the app"]])
+            self.assertEqual([task.description for task in log.find_by_phrase("the app")], ["app review"],
+                             log.file_name)
+            self.assertEqual([task.description for task in log.find_by_phrase("app")],
+                             ["the apple app", "review", "app review"], log.file_name)
+
+
+if __name__ == "__main__":
+    unittest.main()
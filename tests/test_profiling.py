@@ -0,0 +1,86 @@
+"""
+Profiling prints a summary of the command without changing what it does, and saves cProfile stats when asked to. The
+functions marked as profiled are measured by their qualified name while profiling, and only then.
+
+Run from the repository root:  python -m pytest tests  (or python -m unittest discover tests)
+
+"""
+import csv
+import os
+import pstats
+import subprocess
+import sys
+import tempfile
+import unittest
+from unittest import mock
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from worklog import core, stores, cli
+
+REPOSITORY = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+SCRIPT = [sys.executable, "-m", "worklog"]  # run with the repository in PYTHONPATH
+
+TASKS = [["{:02d}/02/2016".format(day), "deploy the app" if day % 2 else "review", str(day), ""]
+         for day in range(1, 21)]
+
+
+class TestProfiling(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        with open(os.path.join(self.directory.name, "work_log_developing.csv"), "w", newline="") as f:
+            csv.writer(f).writerows(TASKS)
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def run_script(self, *arguments, **environment):
+        """
+        :param arguments: strings ... for the script
+        :param environment: strings ... variables to set
+        :return: subprocess.CompletedProcess
+        """
+        environment = dict({name: value for name, value in os.environ.items() if name != "WORKLOG_PROFILE"},
+                           PYTHONPATH=REPOSITORY, **environment)
+        result = subprocess.run(SCRIPT + list(arguments), cwd=self.directory.name, input="",
+                                capture_output=True, text=True, env=environment)
+        self.assertEqual(result.returncode, 0, result.stderr)
+        return result
+
+    def test_profile_changes_nothing_but_the_summary(self):
+        plain = self.run_script("search", "--text", "deploy")
+        self.assertEqual(plain.stderr, "")
+        for profiled in (self.run_script("--profile", "search", "--text", "deploy"),
+                         self.run_script("search", "--text", "deploy", WORKLOG_PROFILE="1")):
+            self.assertEqual(profiled.stdout, plain.stdout)
+            self.assertIn("worklog profile", profiled.stderr)
+            self.assertIn("batch_search", profiled.stderr)
+            self.assertIn("tasks kept in memory", profiled.stderr)
+
+    def test_profile_dump(self):
+        dump_file_name = os.path.join(self.directory.name, "search.prof")
+        profiled = self.run_script("--profile-dump", dump_file_name, "search", "--minutes", "5", "10")
+        self.assertEqual(len(profiled.stdout.splitlines()), 6)
+        self.assertIn("cProfile stats saved to", profiled.stderr)
+        stats = pstats.Stats(dump_file_name)
+        self.assertTrue(any(function[2] == "batch_search" for function in stats.stats))
+
+
+class TestProfiled(unittest.TestCase):
+    def test_phases_by_qualified_name(self):
+        with tempfile.TemporaryDirectory() as directory:
+            log_file_name = os.path.join(directory, "work_log.csv")
+            stores.TaskStore(log_file_name).append_rows([core.normalize_row(task) for task in TASKS])
+            self.assertEqual(len(stores.TaskStore(log_file_name).find_by_words("deploy")), 10)  # not measured
+            profiler = core.Profiler()
+            with mock.patch.object(core, "PROFILER", profiler), mock.patch("builtins.input", return_value="y"):
+                self.assertEqual(len(stores.TaskStore(log_file_name).find_by_words("deploy")), 10)
+                self.assertEqual(cli.ask("? "), "y")
+        self.assertEqual(profiler.phases["TaskStore.find_by_words"]["TaskStore.find_by_words"], [1, mock.ANY, 10])
+        self.assertIn("WordIndex", profiler.phases["TaskStore.find_by_words"])
+        self.assertEqual(profiler.phases["ask"]["ask"][0], 1)
+        self.assertEqual(sorted(profiler.phases), ["TaskStore.find_by_words", "ask"])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,150 @@
+"""
+The programmatic API and the query planner find the same tasks as a plain scan of the log, in every kind of log and
+whatever the order of the conditions, and importing the module starts nothing
+
+Run from the repository root:  python -m pytest tests  (or python -m unittest discover tests)
+
+"""
+import csv
+import itertools
+import os
+import random
+import re
+import subprocess
+import sys
+import tempfile
+import unittest
+from datetime import datetime
+from unittest import mock
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from worklog import core, stores, api
+
+WORDS = ["deploy", "review", "meeting", "bug", "fix", "deployment"]
+CONDITIONS = [
+    {}, {"date": "05/03/2016"}, {"date": ("01/03/2016", "10/03/2016")}, {"minutes": 30}, {"minutes": (10, 40)},
+    {"text": "deploy"}, {"pattern": "^fix"}, {"date": ("01/03/2016", "20/03/2016"), "minutes": (0, 30)},
+    {"date": ("01/03/2016", "31/03/2016"), "text": "bug", "pattern": "fix$", "minutes": (5, 60)},
+    {"contains": "PLOY"}, {"text": "deploy", "contains": "ment"},
+    {"date": ("01/03/2016", "20/03/2016"), "minutes": (5, 30), "text": "deploy", "contains": "LOY",
+     "pattern": "^[^f]"},
+]
+
+
+def make_rows(count, seed):
+    """
+    :param count: integer
+    :param seed: integer
+    :return: [[string]] ... rows with random dates, minutes and words
+    """
+    generator = random.Random(seed)
+    return [["{:02d}/03/2016".format(generator.randint(1, 31)), " ".join(generator.sample(WORDS, 2)),
+             str(generator.choice([5, 10, 30, 60])), generator.choice(["", " ".join(generator.sample(WORDS, 2))])]
+            for _ in range(count)]
+
+
+def meets(row, date=None, minutes=None, text=None, contains=None, pattern=None):
+    """
+    Checks the conditions of a query on a row, the plain way
+    :return: boolean
+    """
+    if date is not None:
+        first_date, last_date = (date, date) if isinstance(date, str) else date
+        if not (datetime.strptime(first_date, "%d/%m/%Y") <= datetime.strptime(row[0], "%d/%m/%Y") <=
+                datetime.strptime(last_date, "%d/%m/%Y")):
+            return False
+    if minutes is not None:
+        first_minutes, last_minutes = (minutes, minutes) if isinstance(minutes, int) else minutes
+        if not first_minutes <= int(row[2]) <= last_minutes:
+            return False
+    if text is not None and not re.search(r"\b{}\b".format(re.escape(text)), row[1] + "\n" + row[3]):
+        return False
+    if contains is not None and contains.lower() not in row[1].lower() and contains.lower() not in row[3].lower():
+        return False
+    if pattern is not None and not (re.search(pattern, row[1]) or re.search(pattern, row[3])):
+        return False
+    return True
+
+
+class TestQuery(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.log_file_name = os.path.join(self.directory.name, "work_log.csv")
+        self.rows = make_rows(400, 1)
+        with open(self.log_file_name, "w", newline="") as f:
+            csv.writer(f).writerows(self.rows)
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def test_queries_match_a_scan(self):
+        log = api.open_log(self.log_file_name)
+        self.assertIs(api.open_log(self.log_file_name), log)
+        for conditions in CONDITIONS:
+            expected = [row for row in self.rows if meets(row, **conditions)]
+            found_rows = [core.task_to_row(task) for task in api.query(log=log, **conditions)]
+            if list(conditions) == ["date"]:  # by date, and then in log order
+                expected.sort(key=lambda row: datetime.strptime(row[0], "%d/%m/%Y"))
+            self.assertEqual(found_rows, expected, conditions)
+
+    def test_every_kind_of_log_runs_queries_as_a_scan(self):
+        for file_name in ("work_log.sqlite", "work_log.months", "archived.csv"):
+            file_name = os.path.join(self.directory.name, file_name)
+            stores.make_store(file_name).append_rows([core.normalize_row(row) for row in self.rows])
+            if file_name.endswith("archived.csv"):
+                stores.archive_log(file_name, "15/03/2016")
+            log = stores.make_store(file_name)
+            for conditions in CONDITIONS:
+                plan = core.QueryPlan()
+                found_rows = [core.task_to_row(task) for task in log.run_query(core.Query(**conditions), plan)]
+                self.assertEqual(sorted(found_rows), sorted(row for row in self.rows if meets(row, **conditions)),
+                                 (file_name, conditions))
+                self.assertTrue(plan.explain(), (file_name, conditions))
+
+    def test_every_order_of_the_conditions_finds_the_same(self):
+        log = stores.TaskStore(self.log_file_name)
+        log.get_word_index()
+        log.get_trigram_index()
+        conditions = CONDITIONS[-1]
+        expected = [row for row in self.rows if meets(row, **conditions)]
+        self.assertTrue(expected)
+        for order in itertools.permutations(core.Query(**conditions).get_conditions()):
+            for intersect in (False, True):
+                def narrow_cost(condition, estimate, rows):
+                    return 0, intersect and estimate is not None  # intersecting needs an index
+
+                with mock.patch.object(stores, "order_conditions", return_value=list(order)), \
+                        mock.patch.object(stores, "narrow_cost", side_effect=narrow_cost):
+                    found_rows = [core.task_to_row(task) for task in log.run_query(core.Query(**conditions))]
+                self.assertEqual(found_rows, expected, (order, intersect))
+
+    def test_conditions_are_ordered_by_cost(self):
+        estimates = {"pattern": None, "minutes": (300, 150), "date": (5, 2.5), "text": (40, 160)}
+        self.assertEqual(core.order_conditions(estimates, 1000), ["date", "minutes", "text", "pattern"])
+        estimates["text"] = (1, 4)
+        self.assertEqual(core.order_conditions(estimates, 1000)[0], "text")
+        self.assertEqual(core.order_conditions({}, 1000), [])
+
+    def test_added_tasks_are_found(self):
+        log = api.open_log(self.log_file_name)
+        api.query(text="deploy", log=log)
+        api.add("deploy again", 45, notes="late", task_date="05/03/2016", log=log)
+        found_rows = [core.task_to_row(task) for task in api.query(date="05/03/2016", minutes=45, log=log)]
+        self.assertEqual(found_rows, [["05/03/2016", "deploy again", "45", "late"]])
+        with open(self.log_file_name, newline="") as f:
+            self.assertEqual(list(csv.reader(f))[-1], ["05/03/2016", "deploy again", "45", "late", "1"])
+
+    def test_import_starts_nothing(self):
+        check = ("import sys, worklog.core; core_modules = sorted(sys.modules); import worklog.api; "
+                 "print([name for name in core_modules if name.startswith('worklog.')], worklog.stores.TASK_STORE, "
+                 "[name for name in ('numpy', 'sqlite3', 'asyncio', 'worklog.server') if name in sys.modules])")
+        result = subprocess.run([sys.executable, "-c", check], cwd=self.directory.name, input="",
+                                capture_output=True, text=True,
+                                env=dict(os.environ, PYTHONPATH=os.path.dirname(os.path.dirname(core.__file__))))
+        self.assertEqual((result.returncode, result.stdout, result.stderr), (0, "['worklog.core'] None []\n", ""))
+        self.assertEqual(os.listdir(self.directory.name), ["work_log.csv"])
+
+
+if __name__ == "__main__":
+    unittest.main()
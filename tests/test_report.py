@@ -0,0 +1,118 @@
+"""
+Reports of the minutes spent by period give the figures that plain Python works out from the rows of the log
+
+Run from the repository root:  python -m pytest tests  (or python -m unittest discover tests)
+
+"""
+import collections
+import math
+import os
+import random
+import sys
+import tempfile
+import unittest
+from array import array
+from datetime import date, datetime
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from worklog import core, stores, api
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+PERCENTS = (0, 25, 50, 90, 100)
+
+
+def make_rows(count, seed):
+    """
+    :param count: integer
+    :param seed: integer
+    :return: [[string]] ... rows with random dates over a couple of years and random minutes
+    """
+    generator = random.Random(seed)
+    first_ordinal = date(2015, 12, 1).toordinal()
+    return [[date.fromordinal(first_ordinal + generator.randint(0, 800)).strftime("%d/%m/%Y"), "task",
+             str(generator.choice([0, 5, 30, generator.randint(1, 600)])), ""] for _ in range(count)]
+
+
+def plain_report(rows, period, first_date=None, last_date=None):
+    """
+    Works out a report the plain way, see make_time_report
+    :return: [[string, integer, integer, float, integer...]]
+    """
+    groups = collections.defaultdict(list)
+    for row in rows:
+        day = datetime.strptime(row[0], "%d/%m/%Y").date()
+        if first_date and day < datetime.strptime(first_date, "%d/%m/%Y").date():
+            continue
+        if last_date and day > datetime.strptime(last_date, "%d/%m/%Y").date():
+            continue
+        if period == "day":
+            key, label = day, day.strftime("%d/%m/%Y")
+        elif period == "week":
+            key = day.isocalendar()[:2]
+            label = "{}-W{:02d}".format(*key)
+        elif period == "month":
+            key, label = (day.year, day.month), day.strftime("%m/%Y")
+        else:
+            key, label = None, None
+        groups[key, label].append((day, int(row[2])))
+    report = []
+    for key, label in sorted(groups, key=lambda key_and_label: key_and_label[0] or 0):
+        days, minutes = zip(*groups[key, label])
+        minutes = sorted(minutes)
+        if label is None:
+            label = "{} - {}".format(first_date or min(days).strftime("%d/%m/%Y"),
+                                     last_date or max(days).strftime("%d/%m/%Y"))
+        report.append([label, len(minutes), sum(minutes), sum(minutes) / len(minutes)] +
+                      [minutes[max(math.ceil(percent * len(minutes) / 100) - 1, 0)] for percent in PERCENTS])
+    return report
+
+
+@unittest.skipIf(numpy is None, "reports need NumPy")
+class TestReport(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.rows = make_rows(3000, 1)
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def make_logs(self):
+        """
+        :return: [LogStore] ... a log of each kind with the rows
+        """
+        logs = []
+        for file_name in ("work_log.csv", "work_log.sqlite"):
+            log = stores.make_store(os.path.join(self.directory.name, file_name))
+            log.append_rows([core.normalize_row(row) for row in self.rows])
+            logs.append(log)
+        return logs
+
+    def test_reports_match_plain_python(self):
+        for log in self.make_logs():
+            for period in core.REPORT_PERIODS:
+                for first_date, last_date in ((None, None), ("15/03/2016", "20/08/2017"), ("01/01/2017", None)):
+                    message = "{} by {} from {} to {}".format(log.file_name, period, first_date, last_date)
+                    self.assertEqual(api.report(period, first_date, last_date, PERCENTS, log=log),
+                                     plain_report(self.rows, period, first_date, last_date), message)
+
+    def test_reports_follow_changes(self):
+        for log in self.make_logs():
+            self.assertIs(log.get_report("month", percents=PERCENTS), log.get_report("month", percents=PERCENTS))
+            log.append_rows([["03/01/2016", "appended", "7", ""]])
+            log.delete_task(log.get_tasks()[0])
+            rows = self.rows[1:] + [["03/01/2016", "appended", "7", ""]]
+            self.assertEqual(log.get_report("month", percents=PERCENTS), plain_report(rows, "month"), log.file_name)
+
+    def test_empty_and_unknown_periods(self):
+        self.assertEqual(core.make_time_report(array('i'), array('i'), "week"), [])
+        with self.assertRaises(ValueError):
+            core.make_time_report(array('i', [1]), array('i', [1]), "fortnight")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,62 @@
+"""
+Rewriting the log leaves either the old log or the new one, with its permissions, and nothing else behind
+
+Run from the repository root:  python -m pytest tests  (or python -m unittest discover tests)
+
+"""
+import csv
+import os
+import stat
+import sys
+import tempfile
+import unittest
+from unittest import mock
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from worklog import core, stores
+
+ROWS = [["01/02/2016", "task {}".format(i), str(i), "notes, {}".format(i) if i % 2 else ""] for i in range(1, 200)]
+
+
+class TestRewrite(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.log_file_name = os.path.join(self.directory.name, "work_log.csv")
+        with open(self.log_file_name, "w", newline="") as f:
+            csv.writer(f).writerows(ROWS)
+        os.chmod(self.log_file_name, 0o640)
+        self.store = stores.TaskStore(self.log_file_name)
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def rows_in_log(self):
+        with open(self.log_file_name, newline="") as f:
+            return list(csv.reader(f))
+
+    def test_rewrite_writes_every_task_once(self):
+        tasks = self.store.get_tasks()[10:]
+        with mock.patch.object(stores, "TASK_STORE", self.store):
+            stores.rewrite_log_file(tasks)
+        rows_with_ids = [row + [str(task_id)] for task_id, row in enumerate(ROWS[10:], 1)]  # given as it is written
+        self.assertEqual(self.rows_in_log(), rows_with_ids)
+        self.assertEqual([core.task_to_row(task, with_id=True) for task in self.store.get_tasks()], rows_with_ids)
+        self.assertEqual(stat.S_IMODE(os.stat(self.log_file_name).st_mode), 0o640)
+        # the sidecar keeps the last id given
+        self.assertEqual(sorted(os.listdir(self.directory.name)),
+                         ["work_log.csv", "work_log.csv.cache", "work_log.csv.lock"])
+
+    def test_failed_rewrite_keeps_the_old_log(self):
+        def rows():
+            yield ROWS[0]
+            raise OSError("disk full")
+
+        with self.assertRaises(OSError):
+            stores.write_log_rows_atomically(self.log_file_name, rows())
+        self.assertEqual(self.rows_in_log(), ROWS)
+        self.assertEqual(os.listdir(self.directory.name), ["work_log.csv"])
+
+
+if __name__ == "__main__":
+    unittest.main()
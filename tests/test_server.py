@@ -0,0 +1,154 @@
+"""
+The query server answers every endpoint as the log it serves would, refuses bad requests with an error that says why,
+and a RemoteStore sends a read again, but not a write, when the server was restarted
+
+Run from the repository root:  python -m pytest tests  (or python -m unittest discover tests)
+
+"""
+import http.client
+import json
+import os
+import re
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from worklog import core, stores, server
+
+REPOSITORY = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+SCRIPT = [sys.executable, "-m", "worklog"]  # run with the repository in PYTHONPATH
+
+TASKS = [
+    ["01/02/2016", "deploy the app", "30", ""],
+    ["02/02/2016", "review the deploy", "20", "app store"],
+    ["15/03/2016", "write notes", "5", "about the app"],
+    ["16/03/2016", "fix the build", "45", ""],
+]
+READS = {  # method: parameters, for every method in SERVER_READS
+    "get_version": {}, "get_time_columns": {}, "get_tasks": {}, "get_task": {"row_id": 1},
+    "get_task_by_id": {"task_id": 3}, "get_dates_with_tasks": {},
+    "find_by_date_range": {"first_date": "02/02/2016", "last_date": "15/03/2016"},
+    "find_by_time_spent": {"first_minutes": 10, "last_minutes": 30}, "time_spent_percentile": {"percent": 50},
+    "find_by_words": {"words": "deploy app"}, "find_by_phrase": {"phrase": "the app"},
+    "find_by_pattern": {"pattern": "DEPLOY", "flags": re.IGNORECASE}, "find_by_substring": {"text": "ppl"},
+    "find_fuzzy": {"text": "deplyo", "limit": 2},
+    "get_report": {"period": "month", "first_date": None, "last_date": None, "percents": [50]},
+    "run_query": {"query": core.Query(date=("01/02/2016", "15/03/2016"), text="the app", minutes=(None, 30),
+                                      pattern="^[dw]").to_json(), "explain": False},
+}
+
+
+class TestServer(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.log_file_name = os.path.join(self.directory.name, "work_log.csv")
+        stores.TaskStore(self.log_file_name).append_rows([core.normalize_row(task) for task in TASKS])
+        self.server = None
+        self.port = self.start_server(0)
+        self.remote = server.RemoteStore("http://127.0.0.1:{}".format(self.port))
+
+    def tearDown(self):
+        if self.remote.connection:
+            self.remote.connection.close()
+        self.stop_server()
+        self.directory.cleanup()
+
+    def start_server(self, port):
+        """
+        Serves the log from another process
+        :param port: integer ... 0 for any free port
+        :return: integer ... the port it listens on
+        """
+        self.server = subprocess.Popen(SCRIPT + ["serve", "--log", self.log_file_name, "--port", str(port)],
+                                       stderr=subprocess.PIPE, text=True, env=dict(os.environ, PYTHONPATH=REPOSITORY))
+        for line in self.server.stderr:
+            served = re.match(r"serving .* at http://[^:]+:(\d+)", line)
+            if served:
+                return int(served.group(1))
+        raise RuntimeError("the server didn't start")
+
+    def stop_server(self):
+        self.server.terminate()
+        self.server.wait()
+        self.server.stderr.close()
+
+    def local_call(self, method, parameters):
+        """
+        :return: what the method of a store of our own on the log returns, as the server would send it
+        """
+        return json.loads(json.dumps(server.call_served_store(stores.TaskStore(self.log_file_name), method,
+                                                              dict(parameters))))
+
+    def test_reads_answer_as_the_log(self):
+        self.assertEqual(set(READS), set(server.SERVER_READS))
+        for method, parameters in READS.items():
+            self.assertEqual(self.remote.call(method, **parameters), self.local_call(method, parameters), method)
+        self.assertEqual([task.description for task in self.remote.find_by_phrase("the app")],
+                         ["deploy the app", "write notes"])
+
+    def test_writes_reach_the_log(self):
+        self.assertEqual(set(server.SERVER_WRITES), {"append_rows", "write_rows", "replace_task", "delete_task"})
+        self.assertEqual(self.remote.append_rows([["17/03/2016", "appended", "10", ""]]), 1)
+        self.remote.replace_task(self.remote.get_task_by_id(1), core.Task("edited", 35, "", "01/02/2016"))
+        deleted_task = self.remote.find_by_phrase("review the deploy")[0]
+        self.remote.delete_task(deleted_task)
+        self.assertEqual([(task.task_id, task.description) for task in
+                          stores.TaskStore(self.log_file_name).get_tasks()],
+                         [(1, "edited"), (3, "write notes"), (4, "fix the build"), (5, "appended")])
+        with self.assertRaises(ValueError):
+            self.remote.replace_task(deleted_task, core.Task("edited again", 35, "", "02/02/2016"))
+        self.remote.write_rows([["01/01/2016", "only task", "1", "", "3"], ["02/01/2016", "new task", "1", ""]])
+        self.assertEqual([(task.task_id, task.description) for task in  # ids of the tasks written over aren't reused
+                          stores.TaskStore(self.log_file_name).get_tasks()], [(3, "only task"), (6, "new task")])
+
+    def test_appends_at_once_are_all_made(self):
+        threads = [threading.Thread(target=lambda number: server.RemoteStore(self.remote.file_name).append_rows(
+            [["17/03/2016", "appended {} {}".format(number, row), "10", ""] for row in range(20)]), args=(number,))
+            for number in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        descriptions = [task.description for task in stores.TaskStore(self.log_file_name).get_tasks()]
+        self.assertEqual(len(descriptions), len(TASKS) + 8 * 20)
+        self.assertEqual(len(set(descriptions)), len(descriptions))
+
+    def test_bad_requests_are_refused(self):
+        for method, parameters in (("get_tasks", {"limit": 1}), ("find_by_pattern", {"pattern": "("}),
+                                   ("get_task", {"row_id": "first"}), ("append_rows", {"rows": [["x"]]})):
+            with self.assertRaises(ValueError, msg=method):  # answered 400
+                self.remote.call(method, **parameters)
+        with self.assertRaisesRegex(OSError, "answered 500"):
+            self.remote.call("delete_task", task=["not", "a", "task"])
+        connection = http.client.HTTPConnection("127.0.0.1", self.port, timeout=10)
+        for verb, path, status in (("POST", "/no_such_method", 404), ("GET", "/get_tasks", 405)):
+            connection.request(verb, path, b"{}")
+            response = connection.getresponse()
+            self.assertEqual(response.status, status, path)
+            self.assertIn("error", json.loads(response.read().decode("utf-8")))
+        connection.close()
+        with socket.create_connection(("127.0.0.1", self.port), timeout=10) as raw:
+            raw.sendall(b"nonsense\r\n\r\n")
+            self.assertTrue(raw.recv(1024).startswith(b"HTTP/1.1 400 "))
+        self.assertEqual(len(self.remote.get_tasks()), len(TASKS))  # still serving
+
+    def test_reads_are_sent_again_after_a_restart(self):
+        self.assertEqual(len(self.remote.get_tasks()), len(TASKS))
+        self.stop_server()
+        self.start_server(self.port)
+        self.assertEqual(len(self.remote.get_tasks()), len(TASKS))
+        self.stop_server()
+        self.start_server(self.port)
+        with self.assertRaises((http.client.HTTPException, ConnectionError)):
+            self.remote.append_rows([["17/03/2016", "appended", "10", ""]])
+        self.assertEqual(len(stores.TaskStore(self.log_file_name).get_tasks()), len(TASKS))  # not sent again
+        self.assertEqual(self.remote.append_rows([["17/03/2016", "appended", "10", ""]]), 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
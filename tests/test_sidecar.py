@@ -0,0 +1,84 @@
+"""
+Tasks loaded through the binary sidecar are those of the log, whether the sidecar is up to date, behind or stale
+
+Run from the repository root:  python -m pytest tests  (or python -m unittest discover tests)
+
+"""
+import csv
+import os
+import sys
+import tempfile
+import unittest
+from unittest import mock
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from worklog import core, stores
+
+ROWS = [["{:02d}/07/2016".format(i % 28 + 1), "task {} café".format(i), str(i), "notes\n{}".format(i) if i % 3 else ""]
+        for i in range(200)]
+
+
+class TestSidecar(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.log_file_name = os.path.join(self.directory.name, "work_log.csv")
+        self.write_log(ROWS, 'w')
+        patcher = mock.patch.object(stores, "SIDECAR_MIN_SIZE", 0)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        stores.TaskStore(self.log_file_name).get_tasks()  # writes the sidecar
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def write_log(self, rows, mode):
+        with open(self.log_file_name, mode, newline="") as f:
+            csv.writer(f).writerows(rows)
+
+    def check_tasks(self):
+        with open(self.log_file_name, newline="") as f:
+            rows = list(csv.reader(f))
+        store = stores.TaskStore(self.log_file_name)
+        self.assertEqual([core.task_to_row(task) for task in store.get_tasks()], rows)
+
+    def test_sidecar_is_used_as_it_is(self):
+        self.assertTrue(os.path.exists(self.log_file_name + ".cache"))
+        with mock.patch.object(stores, "read_rows_with_offsets", side_effect=AssertionError("log parsed")):
+            self.check_tasks()
+
+    def test_grown_log_parses_only_the_new_rows(self):
+        self.write_log([["01/08/2016", "appended", "5", ""]], 'a')
+        read_rows_with_offsets = stores.read_rows_with_offsets
+        parsed_rows = []
+
+        def read_rows(*arguments):
+            for offset, row in read_rows_with_offsets(*arguments):
+                parsed_rows.append(row)
+                yield offset, row
+
+        with mock.patch.object(stores, "read_rows_with_offsets", read_rows):
+            self.check_tasks()
+        self.assertEqual(parsed_rows, [["01/08/2016", "appended", "5", ""]])
+        with mock.patch.object(stores, "read_rows_with_offsets", side_effect=AssertionError("log parsed")):
+            self.check_tasks()  # the sidecar was written again
+
+    def test_changed_log_is_parsed_again(self):
+        rows = [list(row) for row in ROWS]
+        rows[50][1] = "TASK 50 CAFÉ"  # same size, so only the hash tells
+        self.write_log(rows, 'w')
+        self.check_tasks()
+        self.write_log(rows[:100], 'w')
+        self.check_tasks()
+
+    def test_broken_sidecar_is_ignored(self):
+        with open(self.log_file_name + ".cache", "r+b") as f:
+            f.truncate(os.path.getsize(self.log_file_name + ".cache") - 3)
+        self.check_tasks()
+        with open(self.log_file_name + ".cache", "wb"):
+            pass
+        self.check_tasks()
+
+
+if __name__ == "__main__":
+    unittest.main()
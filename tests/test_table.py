@@ -0,0 +1,70 @@
+"""
+The columnar table of tasks gives back the rows put into it, as a plain list of rows would
+
+Run from the repository root:  python -m pytest tests  (or python -m unittest discover tests)
+
+"""
+import csv
+import os
+import random
+import sys
+import tempfile
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from worklog import core, indexes, stores
+
+TEXTS = ["", "plain", "with, a comma", "two\nlines", "\"quoted\"", "café ü 漢字", "emoji 🙂"]
+
+
+def make_row(generator):
+    """
+    :param generator: random.Random
+    :return: [string] ... a row as the log file keeps it
+    """
+    day, month, year = generator.randint(1, 28), generator.randint(1, 12), generator.randint(1990, 2030)
+    task_date = "{:02d}/{:02d}/{}".format(day, month, year)
+    return [task_date, generator.choice(TEXTS), str(generator.randint(0, 600)), generator.choice(TEXTS)]
+
+
+class TestTaskTable(unittest.TestCase):
+    def test_table_matches_a_list_of_rows(self):
+        generator = random.Random(1)
+        table = indexes.TaskTable()
+        rows = {}  # row number: row, for the rows not deleted
+        for _ in range(2000):
+            operation = generator.random()
+            if operation < 0.6 or not rows:
+                row = make_row(generator)
+                rows[table.append(row)] = row
+            elif operation < 0.8:
+                row_id = generator.choice(list(rows))
+                rows[row_id] = make_row(generator)
+                table.replace(row_id, rows[row_id])
+            else:
+                row_id = generator.choice(list(rows))
+                del rows[row_id]
+                table.delete(row_id)
+        self.assertEqual(list(table.live_row_ids()), sorted(rows))
+        for row_id, row in rows.items():
+            self.assertEqual(table.get_row(row_id), row)
+            self.assertEqual(core.task_to_row(core.TaskRow(table, row_id)), row)
+
+    def test_rows_are_normalised(self):
+        self.assertEqual(core.normalize_row(["1/2/2016", "description", " 05", "notes"]),
+                         ["01/02/2016", "description", "5", "notes"])
+
+    def test_store_keeps_the_rows_of_the_log(self):
+        generator = random.Random(2)
+        rows = [make_row(generator) for _ in range(300)]
+        with tempfile.TemporaryDirectory() as directory:
+            log_file_name = os.path.join(directory, "work_log.csv")
+            with open(log_file_name, "w", newline="") as f:
+                csv.writer(f).writerows(rows)
+            store = stores.TaskStore(log_file_name)
+            self.assertEqual([core.task_to_row(task) for task in store.get_tasks()], rows)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,84 @@
+"""
+Searches by time spent and the spread of the minutes match a plain scan of the log
+
+Run from the repository root:  python -m pytest tests  (or python -m unittest discover tests)
+
+"""
+import csv
+import math
+import os
+import random
+import sys
+import tempfile
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from worklog import core, indexes, stores
+
+RANGES = [(0, 0), (1, 1), (5, 30), (30, 5), (60, 240), (0, 1000)]
+
+
+def make_rows(count, seed):
+    """
+    :param count: integer
+    :param seed: integer
+    :return: [[string]] ... rows with random minutes, many of them repeated
+    """
+    generator = random.Random(seed)
+    return [["01/06/2016", "task {}".format(i), str(generator.choice([0, 5, 15, 30, generator.randint(1, 240)])), ""]
+            for i in range(count)]
+
+
+def nearest_rank(minutes, percent):
+    """
+    :param minutes: [integer]
+    :param percent: number
+    :return: integer ... the percentile of the minutes by the nearest rank method
+    """
+    ordered = sorted(minutes)
+    return ordered[max(math.ceil(percent * len(ordered) / 100) - 1, 0)]
+
+
+class TestTimeSpent(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.log_file_name = os.path.join(self.directory.name, "work_log.csv")
+        with open(self.log_file_name, "w", newline="") as f:
+            csv.writer(f).writerows(make_rows(500, 1))
+        self.store = stores.TaskStore(self.log_file_name)
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def check_against_scan(self):
+        rows = [core.task_to_row(task) for task in self.store.get_tasks()]
+        for first_minutes, last_minutes in RANGES:
+            expected = [row for row in rows if first_minutes <= int(row[2]) <= last_minutes]
+            found_rows = [core.task_to_row(task)
+                          for task in self.store.find_by_time_spent(first_minutes, last_minutes)]
+            self.assertEqual(found_rows, expected, (first_minutes, last_minutes))
+        minutes = [int(row[2]) for row in rows]
+        for percent in [0, 1, 25, 50, 90, 99.5, 100]:
+            self.assertEqual(self.store.get_time_index().percentile(percent), nearest_rank(minutes, percent), percent)
+
+    def test_ranges_and_percentiles(self):
+        self.check_against_scan()
+
+    def test_index_follows_changes(self):
+        self.check_against_scan()
+        tasks = list(self.store.get_tasks())
+        for row in make_rows(50, 2):
+            self.store.append(row)
+        self.store.replace_task(tasks[3], core.task_from_row(["01/06/2016", "edited", "999", ""]))
+        self.store.replace_task(tasks[4], core.task_from_row(["01/06/2016", "edited", "0", ""]))
+        for task in tasks[100:150]:
+            self.store.delete_task(task)
+        self.check_against_scan()
+
+    def test_empty_log_has_no_percentiles(self):
+        self.assertIsNone(indexes.TimeSpentIndex(indexes.TaskTable()).percentile(50))
+
+
+if __name__ == "__main__":
+    unittest.main()
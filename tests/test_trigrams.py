@@ -0,0 +1,81 @@
+"""
+Searches by pattern, substring and fuzzy text must find the same tasks whether the trigram index narrows them down or
+every row is checked
+
+Run from the repository root:  python -m pytest tests  (or python -m unittest discover tests)
+
+"""
+import os
+import re
+import sys
+import tempfile
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from worklog import core, stores, api
+
+TASKS = [
+    ["01/02/2016", "deploy app", "30", "to the test servers"],
+    ["02/02/2016", "deploy app again", "20", ""],
+    ["03/02/2016", "deploy\tapp with a tab", "10", ""],
+    ["04/02/2016", "café order", "5", "paid the café"],
+    ["05/02/2016", "deploy deploy", "15", "twice"],
+    ["06/02/2016", "fix 12 items", "45", "line\nbreak"],
+    ["07/02/2016", "20app", "1", "not a deploy"],
+]
+ESCAPED_PATTERNS = [r"deploy\x20app", r"deploy\040app", r"deploy app", r"deploy\U00000020app",
+                    r"deploy\N{SPACE}app", r"café", r"caf\N{LATIN SMALL LETTER E WITH ACUTE} order",
+                    r"(deploy) \1", r"\d+ items", r"deploy\tapp", r"line\nbreak", r"deploy\.? app", r"\bdeploy\b app",
+                    r"\Adeploy app\Z", r"fix \d\d items"]
+
+
+class TestPatternSearches(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.log_file_name = os.path.join(self.directory.name, "work_log.csv")
+        stores.TaskStore(self.log_file_name).append_rows([core.normalize_row(task) for task in TASKS])
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def every_row(self, pattern):
+        return [task.description for task in stores.TaskStore(self.log_file_name).get_tasks()
+                if pattern.search(task.description) or pattern.search(task.notes)]
+
+    def test_required_texts_skip_whole_escapes(self):
+        self.assertEqual(core.required_texts(re.compile(r"deploy\x20app")), ["deploy", "app"])
+        self.assertEqual(core.required_texts(re.compile(r"x\N{SPACE}yz")), ["x", "yz"])
+        self.assertEqual(core.required_texts(re.compile(r"(ab)\1cd")), ["cd"])
+        self.assertEqual(core.required_texts(re.compile(r"x\012yz")), ["x", "yz"])
+        self.assertEqual(core.required_texts(re.compile(r"deploy\.app")), ["deploy.app"])
+
+    def test_index_and_scan_find_the_same(self):
+        store = stores.TaskStore(self.log_file_name)
+        for pattern in map(re.compile, ESCAPED_PATTERNS):
+            scanned = self.every_row(pattern)
+            self.assertTrue(scanned, pattern.pattern)
+            store.scans = 0  # the first search by text checks every row
+            self.assertEqual([task.description for task in store.find_by_pattern(pattern)], scanned, pattern.pattern)
+            store.get_trigram_index()
+            self.assertEqual([task.description for task in store.find_by_pattern(pattern)], scanned, pattern.pattern)
+            self.assertEqual([task.description for task in api.query(pattern=pattern, log=store)], scanned,
+                             pattern.pattern)
+            self.assertEqual([task.description for task in api.query(pattern=pattern, minutes=(0, 100),
+                                                                     log=store)], scanned, pattern.pattern)
+
+    def test_substrings_and_fuzzy_texts_find_as_a_scan(self):
+        store = stores.TaskStore(self.log_file_name)
+        store.get_trigram_index()
+        for text in ("PLOY", "ploy ap", "café", "é", "20a", "ab", "nowhere", "line\nbr"):
+            scanned = [task.description for task in store.get_tasks()
+                       if text.casefold() in task.description.casefold() or text.casefold() in task.notes.casefold()]
+            self.assertEqual([task.description for task in store.find_by_substring(text)], scanned, text)
+        for text in ("deplyo ap", "cafe ordr", "fix 12 itmes"):
+            self.assertEqual([(score, task.description) for score, task in store.find_fuzzy(text, limit=3)],
+                             [(score, task.description) for score, task in
+                              stores.LogStore.find_fuzzy(store, text, limit=3)], text)
+
+
+if __name__ == "__main__":
+    unittest.main()
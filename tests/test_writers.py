@@ -0,0 +1,163 @@
+"""
+Writers of the same log, in this process and in others, neither block each other longer than they need nor lose or
+repeat tasks or their ids
+
+Run from the repository root:  python -m pytest tests  (or python -m unittest discover tests)
+
+"""
+import collections
+import multiprocessing
+import os
+import sqlite3
+import sys
+import tempfile
+import threading
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from worklog import core, stores, api
+
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+
+PROCESSES = 3  # writer processes in the stress test
+THREADS = 4  # threads in each of them
+TASKS = 50  # tasks appended by each thread
+
+
+def append_tasks(log_file_name, process_number, rewriting):
+    """
+    Appends tasks from several threads at once, runs in a writer process
+    :param log_file_name: string
+    :param process_number: integer
+    :param rewriting: multiprocessing.Event ... set once the log is being rewritten, to start then
+    :return: None
+    """
+    log = api.open_log(log_file_name)
+    rewriting.wait()
+
+    def append_from_thread(thread_number):
+        for task_number in range(TASKS):
+            api.add("p{} t{} n{}".format(process_number, thread_number, task_number), 1, task_date="01/01/2016",
+                    log=log)
+
+    appenders = [threading.Thread(target=append_from_thread, args=(thread_number,)) for thread_number in range(THREADS)]
+    for appender in appenders:
+        appender.start()
+    for appender in appenders:
+        appender.join()
+
+
+def rewrite_tasks(log_file_name, rewriting, stop, rewrites):
+    """
+    Writes the whole log over again, and edits its first task through the journal, until told to stop, runs in the
+    rewriting process
+    :param log_file_name: string
+    :param rewriting: multiprocessing.Event ... set after the first rewrite
+    :param stop: multiprocessing.Event
+    :param rewrites: multiprocessing.Value ... counts the rewrites
+    :return: None
+    """
+    log = api.open_log(log_file_name)
+    while not stop.is_set():
+        log.save()
+        first_task = log.get_tasks()[0]
+        log.replace_task(first_task, core.Task("edited " + first_task.description, 2, "", "01/01/2016"))
+        rewrites.value += 1
+        rewriting.set()
+        stop.wait(0.005)
+
+
+class TestWriters(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def lock_is_free(self, log):
+        """
+        :param log: TaskStore or SqliteStore
+        :return: boolean ... whether another process could start writing the log now
+        """
+        if isinstance(log, stores.SqliteStore):
+            connection = sqlite3.connect(log.file_name, timeout=0, isolation_level=None)
+            try:
+                connection.execute("BEGIN IMMEDIATE")
+                connection.execute("ROLLBACK")
+            except sqlite3.OperationalError:
+                return False
+            finally:
+                connection.close()
+            return True
+        fd = os.open(log.file_lock.file_name, os.O_RDWR | os.O_CREAT)
+        try:
+            fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except BlockingIOError:
+            return False
+        finally:
+            os.close(fd)
+        return True
+
+    @unittest.skipIf(fcntl is None, "without fcntl the lock only counts holds")
+    def test_rows_are_read_without_the_lock(self):
+        for file_name in ("work_log.csv", "work_log.sqlite"):
+            log = stores.make_store(os.path.join(self.directory.name, file_name))
+            log.get_tasks()
+            lock_checks = []
+
+            def slow_rows():
+                for day in range(1, 8):
+                    lock_checks.append(self.lock_is_free(log))
+                    yield core.normalize_row(["{:02d}/02/2016".format(day), "task", "5", ""])
+
+            self.assertEqual(log.append_rows(slow_rows()), 7)
+            self.assertEqual(len(log.get_tasks()), 7)
+            self.assertTrue(all(lock_checks))
+
+    def test_rows_before_an_error_are_appended(self):
+        log = stores.TaskStore(os.path.join(self.directory.name, "work_log.csv"))
+
+        def bad_rows():
+            yield core.normalize_row(["01/02/2016", "good", "5", ""])
+            raise ValueError("bad row")
+
+        with self.assertRaises(ValueError):
+            log.append_rows(bad_rows())
+        self.assertEqual([task.description for task in stores.TaskStore(log.file_name).get_tasks()], ["good"])
+
+    def test_concurrent_writers_lose_and_repeat_nothing(self):
+        log_file_name = os.path.join(self.directory.name, "work_log.csv")
+        api.add("first", 1, task_date="01/01/2016", log=stores.TaskStore(log_file_name))
+        rewriting, stop, rewrites = multiprocessing.Event(), multiprocessing.Event(), multiprocessing.Value("i", 0)
+        rewriter = multiprocessing.Process(target=rewrite_tasks, args=(log_file_name, rewriting, stop, rewrites))
+        writers = [multiprocessing.Process(target=append_tasks, args=(log_file_name, process_number, rewriting))
+                   for process_number in range(PROCESSES)]
+        rewriter.start()
+        for writer in writers:
+            writer.start()
+        for writer in writers:
+            writer.join()
+        stop.set()
+        rewriter.join()
+        self.assertEqual([writer.exitcode for writer in writers] + [rewriter.exitcode], [0] * (PROCESSES + 1))
+        self.assertGreater(rewrites.value, 1)
+
+        tasks = stores.TaskStore(log_file_name).get_tasks()
+        counts = collections.Counter(task.description for task in tasks[1:])
+        expected = {"p{} t{} n{}".format(process_number, thread_number, task_number)
+                    for process_number in range(PROCESSES) for thread_number in range(THREADS)
+                    for task_number in range(TASKS)}
+        self.assertEqual(set(counts), expected)
+        self.assertEqual([description for description, count in counts.items() if count > 1], [])
+        self.assertTrue(tasks[0].description.endswith("first"))
+        task_ids = [task.task_id for task in tasks]
+        self.assertEqual(len(set(task_ids)), len(task_ids))
+        self.assertEqual(task_ids[0], 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
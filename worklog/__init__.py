@@ -0,0 +1,16 @@
+"""
+Work Log, being a script to log the work of a small team on csv files
+
+by Miguel de Luis
+
+Started on 260816
+
+Run it with python -m worklog. It is split in modules, each importing only those above it:
+core ... tasks, dates, words and queries, and the profiler
+indexes ... the columns of a log kept in memory and the indexes on them
+stores ... the kinds of log and the script's own log, the server only once a remote log is opened
+server ... the query server and the RemoteStore client
+cli ... the menu and the batch command line
+api ... what other Python code calls, see open_log
+
+"""
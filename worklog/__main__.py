@@ -0,0 +1,16 @@
+"""
+Runs the script: python -m worklog for the menu, or python -m worklog --help for the batch commands
+
+"""
+import os
+import sys
+
+from .cli import PROFILE_VARIABLE, batch_main, main
+from .core import start_profiling
+
+if os.environ.get(PROFILE_VARIABLE, "0") not in ("", "0"):
+    start_profiling(None if os.environ[PROFILE_VARIABLE] == "1" else os.environ[PROFILE_VARIABLE])
+if sys.argv[1:]:
+    sys.exit(batch_main(sys.argv[1:]))
+else:
+    main()
@@ -0,0 +1,74 @@
+"""
+Queries and additions to a log from other Python code
+
+"""
+import os
+
+from .core import Query, get_task_date, profiled, sort_by_date
+from .stores import get_task_store, make_store
+
+
+# Programmatic API
+
+OPEN_LOGS = {}  # absolute path: LogStore, for the logs opened with open_log
+
+
+def open_log(file_name=None):
+    """
+    Opens a log file to query it or add to it from other Python code. Nothing is read until the first query, and
+    opening the same file again gives back the same store.
+    :param file_name: string ... path to the csv log file or SQLite database, the script's own log if not given
+    :return: LogStore ... see make_store
+    """
+    if file_name is None:
+        return get_task_store()
+    path = os.path.abspath(file_name)
+    if path not in OPEN_LOGS:
+        OPEN_LOGS[path] = make_store(path)
+    return OPEN_LOGS[path]
+
+
+@profiled
+def query(date=None, minutes=None, text=None, pattern=None, log=None, contains=None, plan=None):
+    """
+    Finds the tasks that meet all the given conditions, see LogStore.run_query
+    :param date: string or (string, string) ... a dd/mm/yyyy date, or the first and last dates of a range
+    :param minutes: integer or (integer, integer) ... exact minutes spent, or the smallest and largest of a range
+    :param text: string ... exact words in the description or the notes
+    :param pattern: string or compiled regular expression ... to look for in the description or the notes
+    :param log: LogStore ... as open_log gives, the script's own log if not given
+    :param contains: string ... text anywhere in the description or the notes, in any case
+    :param plan: QueryPlan ... to add how the query was run to, see QueryPlan.explain
+    :return: [Task] ... ordered by date if only the date is given, otherwise in log order
+    """
+    search = Query(date, minutes, text, contains, pattern)
+    tasks = (log or open_log()).run_query(search, plan)
+    return sort_by_date(tasks) if search.get_conditions() == ["date"] else tasks
+
+
+@profiled
+def add(description, time_spent, notes="", task_date=None, log=None):
+    """
+    Adds a task to a log
+    :param description: string
+    :param time_spent: integer ... minutes
+    :param notes: string
+    :param task_date: string ... dd/mm/yyyy, today if not given
+    :param log: LogStore ... as open_log gives, the script's own log if not given
+    :return: None
+    """
+    (log or open_log()).append([task_date or get_task_date(), description, time_spent, notes])
+
+
+@profiled
+def report(by="week", first_date=None, last_date=None, percents=(50, 90), log=None):
+    """
+    Totals, means and percentiles of the minutes spent on the tasks of a log by period, needs NumPy
+    :param by: string ... day, week, month or range, see make_time_report
+    :param first_date: string ... dd/mm/yyyy, leaves out the tasks before it
+    :param last_date: string ... dd/mm/yyyy, leaves out the tasks after it
+    :param percents: (number) ... percentiles to work out, from 0 to 100
+    :param log: LogStore ... as open_log gives, the script's own log if not given
+    :return: [[string, integer, integer, float, integer...]] ... see make_time_report
+    """
+    return (log or open_log()).get_report(by, first_date, last_date, percents)
@@ -0,0 +1,1062 @@
+"""
+The menu and the batch command line of the script
+
+"""
+import argparse
+import csv
+import itertools
+import json
+import os
+import re
+import sys
+import time
+from sys import exit
+
+from .core import (Query, QueryPlan, REPORT_PERIODS, Task, date_to_ordinal, get_task_date, normalize_row,
+                   ordinal_to_date, profiled, sort_by_date, start_profiling, task_to_row, validate_minutes)
+from .stores import (ARCHIVE_COMPRESSIONS, ARCHIVE_EXTENSION, ArchivedStore, PARTITIONED_EXTENSION, SQLITE_EXTENSIONS,
+                     append_task_to_log, archive_log, get_task_store, make_store, migrate_log, set_task_store)
+from .server import RemoteStore, SERVER_HOST, SERVER_PORT, follow_log, serve_log
+
+
+# constants
+
+PAGE_SIZE = 10  # tasks on each page of search results in the menu
+PAGES_KEPT = 50  # pages of search results kept to go back to, when the results are pulled from a generator
+
+# set to 1 to profile the script, or to a file name to save cProfile stats there too
+PROFILE_VARIABLE = "WORKLOG_PROFILE"
+
+
+# Classes
+
+class TaskPager():
+    def __init__(self, tasks, page_size=PAGE_SIZE):
+        """
+        Pages through search results. A list is read in place. Any other iterable, e.g. a generator, is pulled from a
+        page at a time as the pages are asked for, and only the last PAGES_KEPT pages pulled are kept, so the pager
+        takes the same memory however far it goes. The stores give their results as lists though, views on the table
+        for csv logs, so only results that come from a generator, such as the fuzzy search's, are pulled lazily.
+
+        :param tasks: iterable of Task
+        :param page_size: integer ... tasks on each page
+        """
+        self.page_size = page_size
+        if isinstance(tasks, (list, tuple)):
+            self.tasks, self.source, self.total = tasks, None, len(tasks)
+        else:
+            self.tasks, self.source, self.total = [], iter(tasks), None  # the total is known once source runs out
+        self.first_kept = 0  # number of the first task in self.tasks, from 0
+
+    def get_task(self, number):
+        """
+        :param number: integer ... of the task in the results, from 0
+        :return: Task ... None if there are fewer tasks, or if it was pulled too long ago to be kept
+        """
+        while self.source is not None and number >= self.first_kept + len(self.tasks):
+            page = list(itertools.islice(self.source, self.page_size))
+            self.tasks.extend(page)
+            if len(page) < self.page_size:
+                self.source, self.total = None, self.first_kept + len(self.tasks)
+            dropped = len(self.tasks) - PAGES_KEPT * self.page_size
+            if dropped > 0:
+                del self.tasks[:dropped]
+                self.first_kept += dropped
+        if self.first_kept <= number < self.first_kept + len(self.tasks):
+            return self.tasks[number - self.first_kept]
+        return None
+
+    def get_page(self, page_number):
+        """
+        :param page_number: integer ... from 0
+        :return: [(integer, Task)] ... number of each task of the page, from 0, and the task
+        """
+        numbered_tasks = []
+        for number in range(page_number * self.page_size, (page_number + 1) * self.page_size):
+            task = self.get_task(number)
+            if task is None:
+                if number < self.first_kept:
+                    continue  # the start of the page is no longer kept
+                break
+            numbered_tasks.append((number, task))
+        return numbered_tasks
+
+    def find_date(self, ordinal):
+        """
+        Finds the first task of a date, pulling tasks until it is found
+        :param ordinal: integer ... date ordinal
+        :return: integer ... number of the task, from 0, None if no task kept or still to pull has the date
+        """
+        number = self.first_kept
+        task = self.get_task(number)
+        while task is not None:
+            if date_to_ordinal(task.task_date) == ordinal:
+                return number
+            number += 1
+            task = self.get_task(number)
+        return None
+
+
+# Auxiliary Functions
+
+def clear_screen():
+    """ Treehouse code from battleship
+    033 = ESC so this is <ESC> + c -> clear terminal
+    found on http://askubuntu.com/questions/25077/how-to-really-clear-the-terminal
+    """
+    print("\033c", end="\v")  # adding some white spacea
+
+
+def show_validation_message(validation_message):
+    """
+    Shows a validation message, if any
+    :param validation_message: string
+    :return:
+    """
+    if validation_message:
+        print("\a\v\t " + validation_message)
+
+
+@profiled
+def show_tasks(tasks, not_found_message="Sorry, not tasks to show.\v", page_size=PAGE_SIZE):
+    """
+    Shows the tasks a page at a time, to go through them, jump to a task or a date and select a task. Tasks from a
+    generator are pulled as the pages are shown, a list is paged in place, see TaskPager.
+    :param tasks: iterable of Task
+    :param not_found_message: string
+    :param page_size: integer ... tasks on each page
+    :return: Task ... selected task, if any or None
+    """
+    nav_menu_items = ["n for next page", "p for previous page", "g and a number to go to that task",
+                      "d and a date (dd/mm/yyyy) to go to its first task", "s and a number to select that task",
+                      "b back"]
+    pager = TaskPager(tasks, page_size)
+    if pager.get_task(0) is None:
+        print(not_found_message)
+        return None
+
+    page_number = 0
+    validation_message = ""
+    while True:
+        page = pager.get_page(page_number)
+        if not page:  # no longer kept, a jump pulled the tasks far past it
+            page_number = pager.first_kept // page_size
+            page = pager.get_page(page_number)
+        print("\v")
+        for number, task in page:
+            description = task.description.splitlines()[0] if task.description else ""
+            print("{:>6}. {}  {:>5} min  {}".format(number + 1, task.task_date, task.time_spent, description[:60]))
+        print("\nTasks {} to {} of {}\n".format(page[0][0] + 1, page[-1][0] + 1,
+                                                pager.total if pager.total is not None else "more"))
+        show_validation_message(validation_message)
+        validation_message = ""
+        for nav_menu_item in nav_menu_items:
+            print(nav_menu_item)
+
+        choice = ask("Choose :> ").strip().lower()
+        option, argument = choice[:1], choice[1:].strip()
+        if option == "n":
+            if pager.get_task((page_number + 1) * page_size) is None:
+                validation_message = "Sorry, no more tasks to show."
+            else:
+                page_number += 1
+        elif option == "p":
+            if page_number == 0:
+                validation_message = "Sorry, this is the first page."
+            elif pager.get_task(page_number * page_size - 1) is None:
+                validation_message = "Sorry, those tasks are no longer kept, search again to see them."
+            else:
+                page_number -= 1
+        elif option in ("g", "s"):
+            task = pager.get_task(int(argument) - 1) if argument.isdigit() and int(argument) > 0 else None
+            if task is None:
+                validation_message = "Sorry, there is no task {} to show.".format(argument)
+            elif option == "g":
+                page_number = (int(argument) - 1) // page_size
+            else:
+                task.show_task()
+                return task
+        elif option == "d":
+            try:
+                number = pager.find_date(date_to_ordinal(argument))
+            except ValueError:
+                validation_message = "Please enter the date as dd/mm/yyyy"
+                continue
+            if number is None:
+                validation_message = "Sorry, no tasks on {}.".format(argument)
+            else:
+                page_number = number // page_size
+        elif option == "b":
+            return None
+        else:
+            validation_message = "Sorry, not in menu"
+
+
+# User Input and Validation
+
+@profiled
+def ask(prompt=""):
+    """
+    Reads an answer from the user, measured apart from the rest of the command while profiling
+    :param prompt: string
+    :return: string
+    """
+    return input(prompt)
+
+
+def input_task_date(validation_message):
+    """
+    Ask user for task date, validates, asking again until the date is valid
+    :return: string ... dd/mm/yyyy
+    """
+    while True:
+        show_validation_message(validation_message)
+
+        raw_task_date = ask("Please enter the date for this task. Enter help for help:> ") \
+            .replace(" ", "").replace(".", "/").replace("-", "/").strip("").lower()
+        # some countries use . for the / https://en.wikipedia.org/wiki/Date_format_by_country
+
+        if raw_task_date == "help":
+            validation_message = """
+Enter dates as dd/mm/yyyy.
+    * If you want to use the alternative format of mm/dd/yyyy write the letter M before your date as in M12/23/2016.
+
+    * If you want to use the alternative format of yyyy/mm/dd write the letter Y before the date as in Y2016/12/23.
+
+    * You may also substitute / for . or - with or without spaces
+        """
+            continue
+
+        if not raw_task_date:
+            return get_task_date()
+
+        if raw_task_date[0] == "m":
+            month = raw_task_date[1:3]
+            day = raw_task_date[4:6]
+            year = raw_task_date[7:]
+            raw_task_date = "{}/{}/{}".format(day, month, year)
+        elif raw_task_date[0] == "y":
+            year = raw_task_date[1:5]
+            month = raw_task_date[6:8]
+            day = raw_task_date[9:]
+            raw_task_date = "{}/{}/{}".format(day, month, year)
+            print(raw_task_date)
+
+        try:
+            date_to_ordinal(raw_task_date)
+            # The idea is to use date_to_ordinal to raise a Value Error if the string provided does not conform to
+            # Date_Format
+            return raw_task_date
+        except ValueError:
+            validation_message = "Please enter the date as dd/mm/yyyy or just press enter for today"
+
+
+def input_task_notes(task_notes):
+    """
+    Generates a string with all the notes associated to a task separated by new lines characters
+    :param task_notes: string
+    :return: string ... task notes
+    """
+    while True:
+        my_note = ask("Add a new line for the notes of this task, if any or hit enter to stop adding notes:> ")
+        if not my_note:
+            return task_notes
+        task_notes += my_note + "\n"
+
+
+def input_time_spent(validation_message):
+    """
+    Evaluates a string and returns the time spent in minutes
+    raw_time_spent: string
+    :param validation_message string ... error message
+    :return: integer ... total minutes
+    """
+    while True:
+        show_validation_message(validation_message)
+
+        raw_time_spent = ask("\vEnter time spent on task, in minutes:> ")
+        if raw_time_spent.isnumeric():
+            try:
+                return int(raw_time_spent)
+            except ValueError:
+                validation_message = "\aPlease only whole numbers"
+        else:
+            validation_message = "\aPlease use only whole numbers"
+
+
+def input_date_to_search(validation_message, total_dates):
+    """
+    Ask for input for the date to choose among those offered. The rationale for this function is that it's much
+    faster and less error prone to type an index number rather than a date.
+    :param validation_message: string
+    :param total_dates: integer ... number of different dates that have tasks
+    :return:
+    """
+    while True:
+        show_validation_message(validation_message)
+
+        raw_date_index = ask("Please enter the number of the date to search for:> ")
+
+        try:
+            raw_date_index = abs(int(raw_date_index))
+            # I assume nobody would enter a negative number, except by mistfake and as we are only showing
+            # information, there are no major risks
+        except ValueError:
+            validation_message = "Please enter a _number_ of the date to search for:> "
+            continue
+
+        if raw_date_index > total_dates:
+            validation_message = "Sorry we don't have that date. Choose a smaller number"
+        else:
+            return raw_date_index
+
+
+def input_optional(prompt, validate):
+    """
+    Asks for something that may be left blank
+    :param prompt: string
+    :param validate: function ... called with what was entered, raises a ValueError or a re.error if it isn't valid
+    :return: string ... None if left blank
+    """
+    while True:
+        raw_answer = ask(prompt).strip()
+        if not raw_answer:
+            return None
+        try:
+            validate(raw_answer)
+            return raw_answer
+        except (ValueError, re.error) as error:
+            show_validation_message("Sorry, that won't do: {}".format(error))
+
+
+# Search Functions
+
+@profiled
+def order_dates(dates_list):
+    """
+    Orders a list of dates, formated as strings,
+
+    :param dates_list: string
+    :return: string
+    """
+    return [ordinal_to_date(ordinal) for ordinal in sorted(date_to_ordinal(date_item) for date_item in dates_list)]
+
+
+@profiled
+def find_dates_with_tasks(tasks):
+    """
+    Find the dates that have tasks, returns a list of strings that represent such dates, ordered as dates should be
+    ordered
+    :param tasks: [Task]
+    :return: [string] ... dates that have tasks
+    """
+    return order_dates({t.task_date for t in tasks})
+
+
+@profiled
+def show_dates_with_tasks(dates_with_tasks):
+    """
+    Shows the dates that have tasks
+    :param dates_with_tasks: [string] ... dates that have tasks, in order
+    :return: [string] ... dates that have tasks
+    """
+    clear_screen()
+    if dates_with_tasks:
+        print("These are the dates that have tasks")
+        i = 0
+        for d in dates_with_tasks:
+            print("{}. {}".format(i, d))
+            i += 1
+        return dates_with_tasks
+    else:
+        return None
+
+
+@profiled
+def find_by_date():
+    """
+    Handles the searching by date
+    :return: selected task, if any
+    """
+    found_tasks = []  # [Task]
+    # show dates with tasks
+    dates_that_have_tasks = show_dates_with_tasks(get_task_store().get_dates_with_tasks())
+
+    if dates_that_have_tasks:
+        range_dates = ask("\nDo you want to search for entries within a range of dates? (y/N)>: ").strip().lower()
+        if range_dates == "y":
+            f_date_index = input_date_to_search("\n1. Enter the index of the first date",
+                                                len(dates_that_have_tasks) - 1)
+            s_date_index = input_date_to_search("2. Enter the index of the second date", len(dates_that_have_tasks) - 1)
+            f_date_to_search = dates_that_have_tasks[f_date_index]
+            s_date_to_search = dates_that_have_tasks[s_date_index]
+            found_tasks = get_task_store().find_by_date_range(f_date_to_search, s_date_to_search)
+
+        else:
+            date_index = input_date_to_search("", len(dates_that_have_tasks) - 1)
+            date_to_search = dates_that_have_tasks[date_index]
+
+            # search
+            found_tasks = get_task_store().find_by_date_range(date_to_search, date_to_search)
+
+        selected_task = show_tasks(found_tasks, not_found_message="Sorry, no tasks found with that date")
+        return selected_task
+
+    else:
+        print("Sorry no dates with task have been found.")
+        return None
+
+
+@profiled
+def find_by_time_spent():
+    """
+    Handles finding Tasks by time spent on them
+    :return: Task ... selected Task, if any
+    """
+    if get_task_store().time_spent_percentile(0) is not None:
+        print("\nTasks took from {} to {} minutes, half of them {} minutes or less".format(
+            get_task_store().time_spent_percentile(0), get_task_store().time_spent_percentile(100),
+            get_task_store().time_spent_percentile(50)))
+    r_time = ask("\nDo you want to find entries within a range of time spent on a task? y/N").strip().lower()
+    if r_time == "y":
+        f_time_spent = input_time_spent("\n 1. Enter the smaller item of the range:> ")
+        s_time_spent = input_time_spent("2. Enter the larger item of the range:> ")
+        found_tasks = get_task_store().find_by_time_spent(f_time_spent, s_time_spent)
+    else:
+        time_spent_to_search = input_time_spent("")
+        # search
+        found_tasks = get_task_store().find_by_time_spent(time_spent_to_search, time_spent_to_search)
+    # show list of tasks
+    selected_task = show_tasks(found_tasks)
+    return selected_task
+
+
+@profiled
+def find_by_exact_search():
+    """
+    Handles searching Task by exact search.
+    :return: Task ... selected Task if any
+    """
+    string_to_search = ask("\nEnter the exact words that you want to find:> ").strip().strip("\n")
+    # ask for user input
+
+    # search
+    found_tasks = get_task_store().find_by_phrase(string_to_search)
+
+    selected_task = show_tasks(found_tasks)
+    return selected_task
+
+
+@profiled
+def find_by_text_anywhere():
+    """
+    Handles searching Task by a text found anywhere in the description or notes, in any case
+    :return: Task ... selected Task if any
+    """
+    text_to_search = ask("\nEnter the text that you want to find, even inside words:> ").strip()
+    found_tasks = get_task_store().find_by_substring(text_to_search)
+    selected_task = show_tasks(found_tasks)
+    return selected_task
+
+
+@profiled
+def find_by_similar_text():
+    """
+    Handles searching Task by a text that may be misspelled, the most similar tasks first
+    :return: Task ... selected Task if any
+    """
+    text_to_search = ask("\nEnter the text that you want to find, typos are fine:> ").strip()
+    found_tasks = (task for score, task in get_task_store().find_fuzzy(text_to_search))
+    selected_task = show_tasks(found_tasks)
+    return selected_task
+
+
+@profiled
+def find_by_pattern():
+    """
+    Handles searching Task by RegEx patter.
+    :return: Task ... selected Task if any
+    """
+    raw_re_string = ask("\nEnter your Regular Expression pattern")
+    # ask for user input
+    compiled_re_string = re.compile(raw_re_string)
+    print(compiled_re_string)
+    # search
+    found_tasks = get_task_store().find_by_pattern(compiled_re_string)
+
+    # show list of tasks
+    selected_task = show_tasks(found_tasks)
+    return selected_task
+
+
+@profiled
+def find_by_several():
+    """
+    Handles searching Task by several conditions at once, see Query, any of which may be left blank
+    :return: Task ... selected Task if any
+    """
+
+    def whole_number(raw_number):
+        if not raw_number.isnumeric():
+            raise ValueError("please use only whole numbers")
+
+    print("\nLeave blank what you don't want to search by.")
+    first_date = input_optional("First date, dd/mm/yyyy:> ", date_to_ordinal)
+    last_date = input_optional("Last date, blank for the same day:> ", date_to_ordinal) if first_date else None
+    least_minutes = input_optional("Fewest minutes spent:> ", whole_number)
+    most_minutes = input_optional("Most minutes spent:> ", whole_number)
+    text = input_optional("Exact words:> ", str)
+    contains = input_optional("Text anywhere, even inside words:> ", str)
+    pattern = input_optional("Regular Expression pattern:> ", re.compile)
+
+    minutes = None
+    if least_minutes or most_minutes:
+        minutes = (least_minutes and int(least_minutes), most_minutes and int(most_minutes))
+    plan = QueryPlan()
+    found_tasks = get_task_store().run_query(Query(first_date and (first_date, last_date or first_date), minutes, text,
+                                             contains, pattern), plan)
+    if ask("\n{} tasks found. Show how they were found? y/N".format(len(found_tasks))).strip().lower() == "y":
+        for line in plan.explain():
+            print(line)
+    selected_task = show_tasks(found_tasks)
+    return selected_task
+
+
+# Command Functions
+
+@profiled
+def add_entry():
+    """
+    Adds an entry based on user input
+    :return: Calls append_task_to_log, appending it to the log
+    """
+    clear_screen()
+    task_description = ask("Task Description:> ")
+    time_spent = input_time_spent("")
+    task_notes = input_task_notes("").strip()
+    task_date = input_task_date("")
+
+    append_task_to_log([task_date, task_description, time_spent, task_notes])
+
+    # update worklog file
+
+
+def search_entries():
+    """
+    Searches for an entry, based on a sub-menu, then goes back to the main menu
+    :return: Calls the appropriate function to edit of deleted any selected task
+    """
+    clear_screen()
+    search_menu_functions = {"p": find_by_pattern, "d": find_by_date, "x": find_by_exact_search,
+                             "c": find_by_text_anywhere, "s": find_by_similar_text, "t": find_by_time_spent,
+                             "a": find_by_several, "m": lambda: None, "q": quit}
+    search_menu_items = {"p": "find pattern", "d": "find by date", "x": "find by exact match",
+                         "c": "find text anywhere", "s": "find similar text, typos allowed", "t": "find by time spent",
+                         "a": "find by several at once", "m": "back to main menu", "q": "quit the script"}
+    selected_task = search_menu(search_menu_functions, search_menu_items)
+    if selected_task:
+        delete_task_input = ask("Delete task? y/N").strip()
+        if delete_task_input == "y":
+            delete_task(selected_task)
+        else:
+            edit_task(selected_task)
+
+
+@profiled
+def edit_task(task_to_edit):
+    """
+    Edites the selected Task, based on user input
+    :param task_to_edit: Task
+    :return: Calls rewrite_log
+    """
+    print(task_to_edit.description)
+    new_description = ask("\n\tChange description? y/N").strip().lower()
+    if new_description == "y":
+        new_description = ask("\n\tNew description:> ")
+    else:
+        new_description = task_to_edit.description
+
+    print(task_to_edit.task_date)
+    new_date = ask("\n\tChange date? y/N").strip().lower()
+    if new_date == "y":
+        new_date = input_task_date("")
+    else:
+        new_date = task_to_edit.task_date
+
+    print(task_to_edit.time_spent)
+    new_time_spent = ask("\n\tChange time spent? y/N").strip().lower()
+    if new_time_spent == "y":
+        new_time_spent = input_time_spent("")
+    else:
+        new_time_spent = task_to_edit.time_spent
+
+    for note in task_to_edit.notes:
+        print(note)
+    new_notes = ask("\n\tChange notes? y/N").strip().lower()
+    if new_notes == "y":
+        new_notes = input_task_notes("")
+    else:
+        new_notes = task_to_edit.notes
+
+    new_task = Task(new_description, new_time_spent, new_notes, new_date)
+
+    try:
+        get_task_store().replace_task(task_to_edit, new_task)
+    except ValueError:
+        show_validation_message("Sorry, that task is no longer in the log, it was deleted meanwhile.")
+        ask("Press enter to go back to the menu")
+
+
+@profiled
+def delete_task(task_to_delete):
+    """
+    Deletes the selected Task, after confirmation
+    :param task_to_delete: Task
+    :return: Calls rewrite_log
+    """
+    print("I am going to delete this entry")
+    task_to_delete.show_task()
+    sure = ask("Are you sure? y/N").strip()
+    if sure == "y":
+        # buckup file?
+        get_task_store().delete_task(task_to_delete)
+
+
+def ask_for_choice(error_message, menu_choices):
+    """
+    Shows the main menu, returns the menu option chosen
+    :return: string with the option
+    """
+    menu_keys = sorted(menu_choices)
+
+    while True:
+        clear_screen()
+
+        print("\v")
+
+        if error_message:
+            print("\a\t*** {} \v".format(error_message))
+
+        for k in menu_keys:
+            print(k, menu_choices[k].title())
+
+        print("\v")
+
+        choice = ask("Your choice:> ").lower().strip()
+
+        if choice in menu_keys:
+            return choice
+        error_message = "Sorry, not in menu"
+
+
+def search_menu(menu_functions, menu_items):
+    """
+    Handles the search menu, pretty much like menu
+    :param menu_functions: dictionary character:function name ... menu functions
+    :param menu_items: dictionary character:string ... contains strings with the menu items
+    :return: returns a calls to a function so it can pass whatever it returns
+    """
+    user_choice = ask_for_choice("", menu_items)
+    return menu_functions[user_choice]()
+
+
+def menu(menu_functions, menu_items):
+    """
+    Handles the main menu
+    :param menu_functions: dictionary character:function name ... menu functions
+    :param menu_items: dictionary character:string ... contains strings with the menu items
+    :return: just calls a function
+    """
+    while True:
+        user_choice = ask_for_choice("", menu_items)
+        menu_functions[user_choice]()
+
+
+def main():
+    """
+    Main
+    :return: Calls menu
+    """
+    main_menu_functions = {"a": add_entry, "f": search_entries, "q": exit}
+    main_menu_items = {"a": "add entry", "f": "search entries", "q": "quit"}
+
+    follow_log(get_task_store())
+    menu(main_menu_functions, main_menu_items)
+
+
+# Batch Command Line
+
+def print_tasks_as_csv(tasks):
+    """
+    Writes tasks to the standard output as csv rows, starting with their id
+    :param tasks: [TaskRow]
+    :return: integer ... exit status, 1 if nothing was found
+    """
+    writer = csv.writer(sys.stdout)
+    for task in tasks:
+        writer.writerow([task.task_id] + task_to_row(task))
+    return 0 if tasks else 1
+
+
+def read_rows_to_import(input_file, input_format):
+    """
+    Reads the rows to import
+    :param input_file: text file ... csv rows as in the log file, or json lines with date, description, minutes and
+    notes
+    :param input_format: string ... csv or jsonl
+    :return: generator of (integer, [string] or ValueError) ... line number and row, or why the line couldn't be read
+    """
+    if input_format == "csv":
+        reader = csv.reader(input_file)
+        while True:
+            try:
+                row = next(reader)
+            except StopIteration:
+                return
+            except csv.Error as error:
+                row = ValueError(error)
+            yield reader.line_num, row
+    else:
+        for line_number, line in enumerate(input_file, 1):
+            if line.strip():
+                try:
+                    entry = json.loads(line)
+                except ValueError as error:
+                    yield line_number, ValueError("not json: {}".format(error))
+                    continue
+                if not isinstance(entry, dict):
+                    yield line_number, ValueError("expected a json object, found {}".format(type(entry).__name__))
+                    continue
+                yield line_number, [entry.get("date", entry.get("task_date", "")), entry.get("description", ""),
+                                    entry.get("minutes", entry.get("time_spent", "")), entry.get("notes", "")]
+
+
+def validate_rows_to_import(numbered_rows, batch_size, rejected):
+    """
+    Validates the rows to import a batch at a time, reporting the bad ones on the standard error
+    :param numbered_rows: iterable of (integer, [string] or ValueError) ... see read_rows_to_import
+    :param batch_size: integer
+    :param rejected: [integer] ... line numbers of the bad rows are added here
+    :return: generator of [string] ... good rows, as normalize_row makes them
+    """
+    batch = []
+    for line_number, row in itertools.chain(numbered_rows, [(None, None)]):
+        if row is not None:
+            batch.append((line_number, row))
+            if len(batch) < batch_size:
+                continue
+        for batch_line_number, batch_row in batch:
+            try:
+                if isinstance(batch_row, ValueError):
+                    raise batch_row
+                if len(batch_row) not in (4, 5):
+                    raise ValueError("expected 4 fields, or 5 with an id, found {}".format(len(batch_row)))
+                validate_minutes(batch_row[2])
+                yield normalize_row(batch_row[:4])  # imported tasks get new ids
+            except ValueError as error:
+                rejected.append(batch_line_number)
+                print("line {}: {}".format(batch_line_number, error), file=sys.stderr)
+        batch = []
+
+
+@profiled
+def batch_add(arguments):
+    """
+    Adds one task
+    :param arguments: argparse.Namespace
+    :return: integer ... exit status
+    """
+    append_task_to_log([arguments.date or get_task_date(), arguments.description, arguments.minutes,
+                        arguments.notes])
+    return 0
+
+
+@profiled
+def batch_import(arguments):
+    """
+    Imports tasks from the standard input, validated in batches and appended APPEND_BUFFER_ROWS at a time, with one
+    open of the log for each buffer
+    :param arguments: argparse.Namespace
+    :return: integer ... exit status, 1 if any row was rejected
+    """
+    rejected = []
+    rows = validate_rows_to_import(read_rows_to_import(sys.stdin, arguments.format), arguments.batch_size, rejected)
+    imported_rows = get_task_store().append_rows(rows)
+    print("{} tasks imported, {} rejected".format(imported_rows, len(rejected)), file=sys.stderr)
+    return 1 if rejected else 0
+
+
+@profiled
+def batch_search(arguments):
+    """
+    Searches tasks and writes them to the standard output
+    :param arguments: argparse.Namespace
+    :return: integer ... exit status, 1 if nothing was found
+    """
+    if arguments.fuzzy is not None:
+        return print_tasks_as_csv([task for score, task in get_task_store().find_fuzzy(arguments.fuzzy)])
+    search = Query(arguments.range or arguments.date,
+                   (arguments.minutes[0], arguments.minutes[-1]) if arguments.minutes else None,
+                   arguments.text, arguments.contains, arguments.pattern)
+    plan = QueryPlan() if arguments.explain else None
+    start = time.perf_counter()
+    tasks = get_task_store().run_query(search, plan)
+    if search.get_conditions() == ["date"]:
+        tasks = sort_by_date(tasks)
+    if plan is not None:
+        for line in plan.explain():
+            print(line, file=sys.stderr)
+        print("{} tasks found in {:.2f} ms".format(len(tasks), (time.perf_counter() - start) * 1000), file=sys.stderr)
+    return print_tasks_as_csv(tasks)
+
+
+@profiled
+def batch_delete(arguments):
+    """
+    Deletes a task by its id
+    :param arguments: argparse.Namespace
+    :return: integer ... exit status, 1 if there is no such task
+    """
+    task_to_delete = get_task_store().get_task_by_id(arguments.id)
+    if task_to_delete is None:
+        print("There is no task {}".format(arguments.id), file=sys.stderr)
+        return 1
+    get_task_store().delete_task(task_to_delete)
+    return 0
+
+
+@profiled
+def batch_edit(arguments):
+    """
+    Changes the given fields of a task, found by its id, which it keeps
+    :param arguments: argparse.Namespace
+    :return: integer ... exit status, 1 if there is no such task
+    """
+    task_to_edit = get_task_store().get_task_by_id(arguments.id)
+    if task_to_edit is None:
+        print("There is no task {}".format(arguments.id), file=sys.stderr)
+        return 1
+    new_task = Task(task_to_edit.description if arguments.description is None else arguments.description,
+                    task_to_edit.time_spent if arguments.minutes is None else arguments.minutes,
+                    task_to_edit.notes if arguments.notes is None else arguments.notes,
+                    task_to_edit.task_date if arguments.date is None else arguments.date)
+    try:
+        get_task_store().replace_task(task_to_edit, new_task)
+    except ValueError:  # deleted by another process since we found it
+        print("There is no task {}".format(arguments.id), file=sys.stderr)
+        return 1
+    return 0
+
+
+@profiled
+def batch_migrate(arguments):
+    """
+    Copies a log to a new file, or writes it again in place, see migrate_log
+    :param arguments: argparse.Namespace
+    :return: integer ... exit status, 1 if the new file already exists
+    """
+    try:
+        migrated_tasks = migrate_log(arguments.source, arguments.target)
+    except FileExistsError:
+        print("{} already exists".format(arguments.target), file=sys.stderr)
+        return 1
+    print("{} tasks copied to {}".format(migrated_tasks, arguments.target or arguments.source), file=sys.stderr)
+    return 0
+
+
+@profiled
+def batch_archive(arguments):
+    """
+    Moves the old tasks of the log to its archive, see archive_log, or lists the segments of the archive
+    :param arguments: argparse.Namespace
+    :return: integer ... exit status, 1 if the log can't be archived
+    """
+    if arguments.before:
+        try:
+            archived_tasks = archive_log(get_task_store().file_name, arguments.before, arguments.compression)
+        except ValueError as error:
+            print(error, file=sys.stderr)
+            return 1
+        print("{} tasks dated before {} archived in {}".format(archived_tasks, arguments.before,
+                                                               get_task_store().file_name + ARCHIVE_EXTENSION),
+              file=sys.stderr)
+        return 0
+    store = make_store(get_task_store().file_name)
+    if not isinstance(store, ArchivedStore):
+        print("{} has no archive".format(get_task_store().file_name), file=sys.stderr)
+        return 1
+    writer = csv.writer(sys.stdout)
+    writer.writerow(["segment", "first", "last", "tasks", "minutes", "bytes"])
+    for number, (segment_file_name, first_ordinal, last_ordinal, rows, minutes, last_id) in \
+            sorted(store.refresh_summary().items()):
+        writer.writerow([segment_file_name, ordinal_to_date(first_ordinal), ordinal_to_date(last_ordinal), rows,
+                         minutes, os.path.getsize(os.path.join(store.archive_directory, segment_file_name))])
+    return 0
+
+
+@profiled
+def batch_serve(arguments):
+    """
+    Serves a log to the script of other processes until interrupted, see serve_log
+    :param arguments: argparse.Namespace
+    :return: integer ... exit status
+    """
+    try:
+        serve_log(make_store(arguments.log) if arguments.log else get_task_store(), arguments.host, arguments.port)
+    except KeyboardInterrupt:
+        pass
+    return 0
+
+
+@profiled
+def batch_report(arguments):
+    """
+    Writes a report of the minutes spent by period as csv, see make_time_report
+    :param arguments: argparse.Namespace
+    :return: integer ... exit status, 1 if NumPy is not installed
+    """
+    first_date, last_date = arguments.range or (None, None)
+    try:
+        report_rows = get_task_store().get_report(arguments.by, first_date, last_date, arguments.percentiles)
+    except ImportError:
+        print("Reports need NumPy, install it with: pip install numpy", file=sys.stderr)
+        return 1
+    writer = csv.writer(sys.stdout)
+    writer.writerow([arguments.by, "tasks", "minutes", "mean"] + ["p{:g}".format(p) for p in arguments.percentiles])
+    for label, count, total, mean, *figures in report_rows:
+        writer.writerow([label, count, total, "{:.1f}".format(mean)] + figures)
+    return 0
+
+
+def make_argument_parser():
+    """
+    The command line of the script, for using it without the menu
+    :return: argparse.ArgumentParser
+    """
+
+    def log_date(raw_date):
+        date_to_ordinal(raw_date)  # raises a ValueError if it is not dd/mm/yyyy
+        return raw_date
+
+    def minutes(raw_minutes):
+        return validate_minutes(raw_minutes)
+
+    log_date.__name__ = "date (dd/mm/yyyy)"
+    minutes.__name__ = "number of minutes"
+
+    def percent(raw_percent):
+        if not 0 <= float(raw_percent) <= 100:
+            raise ValueError(raw_percent)
+        return float(raw_percent)
+
+    percent.__name__ = "percentage (0 to 100)"
+
+    parser = argparse.ArgumentParser(prog="python -m worklog",
+                                     description="Work log of a small team. Without a command it shows the menu.")
+    parser.add_argument("--profile", action="store_true",
+                        help="print how long each part of the command took, and more, when it ends; also done when "
+                             "{} is 1".format(PROFILE_VARIABLE))
+    parser.add_argument("--profile-dump", metavar="FILE", help="profile, and save cProfile stats to FILE too")
+    parser.add_argument("--server", metavar="URL", help="use the log of a query server, see the serve command, e.g. "
+                                                        "http://{}:{}".format(SERVER_HOST, SERVER_PORT))
+    commands = parser.add_subparsers(dest="command")
+
+    add_parser = commands.add_parser("add", help="add a task")
+    add_parser.add_argument("description")
+    add_parser.add_argument("minutes", type=minutes)
+    add_parser.add_argument("--notes", default="")
+    add_parser.add_argument("--date", type=log_date, help="defaults to today")
+    add_parser.set_defaults(run=batch_add)
+
+    import_parser = commands.add_parser("import", help="add the tasks read from the standard input")
+    import_parser.add_argument("--format", choices=["csv", "jsonl"], default="csv",
+                               help="csv rows as in the log (date, description, minutes, notes and an id, which is "
+                                    "not kept) or json lines with those keys")
+    import_parser.add_argument("--batch-size", type=int, default=1000)
+    import_parser.set_defaults(run=batch_import)
+
+    search_parser = commands.add_parser("search", help="write the tasks that meet all the conditions given as csv, "
+                                                       "starting with their id")
+    search_dates = search_parser.add_mutually_exclusive_group()
+    search_dates.add_argument("--date", type=log_date)
+    search_dates.add_argument("--range", type=log_date, nargs=2, metavar=("FIRST", "LAST"))
+    search_parser.add_argument("--minutes", type=minutes, nargs="+", metavar="MINUTES",
+                               help="exact minutes, or the smallest and the largest of a range")
+    search_parser.add_argument("--text", help="exact words in the description or the notes")
+    search_parser.add_argument("--pattern", help="regular expression to look for in the description or the notes")
+    search_parser.add_argument("--contains", help="text anywhere in the description or the notes, in any case")
+    search_parser.add_argument("--fuzzy", help="text that may be misspelled, the most similar tasks first, on its own")
+    search_parser.add_argument("--explain", action="store_true",
+                               help="print to the standard error how the search was run: each step, the rows the "
+                                    "indexes said it would leave, the rows it left and how long it took")
+    search_parser.set_defaults(run=batch_search)
+
+    delete_parser = commands.add_parser("delete", help="delete a task by its id, as search writes it")
+    delete_parser.add_argument("id", type=int)
+    delete_parser.set_defaults(run=batch_delete)
+
+    edit_parser = commands.add_parser("edit", help="change a task by its id, as search writes it")
+    edit_parser.add_argument("id", type=int)
+    edit_parser.add_argument("--description")
+    edit_parser.add_argument("--minutes", type=minutes)
+    edit_parser.add_argument("--notes")
+    edit_parser.add_argument("--date", type=log_date)
+    edit_parser.set_defaults(run=batch_edit)
+
+    report_parser = commands.add_parser("report", help="write the tasks and the minutes spent on them by period, as "
+                                                       "csv (needs NumPy)")
+    report_parser.add_argument("--by", choices=REPORT_PERIODS, default="week",
+                               help="weeks go from Monday, range puts all the tasks together")
+    report_parser.add_argument("--range", type=log_date, nargs=2, metavar=("FIRST", "LAST"))
+    report_parser.add_argument("--percentiles", type=percent, nargs="+", default=[50, 90], metavar="PERCENT")
+    report_parser.set_defaults(run=batch_report)
+
+    migrate_parser = commands.add_parser("migrate", help="copy a log to a new file, kept in SQLite if it ends in {}, "
+                                                         "or split by month into a new directory if it ends in "
+                                                         "{}; without one, write the log again in place, giving ids "
+                                                         "to its tasks".format(" or ".join(SQLITE_EXTENSIONS),
+                                                                               PARTITIONED_EXTENSION))
+    migrate_parser.add_argument("source")
+    migrate_parser.add_argument("target", nargs="?")
+    migrate_parser.set_defaults(run=batch_migrate)
+
+    archive_parser = commands.add_parser("archive", help="move the tasks of a csv log dated before a day to compressed "
+                                                         "segments of an archive next to it, or list the segments")
+    archive_parser.add_argument("--before", type=log_date, help="list the segments if not given")
+    archive_parser.add_argument("--compression", choices=sorted(ARCHIVE_COMPRESSIONS), default="gzip",
+                                help="zstd needs Python 3.14 or the zstandard package")
+    archive_parser.set_defaults(run=batch_archive)
+
+    serve_parser = commands.add_parser("serve", help="keep the log in memory and answer searches and changes as JSON "
+                                                     "over HTTP, for --server")
+    serve_parser.add_argument("--host", default=SERVER_HOST)
+    serve_parser.add_argument("--port", type=int, default=SERVER_PORT)
+    serve_parser.add_argument("--log", help="log file to serve, the script's own log if not given")
+    serve_parser.set_defaults(run=batch_serve)
+
+    return parser
+
+
+def batch_main(argv):
+    """
+    Runs a command given on the command line
+    :param argv: [string] ... command line arguments
+    :return: integer ... exit status
+    """
+    arguments = make_argument_parser().parse_args(argv)
+    if arguments.profile or arguments.profile_dump:
+        start_profiling(arguments.profile_dump)
+    if arguments.server:
+        set_task_store(RemoteStore(arguments.server))
+    if arguments.command is None:
+        return main()
+    if arguments.command == "search":
+        conditions = [arguments.date, arguments.range, arguments.minutes, arguments.text, arguments.pattern,
+                      arguments.contains]
+        if arguments.minutes and len(arguments.minutes) > 2:
+            make_argument_parser().error("--minutes takes one or two numbers")
+        if arguments.fuzzy is not None and any(condition is not None for condition in conditions):
+            make_argument_parser().error("--fuzzy can't be given with other conditions")
+        if arguments.fuzzy is None and all(condition is None for condition in conditions):
+            make_argument_parser().error("give at least one condition to search for")
+    return arguments.run(arguments)
@@ -0,0 +1,922 @@
+"""
+Tasks, dates, words and queries as every part of the work log sees them, and the profiler
+
+"""
+import atexit
+import cProfile
+import importlib
+import itertools
+import re
+import sys
+import threading
+import time
+import zlib
+from bisect import bisect_right
+from datetime import date, datetime
+from functools import lru_cache, wraps
+
+
+# constants
+
+DATE_FORMAT = "%d/%m/%Y"
+DATE_CACHE_SIZE = 8192  # dates kept parsed, and ordinals kept formatted, over 20 years of days, see date_to_ordinal
+
+WORD_PATTERN = r"\w+"  # what the word index takes as a word
+FUZZY_MIN_SCORE = 0.3  # share of the trigrams of a fuzzy search that a task must have to be found
+# an escape in a regular expression starting with a letter or digit, as far as it goes, see required_texts
+PATTERN_ESCAPE = r"\\(x[0-9a-fA-F]{0,2}|u[0-9a-fA-F]{0,4}|U[0-9a-fA-F]{0,8}|N\{[^}]*\}|[0-9]+|.?)"
+QUERY_CONDITIONS = ("date", "minutes", "text", "contains", "pattern")  # what a Query can ask for, see Query
+# how long checking a row for each condition takes, against 1 for the date, see TaskStore.run_query
+QUERY_CHECK_COSTS = {"date": 1, "minutes": 1, "text": 10, "contains": 11, "pattern": 12}
+# likewise, finding a row with the index of each condition, for each word or trigram looked up, or finding it in a set
+QUERY_INDEX_COSTS = {"date": 0.5, "minutes": 0.5, "text": 4, "contains": 4, "pattern": 4, "set": 0.5}
+QUERY_MOST_MINUTES = 2 ** 31 - 1  # what a query without a largest minutes asks for, the most that array('i') holds
+PROFILER = None  # Profiler, only while profiling, see start_profiling
+
+REPORT_PERIODS = ("day", "week", "month", "range")  # what make_time_report can group the tasks by
+
+
+# Classes
+
+class Task():
+    __slots__ = ("description", "time_spent", "notes", "task_date", "task_id")
+
+    def __init__(self, description, time_spent, notes, task_date, task_id=None):
+        """
+        Creates a task entry
+
+        :param description: string ... Task description
+        :param time_spent: integer ... Time spent on the task in minutes
+        :param notes: string Notes ... Can be empty
+        :param task_date: datetime ... either supplied by the logger or supplied by the system
+        :param task_id: integer ... id of the task in its log, which it keeps when edited, None for a new task
+        """
+        self.description = description
+        self.time_spent = time_spent
+        self.notes = notes
+        self.task_date = task_date
+        self.task_id = task_id
+
+    def __eq__(self, other):
+        return task_to_row(self) == task_to_row(other)
+
+    def show_task(self):
+        """
+        Shows the Task on Screen
+        :return: None
+        """
+        print("\v")
+        print("-" * 12)
+        print("Task Date:", self.task_date)
+        print("Description:", self.description)
+        print("Time Spent:", self.time_spent)
+        print("\v")
+        if self.notes:
+            print("Notes")
+            print("----")
+            print(self.notes)
+        else:
+            print("Task without notes")
+        print("")
+        print("=" * 12)
+        print("\v")
+
+
+class TaskRow(Task):
+    __slots__ = ("table", "row_id")
+
+    def __init__(self, table, row_id):
+        """
+        A task read from a row of a TaskTable, its fields come from the table columns when they are asked for
+
+        :param table: TaskTable
+        :param row_id: integer ... row number in the table, which is the row number in the log file too
+        """
+        self.table = table
+        self.row_id = row_id
+
+    @property
+    def description(self):
+        return self.table.get_description(self.row_id)
+
+    @property
+    def time_spent(self):
+        return self.table.minutes[self.row_id]
+
+    @property
+    def notes(self):
+        return self.table.get_notes(self.row_id)
+
+    @property
+    def task_date(self):
+        return ordinal_to_date(self.table.ordinals[self.row_id])
+
+    @property
+    def task_id(self):
+        return self.table.ids[self.row_id] or None
+
+
+class StoredTask(Task):
+    __slots__ = ("row_id",)
+
+    def __init__(self, row_id, description, time_spent, notes, task_date, task_id=None):
+        """
+        A task read from a SqliteStore or a PartitionedStore
+
+        :param row_id: integer ... id of the task in the database, or in the PartitionedStore it came from
+        """
+        super().__init__(description, time_spent, notes, task_date, task_id)
+        self.row_id = row_id
+
+
+class Query():
+    def __init__(self, date=None, minutes=None, text=None, contains=None, pattern=None):
+        """
+        Conditions that the tasks found by LogStore.run_query must all meet. Any of them may be left out, and a query
+        without any finds every task.
+
+        :param date: string or (string, string) ... a dd/mm/yyyy date, or the first and last dates of a range
+        :param minutes: integer or (integer, integer) ... exact minutes spent, or the smallest and largest of a range,
+        either of them None for no limit
+        :param text: string ... exact words in the description or the notes, see LogStore.find_by_phrase
+        :param contains: string ... text anywhere in the description or the notes, in any case
+        :param pattern: string or compiled regular expression ... to look for in the description or the notes
+        """
+        self.dates = None  # (first date, last date), dd/mm/yyyy
+        self.ordinals = None  # the same dates as ordinals
+        if date is not None:
+            self.dates = (date, date) if isinstance(date, str) else tuple(date)
+            self.ordinals = tuple(date_to_ordinal(task_date) for task_date in self.dates)
+        self.minutes = None  # (smallest, largest)
+        if minutes is not None:
+            first_minutes, last_minutes = (minutes, minutes) if isinstance(minutes, int) else minutes
+            self.minutes = (first_minutes or 0, QUERY_MOST_MINUTES if last_minutes is None else last_minutes)
+        self.text = text
+        self.has_text = None if text is None else phrase_matcher(text)  # tells whether a text has it as whole words
+        self.contains = contains
+        self.pattern = pattern
+        if isinstance(pattern, str):
+            self.pattern = re.compile(pattern)
+
+    def get_conditions(self):
+        """
+        :return: [string] ... the conditions asked for, in the order of QUERY_CONDITIONS
+        """
+        values = (self.dates, self.minutes, self.text, self.contains, self.pattern)
+        return [condition for condition, value in zip(QUERY_CONDITIONS, values) if value is not None]
+
+    def describe(self, condition):
+        """
+        :param condition: string ... one of QUERY_CONDITIONS
+        :return: string ... the condition as asked for, e.g. for QueryPlan
+        """
+        if condition == "date":
+            return "date " + (self.dates[0] if self.dates[0] == self.dates[1] else "{} to {}".format(*self.dates))
+        if condition == "minutes":
+            if self.minutes[1] == QUERY_MOST_MINUTES:
+                return "minutes {} or more".format(self.minutes[0])
+            return "minutes " + (str(self.minutes[0]) if self.minutes[0] == self.minutes[1] else
+                                 "{} to {}".format(*self.minutes))
+        if condition == "text":
+            return 'text "{}"'.format(self.text)
+        if condition == "contains":
+            return 'contains "{}"'.format(self.contains)
+        return "pattern /{}/".format(self.pattern.pattern)
+
+    def get_check(self, condition, table):
+        """
+        :param condition: string ... one of QUERY_CONDITIONS
+        :param table: TaskTable
+        :return: function ... called with a row number of the table, tells whether the row meets the condition
+        """
+        if condition == "date":
+            first_ordinal, last_ordinal = self.ordinals
+            return lambda row_id: first_ordinal <= table.ordinals[row_id] <= last_ordinal
+        if condition == "minutes":
+            first_minutes, last_minutes = self.minutes
+            return lambda row_id: first_minutes <= table.minutes[row_id] <= last_minutes
+        if condition == "text":
+            has_text = self.has_text
+            return lambda row_id: has_text(table.get_description(row_id)) or has_text(table.get_notes(row_id))
+        if condition == "contains":
+            folded_text = self.contains.casefold()
+            return lambda row_id: (folded_text in table.get_description(row_id).casefold() or
+                                   folded_text in table.get_notes(row_id).casefold())
+        search = self.pattern.search
+        return lambda row_id: bool(search(table.get_description(row_id)) or search(table.get_notes(row_id)))
+
+    def matches(self, task):
+        """
+        :param task: Task
+        :return: boolean ... whether the task meets every condition
+        """
+        if self.ordinals and not self.ordinals[0] <= date_to_ordinal(task.task_date) <= self.ordinals[1]:
+            return False
+        if self.minutes and not self.minutes[0] <= int(task.time_spent) <= self.minutes[1]:
+            return False
+        if self.text is not None and not (self.has_text(task.description) or self.has_text(task.notes)):
+            return False
+        if self.contains is not None and (self.contains.casefold() not in task.description.casefold() and
+                                          self.contains.casefold() not in task.notes.casefold()):
+            return False
+        return self.pattern is None or bool(self.pattern.search(task.description) or self.pattern.search(task.notes))
+
+    def to_json(self):
+        """
+        :return: dictionary ... the query as the query server takes it
+        """
+        return {"date": self.dates and list(self.dates), "minutes": self.minutes and list(self.minutes),
+                "text": self.text, "contains": self.contains, "pattern": self.pattern and self.pattern.pattern,
+                "flags": self.pattern.flags if self.pattern else 0}
+
+    @staticmethod
+    def from_json(query_json):
+        """
+        :param query_json: dictionary ... see to_json
+        :return: Query
+        """
+        pattern = query_json.get("pattern")
+        return Query(query_json.get("date"), query_json.get("minutes"), query_json.get("text"),
+                     query_json.get("contains"), None if pattern is None else re.compile(pattern,
+                                                                                         query_json.get("flags", 0)))
+
+
+class QueryPlan():
+    def __init__(self):
+        """
+        How LogStore.run_query answered a query, to explain it on request: the steps taken, each with the rows the
+        indexes said it would leave, the rows it did leave and how long it took. A query run on several parts of a log,
+        e.g. the months of a PartitionedStore, adds up the same steps of every part, counting the parts that took them.
+        """
+        self.steps = []  # [what, how, times taken, rows estimated or None, rows left or None, milliseconds or None]
+        self.notes = []  # [string] ... anything else worth telling, e.g. the parts of the log left out
+
+    def add_step(self, what, how, estimated_rows, rows, milliseconds):
+        """
+        :param what: string ... the condition, see Query.describe, or what else the step did
+        :param how: string
+        :param estimated_rows: integer ... None if not estimated
+        :param rows: integer ... rows left after the step, None if not known
+        :param milliseconds: float ... None if not timed
+        :return: None
+        """
+        self.add_steps([[what, how, 1, estimated_rows, rows, milliseconds]])
+
+    def add_steps(self, steps):
+        """
+        :param steps: [list] ... see self.steps
+        :return: None
+        """
+        for new_step in steps:
+            for step in self.steps:
+                if step[:2] == new_step[:2]:
+                    step[2:] = [None if old is None or new is None else old + new
+                                for old, new in zip(step[2:], new_step[2:])]
+                    break
+            else:
+                self.steps.append(list(new_step))
+
+    def add_note(self, note):
+        """
+        :param note: string
+        :return: None
+        """
+        if note not in self.notes:
+            self.notes.append(note)
+
+    def add_plan(self, plan_json):
+        """
+        Adds the steps and notes of another plan, e.g. one sent by the query server
+        :param plan_json: dictionary ... see to_json
+        :return: None
+        """
+        for note in plan_json["notes"]:
+            self.add_note(note)
+        self.add_steps(plan_json["steps"])
+
+    def to_json(self):
+        """
+        :return: dictionary ... steps and notes
+        """
+        return {"steps": self.steps, "notes": self.notes}
+
+    def explain(self):
+        """
+        :return: [string] ... lines of text, the notes and then a line for each step
+        """
+        lines = list(self.notes)
+        lines.append("{:<32} {:<44} {:>5} {:>9} {:>9} {:>9}".format("step", "how", "times", "estimated", "rows", "ms"))
+        for what, how, times, estimated_rows, rows, milliseconds in self.steps:
+            lines.append("{:<32} {:<44} {:>5} {:>9} {:>9} {:>9}".format(
+                what, how, times, "" if estimated_rows is None else estimated_rows, "" if rows is None else rows,
+                "" if milliseconds is None else "{:.2f}".format(milliseconds)))
+        return lines
+
+
+# Auxiliary Functions
+
+def lazy_import(module_name):
+    """
+    Imports a module the first time a function needs it. The rest of the standard library is imported at the top of
+    each module, but numpy is slow to import and optional, and sqlite3 and asyncio are only needed by SQLite logs and
+    the query server, so adding a task doesn't pay for them. make_store imports the server module this way too, as
+    the server module imports the stores.
+    :param module_name: string
+    :return: module ... ImportError if it is not installed
+    """
+    return importlib.import_module(module_name)
+
+
+def get_task_date():
+    """
+    generates today's date from system clock
+    :return: string ... "dd/mm/yyyy"
+    """
+    return ordinal_to_date(date.today().toordinal())
+
+
+@lru_cache(maxsize=DATE_CACHE_SIZE)
+def date_to_ordinal(date_string):
+    """
+    Turns a date into an integer that keeps the order of dates, see ordinal_to_date. dd/mm/yyyy is taken apart by
+    hand, several times faster than strptime, which still takes anything else, e.g. 1/2/2016, so the same dates are
+    accepted and the same ValueError raised.
+    :param date_string: string ... dd/mm/yyyy
+    :return: integer ... proleptic Gregorian ordinal
+    """
+    if DATE_FORMAT == "%d/%m/%Y" and len(date_string) == 10 and date_string[2] == "/" and date_string[5] == "/":
+        day, month, year = date_string[:2], date_string[3:5], date_string[6:]
+        digits = day + month + year
+        if digits.isdigit() and digits.isascii():  # strptime doesn't take other scripts' digits, int() does
+            try:
+                return date(int(year), int(month), int(day)).toordinal()
+            except ValueError:
+                pass  # a day that doesn't exist, strptime raises the error with its usual message
+    return datetime.strptime(date_string, DATE_FORMAT).toordinal()
+
+
+@lru_cache(maxsize=DATE_CACHE_SIZE)
+def ordinal_to_date(ordinal):
+    """
+    Turns an ordinal back into a date, formatting it by hand rather than with strftime, and remembering the last
+    DATE_CACHE_SIZE dates formatted, see date_to_ordinal
+    :param ordinal: integer
+    :return: string ... dd/mm/yyyy
+    """
+    day = date.fromordinal(ordinal)
+    if DATE_FORMAT == "%d/%m/%Y" and day.year >= 1000:
+        return "{:02d}/{:02d}/{}".format(day.day, day.month, day.year)
+    return day.strftime(DATE_FORMAT)
+
+
+def task_from_row(row):
+    """
+    Makes a Task out of a log file row, the same way it would be read back from the csv file
+    :param row: [string] ... date, description, time spent, notes
+    :return: Task
+    """
+    row = ["" if field is None else str(field) for field in row]
+    return Task(task_date=row[0], description=row[1], time_spent=row[2], notes=row[3])
+
+
+def task_to_row(task, with_id=False):
+    """
+    Makes a log file row out of a Task
+    :param task: Task
+    :param with_id: boolean ... whether to add the id of the task, if it has one, for it to keep it when written
+    :return: [string] ... date, description, time spent, notes and, if asked for, id
+    """
+    row = [task.task_date, task.description, str(task.time_spent), task.notes]
+    if with_id and task.task_id is not None:
+        row.append(str(task.task_id))
+    return row
+
+
+def with_ids(rows, new_ids):
+    """
+    Gives ids to the rows that have none
+    :param rows: iterable of [string] ... rows as normalize_row makes them
+    :param new_ids: iterator of integer ... ids that no task has
+    :return: generator of [string] ... the rows, each with an id
+    """
+    for row in rows:
+        yield row if len(row) > 4 and row[4] else row[:4] + [str(next(new_ids))]
+
+
+def normalize_row(row):
+    """
+    Makes a row look the way the log file keeps it, with the date as dd/mm/yyyy and the minutes as a whole number
+    :param row: [string] ... date, description, time spent, notes and, optionally, id
+    :return: [string] ... with the id, as a whole number, only if the row had one
+    """
+    task_id = [str(int(row[4]))] if len(row) > 4 and row[4] not in (None, "") else []
+    row = task_to_row(task_from_row(row))
+    return [ordinal_to_date(date_to_ordinal(row[0])), row[1], str(int(row[2])), row[3]] + task_id
+
+
+def validate_minutes(raw_minutes):
+    """
+    Checks minutes the way add and the menu take them: a whole number, without a sign
+    :param raw_minutes: string or integer
+    :return: integer
+    """
+    if not str(raw_minutes).isnumeric():
+        raise ValueError("minutes must be a whole number, found {!r}".format(raw_minutes))
+    return int(raw_minutes)
+
+
+def phrase_matcher(phrase):
+    """
+    Tells whether texts contain a phrase as whole words: where the phrase starts or ends with a letter or digit, the
+    text must not go on with another one, so "the app" is in "deploy the app." but not in "the apple"
+    :param phrase: string ... as typed, the case matters
+    :return: function ... called with a text, returns boolean
+    """
+    start = r"(?<!\w)" if re.match(r"\w", phrase) else ""
+    end = r"(?!\w)" if re.search(r"\w$", phrase) else ""
+    search = re.compile(start + re.escape(phrase) + end).search
+    return lambda text: search(text) is not None
+
+
+def split_words(text):
+    """
+    Splits a text into the words that the word index uses
+    :param text: string
+    :return: [string] ... lower case words
+    """
+    return re.findall(WORD_PATTERN, text.lower())
+
+
+def task_words(task):
+    """
+    The different words in the description and notes of a task
+    :param task: Task
+    :return: {string} ... lower case words
+    """
+    return set(split_words(task.description)) | set(split_words(task.notes))
+
+
+def text_trigrams(text):
+    """
+    The trigrams of a text for the trigram index: case folded, with a space before and after so that the start and the
+    end of the text count too
+    :param text: string
+    :return: {string}
+    """
+    text = " " + text.casefold() + " "
+    return {text[i:i + 3] for i in range(len(text) - 2)}
+
+
+def task_trigrams(task):
+    """
+    The different trigrams in the description and notes of a task
+    :param task: Task
+    :return: {string}
+    """
+    if not task.notes:
+        return text_trigrams(task.description)
+    return text_trigrams(task.description) | text_trigrams(task.notes)
+
+
+def required_texts(pattern):
+    """
+    Pieces of plain text that every match of a regular expression contains, to look them up in the trigram index.
+    Only the top level of the pattern is looked at: groups, sets and escapes like \\d or \\x20 end a piece, repeats
+    that may be zero take back the character before them, and a | at the top level means that nothing is certain.
+    :param pattern: compiled regular expression
+    :return: [string] ... case folded, none if nothing is certain
+    """
+    if not isinstance(pattern.pattern, str) or pattern.flags & re.VERBOSE:
+        return []
+    source = pattern.pattern
+    texts, text = [], ""
+    i = 0
+    while i < len(source):
+        char = source[i]
+        if char == "\\" and i + 1 < len(source) and not source[i + 1].isalnum():
+            text += source[i + 1]
+            i += 2
+            continue
+        if char in "*?":
+            text = text[:-1]  # the character before may not be there at all
+        elif char == "{":
+            repeat = re.match(r"\{\d*(,\d*)?\}", source[i:])
+            if repeat:
+                text = text[:-1]
+                i += len(repeat.group(0)) - 1
+        elif char == "|":
+            return []
+        elif char in "([":
+            i = skip_pattern_group(source, i)
+        elif char == "\\":
+            # the whole escape, e.g. \d, \x20, \u00e9, \N{...}, \1 or \012, none of it is plain text
+            i += len(re.match(PATTERN_ESCAPE, source[i:]).group(0)) - 1
+        elif char not in "+.^$":
+            text += char
+            i += 1
+            continue
+        texts.append(text)
+        text = ""
+        i += 1
+    texts.append(text)
+    return [text.casefold() for text in texts if text]
+
+
+def skip_pattern_group(source, start):
+    """
+    Finds the end of a group or a set in a regular expression
+    :param source: string ... the pattern
+    :param start: integer ... position of the ( or the [
+    :return: integer ... position of the matching ) or ], the end of the pattern if there is none
+    """
+    depth = 0
+    i = start
+    while i < len(source):
+        char = source[i]
+        if char == "\\":
+            i += 1
+        elif char == "[":
+            i += 1
+            if i < len(source) and source[i] == "^":
+                i += 1
+            if i < len(source) and source[i] == "]":
+                i += 1  # a ] right after the [ is part of the set
+            while i < len(source) and source[i] != "]":
+                i += 2 if source[i] == "\\" else 1
+            if not depth:
+                return i
+        elif char == "(":
+            depth += 1
+        elif char == ")":
+            depth -= 1
+            if not depth:
+                return i
+        i += 1
+    return i
+
+
+def row_fingerprint(row, with_id=True):
+    """
+    A short checksum of a log file row, used by the journal to make sure a row is still the one it refers to. The id
+    is part of it, so that a record is not taken for another task with the same fields.
+    :param row: [string] ... date, description, time spent, notes, id
+    :param with_id: boolean ... False to leave the id out, as journals written before tasks had ids did
+    :return: string ... 8 hex digits
+    """
+    return format(zlib.crc32("\x1f".join(row[:5] if with_id else row[:4]).encode("utf-8")), "08x")
+
+
+def sort_by_date(tasks):
+    """
+    :param tasks: [Task]
+    :return: [Task] ... ordered by date, those of the same date in the order they were given
+    """
+    ordinals = {}  # dd/mm/yyyy: ordinal, as most tasks share their date with others
+    for task in tasks:
+        if task.task_date not in ordinals:
+            ordinals[task.task_date] = date_to_ordinal(task.task_date)
+    return sorted(tasks, key=lambda task: ordinals[task.task_date])
+
+
+def search_cost(condition, estimate, live_rows):
+    """
+    What finding the rows that meet a condition of a query on their own costs, see QUERY_CHECK_COSTS
+    :param condition: string ... one of QUERY_CONDITIONS
+    :param estimate: (integer, float) ... see TaskStore.estimate_rows
+    :param live_rows: integer ... rows of the table
+    :return: float
+    """
+    if estimate is None:
+        return live_rows * QUERY_CHECK_COSTS[condition]
+    rows, find_cost = estimate
+    return find_cost + (0 if condition in ("date", "minutes") else rows * QUERY_CHECK_COSTS[condition])
+
+
+def narrow_cost(condition, estimate, rows):
+    """
+    What keeping those of some rows that meet a condition of a query costs: checking each of them, or intersecting them
+    with the rows that its index leaves, and then checking those for the texts
+    :param condition: string ... one of QUERY_CONDITIONS
+    :param estimate: (integer, float) ... see TaskStore.estimate_rows
+    :param rows: number ... rows to narrow down
+    :return: (float, boolean) ... the cost, and whether intersecting costs less than checking
+    """
+    check_cost = rows * QUERY_CHECK_COSTS[condition]
+    if estimate is None:
+        return check_cost, False
+    estimated_rows, find_cost = estimate
+    intersect_cost = find_cost + rows * QUERY_INDEX_COSTS["set"]
+    if condition not in ("date", "minutes"):
+        intersect_cost += min(rows, estimated_rows) * QUERY_CHECK_COSTS[condition]
+    return min(check_cost, intersect_cost), intersect_cost < check_cost
+
+
+def order_conditions(estimates, live_rows):
+    """
+    The order in which the conditions of a query cost least, trying every order: a query has five conditions at most.
+    Each condition is taken to keep the same share of any rows as of the whole table, the share its index estimates.
+    :param estimates: dictionary ... condition: estimate, see TaskStore.estimate_rows
+    :param live_rows: integer ... rows of the table
+    :return: [string] ... conditions
+    """
+    if not estimates:
+        return []
+    live_rows = max(live_rows, 1)
+
+    def order_cost(order):
+        cost = search_cost(order[0], estimates[order[0]], live_rows)
+        rows = live_rows if estimates[order[0]] is None else estimates[order[0]][0]
+        for condition in order[1:]:
+            cost += narrow_cost(condition, estimates[condition], rows)[0]
+            if estimates[condition] is not None:
+                rows = rows * min(estimates[condition][0], live_rows) / live_rows
+        return cost
+
+    return list(min(itertools.permutations(sorted(estimates, key=QUERY_CONDITIONS.index)), key=order_cost))
+
+
+def nearest_rank(percent, count):
+    """
+    Where the given percentile is among sorted values, by the nearest rank method
+    :param percent: number ... from 0 to 100
+    :param count: integer ... number of values, at least 1
+    :return: integer ... position of the percentile in the sorted values, from 0
+    """
+    rank = -(-percent * count // 100)  # rounded up
+    return max(int(rank) - 1, 0)
+
+
+def rows_to_stored_tasks(first_row_id, tasks):
+    """
+    Copies tasks read from the TaskStore of a part of a log, giving them the row ids of the whole log
+    :param first_row_id: integer ... row id of the whole log for the first row of the part
+    :param tasks: [TaskRow]
+    :return: [StoredTask]
+    """
+    dates = {}  # ordinal: dd/mm/yyyy, as most tasks share their date with others
+    stored_tasks = []
+    for task in tasks:
+        ordinal = task.table.ordinals[task.row_id]
+        if ordinal not in dates:
+            dates[ordinal] = ordinal_to_date(ordinal)
+        stored_tasks.append(StoredTask(first_row_id + task.row_id, task.description, task.time_spent, task.notes,
+                                       dates[ordinal], task.task_id))
+    return stored_tasks
+
+
+def merged_percentile(sorted_minutes, percent):
+    """
+    The minutes that a given percentage of the tasks of several parts of a log don't go over, found by halving the
+    range of minutes until the tasks of every part that don't go over it are enough, without merging the parts
+    :param sorted_minutes: [array] ... minutes of the tasks of each part, in order
+    :param percent: number ... from 0 to 100
+    :return: integer ... None if there are no tasks
+    """
+    sorted_minutes = [minutes for minutes in sorted_minutes if minutes]
+    if not sorted_minutes:
+        return None
+    rank = nearest_rank(percent, sum(len(minutes) for minutes in sorted_minutes))
+    low, high = min(minutes[0] for minutes in sorted_minutes), max(minutes[-1] for minutes in sorted_minutes)
+    while low < high:
+        middle = (low + high) // 2
+        if sum(bisect_right(minutes, middle) for minutes in sorted_minutes) > rank:
+            high = middle
+        else:
+            low = middle + 1
+    return low
+
+
+# Profiling
+
+class Profiler():
+    def __init__(self, dump_file_name=None):
+        """
+        What is measured while profiling, see start_profiling: calls, time and rows returned by phase, and counters
+        such as cache hits, all grouped by the command they happened in. The command is the outermost phase running
+        in the thread.
+
+        :param dump_file_name: string ... where to save cProfile stats on exit, None to not run cProfile
+        """
+        self.phases = {}  # command: {phase: [calls, seconds, rows]}
+        self.counters = {}  # command: {counter: [hits, misses] or [amount]}
+        self.running = threading.local()  # command and depth of the phases running in each thread
+        self.lock = threading.Lock()
+        self.dump_file_name = dump_file_name
+        self.profile = None  # cProfile.Profile
+
+    def get_command(self):
+        return getattr(self.running, "command", None) or "(outside commands)"
+
+    def measure(self, phase, function, args, kwargs):
+        """
+        Calls a function and measures the call, see profiled
+        :param phase: string ... name for the function in the summary
+        :param function: function
+        :param args: tuple ... its positional arguments
+        :param kwargs: dictionary ... its keyword arguments
+        :return: what the function returns
+        """
+        running = self.running
+        depth = getattr(running, "depth", 0)
+        if not depth:
+            running.command = phase
+        running.depth = depth + 1
+        rows = 0
+        start = time.perf_counter()
+        try:
+            result = function(*args, **kwargs)
+            if isinstance(result, list):
+                rows = len(result)
+            return result
+        finally:
+            elapsed = time.perf_counter() - start
+            running.depth = depth
+            with self.lock:
+                figures = self.phases.setdefault(running.command, {}).setdefault(phase, [0, 0.0, 0])
+                figures[0] += 1
+                figures[1] += elapsed
+                figures[2] += rows
+            if not depth:
+                running.command = None
+
+    def count(self, counter, amount=1):
+        """
+        Adds to a counter of the running command
+        :param counter: string
+        :param amount: number
+        :return: None
+        """
+        with self.lock:
+            self.counters.setdefault(self.get_command(), {}).setdefault(counter, [0])[0] += amount
+
+    def count_hit(self, cache, hit, amount=1):
+        """
+        Counts hits or misses of a cache, for the running command
+        :param cache: string
+        :param hit: boolean
+        :param amount: integer ... how many
+        :return: None
+        """
+        with self.lock:
+            self.counters.setdefault(self.get_command(), {}).setdefault(cache, [0, 0])[0 if hit else 1] += amount
+
+    def print_summary(self, file=None):
+        """
+        Prints the phases of each command, slowest first, and its counters
+        :param file: text file ... the standard error if not given
+        :return: None
+        """
+        file = file or sys.stderr
+        print("\nworklog profile, times include the phases inside", file=file)
+        for command in sorted(set(self.phases) | set(self.counters)):
+            print(command, file=file)
+            phases = self.phases.get(command, {})
+            for phase in sorted(phases, key=lambda name: -phases[name][1]):
+                calls, seconds, rows = phases[phase]
+                print("  {:<36} {:>8} calls {:>11.1f} ms{}".format(
+                    phase, calls, seconds * 1000, " {:>9} rows".format(rows) if rows else ""), file=file)
+            for counter, figures in sorted(self.counters.get(command, {}).items()):
+                if len(figures) == 2:
+                    print("  {:<36} {:>8} hits {:>6} misses {:>5.0%}".format(
+                        counter, figures[0], figures[1], figures[0] / (figures[0] + figures[1])), file=file)
+                else:
+                    print("  {:<36} {:>8}".format(counter, figures[0]), file=file)
+
+    def finish(self):
+        """
+        Prints the summary and saves the cProfile stats, on exit
+        :return: None
+        """
+        if self.profile is not None:
+            self.profile.disable()
+            self.profile.dump_stats(self.dump_file_name)
+            print("cProfile stats saved to {}".format(self.dump_file_name), file=sys.stderr)
+        self.print_summary()
+
+
+def profiled(function):
+    """
+    Decorator for the functions and methods that the profile measures, by their qualified name. While not profiling
+    a call only costs a look at PROFILER.
+    :param function: function
+    :return: function ... the wrapper
+    """
+    phase = function.__qualname__.replace(".__init__", "")
+
+    @wraps(function)
+    def measured(*args, **kwargs):
+        profiler = PROFILER
+        if profiler is None:
+            return function(*args, **kwargs)
+        return profiler.measure(phase, function, args, kwargs)
+
+    return measured
+
+
+def count(counter, amount=1):
+    """
+    Adds to a counter of the running command while profiling, see Profiler.count
+    :param counter: string
+    :param amount: number
+    :return: None
+    """
+    if PROFILER:
+        PROFILER.count(counter, amount)
+
+
+def count_hit(cache, hit, amount=1):
+    """
+    Counts hits or misses of a cache while profiling, see Profiler.count_hit
+    :param cache: string
+    :param hit: boolean
+    :param amount: integer ... how many
+    :return: None
+    """
+    if PROFILER:
+        PROFILER.count_hit(cache, hit, amount)
+
+
+def start_profiling(dump_file_name=None):
+    """
+    Measures the script from now until it exits, when it prints a summary to the standard error. The functions
+    measured are the ones marked with profiled.
+    :param dump_file_name: string ... where to save cProfile stats on exit too, to look at them with pstats
+    :return: Profiler
+    """
+    global PROFILER
+    if PROFILER:
+        return PROFILER
+    profiler = Profiler(dump_file_name)
+    if dump_file_name:
+        profiler.profile = cProfile.Profile()
+        profiler.profile.enable()
+    atexit.register(profiler.finish)
+    PROFILER = profiler
+    return profiler
+
+
+# Reports
+
+@profiled
+def make_time_report(ordinals, minutes, period, first_date=None, last_date=None, percents=(50, 90)):
+    """
+    Groups tasks by period and works out, for each one, how many tasks there are and the total, mean and percentiles
+    of the minutes spent on them. The tasks are sorted once by period and minutes with NumPy, and then every
+    figure comes from the sorted arrays at once: totals by np.add.reduceat over where each period starts, and
+    percentiles by indexing each period at its nearest rank.
+    :param ordinals: array('i') ... date ordinal of each task
+    :param minutes: array('i') ... minutes spent on each task
+    :param period: string ... day, week (ISO, from Monday), month or range (all the tasks together)
+    :param first_date: string ... dd/mm/yyyy, leaves out the tasks before it
+    :param last_date: string ... dd/mm/yyyy, leaves out the tasks after it
+    :param percents: (number) ... percentiles to work out, from 0 to 100
+    :return: [[string, integer, integer, float, integer...]] ... one row for each period that has tasks, in order:
+    the period as dd/mm/yyyy, yyyy-Www, mm/yyyy or first date - last date, the number of tasks, total minutes,
+    mean minutes, and then each percentile
+    """
+    numpy = lazy_import("numpy")
+    if period not in REPORT_PERIODS:
+        raise ValueError("period must be one of {}".format(", ".join(REPORT_PERIODS)))
+    ordinals = numpy.frombuffer(ordinals, dtype=numpy.intc).astype(numpy.int64)
+    minutes = numpy.frombuffer(minutes, dtype=numpy.intc).astype(numpy.int64)
+    if first_date is not None or last_date is not None:
+        in_range = numpy.ones(len(ordinals), dtype=bool)
+        if first_date is not None:
+            in_range &= ordinals >= date_to_ordinal(first_date)
+        if last_date is not None:
+            in_range &= ordinals <= date_to_ordinal(last_date)
+        ordinals, minutes = ordinals[in_range], minutes[in_range]
+    if not len(ordinals):
+        return []
+
+    if period == "day":
+        keys = ordinals
+    elif period == "week":
+        keys = ordinals - (ordinals - 1) % 7  # the Monday of the week, as day 1 was a Monday
+    elif period == "month":
+        keys = (ordinals - date(1970, 1, 1).toordinal()).astype("datetime64[D]").astype("datetime64[M]")
+        keys = keys.astype(numpy.int64)  # months since January 1970
+    else:
+        keys = numpy.zeros(len(ordinals), dtype=numpy.int64)
+
+    # one sort of period and minutes packed together, far quicker than sorting by two keys
+    first_key, least_minutes = int(keys.min()), int(minutes.min())
+    packed = numpy.sort(((keys - first_key) << 32) | (minutes - least_minutes))
+    keys, minutes = (packed >> 32) + first_key, (packed & 0xFFFFFFFF) + least_minutes
+    starts = numpy.flatnonzero(numpy.concatenate(([True], keys[1:] != keys[:-1])))
+    counts = numpy.diff(numpy.append(starts, len(keys)))
+    totals = numpy.add.reduceat(minutes, starts)
+    percentiles = [minutes[starts + numpy.maximum(numpy.ceil(percent * counts / 100).astype(numpy.int64) - 1, 0)]
+                   for percent in percents]  # nearest rank, as in nearest_rank
+
+    if period == "day":
+        labels = [ordinal_to_date(key) for key in keys[starts].tolist()]
+    elif period == "week":
+        labels = ["{}-W{:02d}".format(*date.fromordinal(key).isocalendar()[:2]) for key in keys[starts].tolist()]
+    elif period == "month":
+        labels = ["{:02d}/{}".format(key % 12 + 1, 1970 + key // 12) for key in keys[starts].tolist()]
+    else:
+        labels = ["{} - {}".format(first_date or ordinal_to_date(int(ordinals.min())),
+                                   last_date or ordinal_to_date(int(ordinals.max())))]
+    return [[label, count, total, total / count] + list(figures) for label, count, total, *figures in
+            zip(labels, counts.tolist(), totals.tolist(), *(column.tolist() for column in percentiles))]
@@ -0,0 +1,494 @@
+"""
+The columns of a log kept in memory, and the indexes built on them to search it
+
+"""
+import collections
+from array import array
+from bisect import bisect_left, bisect_right, insort
+
+from .core import TaskRow, date_to_ordinal, nearest_rank, ordinal_to_date, profiled, task_words, text_trigrams
+
+
+# Classes
+
+class TaskTable():
+    def __init__(self):
+        """
+        Keeps the tasks of a log by columns instead of as one object per task: dates as ordinals and minutes in typed
+        arrays, descriptions and notes encoded one after the other in a single buffer. Row numbers are the row numbers
+        in the log file, so deleted rows stay, marked as such, until the log is saved again. Each row also has the id
+        of its task, which unlike the row number stays the same when the log is saved.
+        """
+        self.ordinals = array('i')
+        self.minutes = array('i')
+        self.text = bytearray()  # descriptions and notes, utf-8
+        self.text_offsets = array('q')  # start and end in text of the description and then of the notes of each row
+        self.log_offsets = array('q')  # where each row starts in the log file, -1 once the row has been edited
+        self.alive = bytearray()  # 1 for the rows still in the log, 0 for the deleted ones
+        self.live_rows = 0
+        self.ids = array('q')  # id of the task of each row, 0 for rows written before tasks had ids
+        self.max_id = 0
+
+    def __len__(self):
+        return len(self.alive)
+
+    def add_text(self, text):
+        """
+        Adds a string to the text buffer
+        :param text: string
+        :return: (integer, integer) ... where it starts and ends in the buffer
+        """
+        start = len(self.text)
+        self.text += text.encode("utf-8")
+        return start, len(self.text)
+
+    def get_text(self, i):
+        """
+        Reads a string from the text buffer
+        :param i: integer ... index in text_offsets of where the string starts
+        :return: string
+        """
+        return self.text[self.text_offsets[i]:self.text_offsets[i + 1]].decode("utf-8")
+
+    def append(self, row, log_offset=-1, ordinal=None):
+        """
+        Adds a row at the end of the table
+        :param row: [string] ... date, description, time spent, notes and, if it has one, id
+        :param log_offset: integer ... where the row starts in the log file
+        :param ordinal: integer ... date ordinal of the row, if the caller has it already
+        :return: integer ... row number
+        """
+        if ordinal is None:
+            ordinal = date_to_ordinal(row[0])
+        minutes = int(row[2])
+        task_id = int(row[4]) if len(row) > 4 and row[4] else 0
+        self.ordinals.append(ordinal)
+        self.minutes.append(minutes)
+        self.text_offsets.extend(self.add_text(row[1]) + self.add_text(row[3]))
+        self.log_offsets.append(log_offset)
+        self.alive.append(1)
+        self.live_rows += 1
+        self.ids.append(task_id)
+        if task_id > self.max_id:
+            self.max_id = task_id
+        return len(self.alive) - 1
+
+    def replace(self, row_id, row):
+        """
+        Changes a row, the new description and notes go to the end of the text buffer. The row keeps its id.
+        :param row_id: integer
+        :param row: [string] ... date, description, time spent, notes
+        :return: None
+        """
+        ordinal = date_to_ordinal(row[0])
+        minutes = int(row[2])
+        self.ordinals[row_id] = ordinal
+        self.minutes[row_id] = minutes
+        self.text_offsets[4 * row_id:4 * row_id + 4] = array('q', self.add_text(row[1]) + self.add_text(row[3]))
+        self.log_offsets[row_id] = -1
+
+    def delete(self, row_id):
+        """
+        Marks a row as deleted
+        :param row_id: integer
+        :return: None
+        """
+        if self.alive[row_id]:
+            self.alive[row_id] = 0
+            self.live_rows -= 1
+
+    def get_description(self, row_id):
+        return self.get_text(4 * row_id)
+
+    def get_notes(self, row_id):
+        return self.get_text(4 * row_id + 2)
+
+    def get_row(self, row_id):
+        """
+        A row as it is written in the log file
+        :param row_id: integer
+        :return: [string] ... date, description, time spent, notes and id, if the row has one
+        """
+        row = [ordinal_to_date(self.ordinals[row_id]), self.get_description(row_id), str(self.minutes[row_id]),
+               self.get_notes(row_id)]
+        if self.ids[row_id]:
+            row.append(str(self.ids[row_id]))
+        return row
+
+    def give_ids(self, new_ids):
+        """
+        Gives ids to the rows that have none
+        :param new_ids: iterator of integer ... ids not used by any row
+        :return: None
+        """
+        for row_id, task_id in enumerate(self.ids):
+            if not task_id:
+                self.ids[row_id] = next(new_ids)
+        self.max_id = max(self.ids, default=0)
+
+    def live_row_ids(self):
+        """
+        The rows that have not been deleted
+        :return: [integer] ... row numbers, in order
+        """
+        if self.live_rows == len(self.alive):
+            return range(len(self.alive))
+        return [row_id for row_id, alive in enumerate(self.alive) if alive]
+
+
+class DateIndex():
+    @profiled
+    def __init__(self, table):
+        """
+        Keeps the rows of a TaskTable grouped by date, with the dates as integer ordinals kept in order, so a date or a
+        range of dates can be found with bisect instead of looking at every task
+
+        :param table: TaskTable
+        """
+        self.rows_by_date = {}  # ordinal: array of row numbers, in order
+        for row_id in table.live_row_ids():
+            ordinal = table.ordinals[row_id]
+            if ordinal not in self.rows_by_date:
+                self.rows_by_date[ordinal] = array('q')
+            self.rows_by_date[ordinal].append(row_id)
+        self.ordinals = sorted(self.rows_by_date)
+
+    def add(self, row_id, ordinal):
+        """
+        Adds a row to the index
+        :param row_id: integer
+        :param ordinal: integer ... date of the row
+        :return: None
+        """
+        if ordinal not in self.rows_by_date:
+            self.rows_by_date[ordinal] = array('q')
+            insort(self.ordinals, ordinal)
+        insort(self.rows_by_date[ordinal], row_id)
+
+    def remove(self, row_id, ordinal):
+        """
+        Removes a row from the index
+        :param row_id: integer
+        :param ordinal: integer ... date of the row
+        :return: None
+        """
+        same_date_rows = self.rows_by_date[ordinal]
+        same_date_rows.remove(row_id)
+        if not same_date_rows:
+            del self.rows_by_date[ordinal]
+            del self.ordinals[bisect_left(self.ordinals, ordinal)]
+
+    def count_range(self, first_ordinal, last_ordinal):
+        """
+        :param first_ordinal: integer
+        :param last_ordinal: integer
+        :return: integer ... rows between the two dates, both included
+        """
+        ordinals = self.ordinals[bisect_left(self.ordinals, first_ordinal):bisect_right(self.ordinals, last_ordinal)]
+        return sum(len(self.rows_by_date[ordinal]) for ordinal in ordinals)
+
+    def find_range(self, first_ordinal, last_ordinal):
+        """
+        Finds the rows between two dates, both included
+        :param first_ordinal: integer
+        :param last_ordinal: integer
+        :return: [integer] ... row numbers, ordered by date
+        """
+        found_rows = []
+        for ordinal in self.ordinals[bisect_left(self.ordinals, first_ordinal):
+                                     bisect_right(self.ordinals, last_ordinal)]:
+            found_rows.extend(self.rows_by_date[ordinal])
+        return found_rows
+
+
+class WordIndex():
+    @profiled
+    def __init__(self, table):
+        """
+        Inverted index of the words in the descriptions and notes of the tasks: each word, in lower case, points to
+        the sorted row numbers of the tasks that use it
+
+        :param table: TaskTable
+        """
+        self.postings = {}  # word: array of row numbers, in order
+        for row_id in table.live_row_ids():
+            for word in task_words(TaskRow(table, row_id)):
+                if word not in self.postings:
+                    self.postings[word] = array('q')
+                self.postings[word].append(row_id)
+
+    def add(self, row_id, words):
+        """
+        Adds a row to the index
+        :param row_id: integer
+        :param words: {string} ... see task_words
+        :return: None
+        """
+        for word in words:
+            if word not in self.postings:
+                self.postings[word] = array('q')
+            insort(self.postings[word], row_id)
+
+    def remove(self, row_id, words):
+        """
+        Removes a row from the index
+        :param row_id: integer
+        :param words: {string} ... see task_words
+        :return: None
+        """
+        for word in words:
+            posting = self.postings.get(word)
+            if posting is not None:
+                i = bisect_left(posting, row_id)
+                if i < len(posting) and posting[i] == row_id:
+                    del posting[i]
+                if not posting:
+                    del self.postings[word]
+
+    def estimate(self, words):
+        """
+        :param words: [string] ... lower case words, at least one
+        :return: (integer, integer) ... most rows that may use all the words, those of the rarest one, and the number
+        of different words
+        """
+        words = set(words)
+        return min(len(self.postings.get(word, ())) for word in words), len(words)
+
+    def find(self, words):
+        """
+        Finds the rows that use all the given words, walking the shortest posting and looking up the others
+        :param words: [string] ... lower case words
+        :return: [integer] ... row numbers, in order
+        """
+        postings = sorted((self.postings.get(word, ()) for word in set(words)), key=len)
+        if not postings:
+            return []
+        found_rows = []
+        for row_id in postings[0]:
+            for posting in postings[1:]:
+                i = bisect_left(posting, row_id)
+                if i == len(posting) or posting[i] != row_id:
+                    break
+            else:
+                found_rows.append(row_id)
+        return found_rows
+
+
+class TrigramIndex():
+    @profiled
+    def __init__(self, table):
+        """
+        Inverted index of the trigrams, the pieces of three characters, of the descriptions and notes of the tasks, case
+        folded: each trigram points to the sorted row numbers of the tasks that have it. Any text that a task contains
+        has all its trigrams in the task, so the rows that have them all are the only ones worth checking.
+
+        :param table: TaskTable
+        """
+        self.postings = {}  # trigram: array of row numbers, in order
+        trigrams_by_text = {}  # the trigrams of each description, as many tasks share theirs
+        for row_id in table.live_row_ids():
+            description, notes = table.get_description(row_id), table.get_notes(row_id)
+            trigrams = trigrams_by_text.get(description)
+            if trigrams is None:
+                trigrams = trigrams_by_text[description] = text_trigrams(description)
+            if notes:
+                trigrams = trigrams | text_trigrams(notes)
+            for trigram in trigrams:
+                posting = self.postings.get(trigram)
+                if posting is None:
+                    posting = self.postings[trigram] = array('q')
+                posting.append(row_id)
+
+    def add(self, row_id, trigrams):
+        """
+        Adds a row to the index
+        :param row_id: integer
+        :param trigrams: {string} ... see task_trigrams
+        :return: None
+        """
+        for trigram in trigrams:
+            if trigram not in self.postings:
+                self.postings[trigram] = array('q')
+            insort(self.postings[trigram], row_id)
+
+    def remove(self, row_id, trigrams):
+        """
+        Removes a row from the index
+        :param row_id: integer
+        :param trigrams: {string} ... see task_trigrams
+        :return: None
+        """
+        for trigram in trigrams:
+            posting = self.postings.get(trigram)
+            if posting is not None:
+                i = bisect_left(posting, row_id)
+                if i < len(posting) and posting[i] == row_id:
+                    del posting[i]
+                if not posting:
+                    del self.postings[trigram]
+
+    def estimate(self, texts):
+        """
+        :param texts: [string] ... case folded, see find
+        :return: (integer, integer) ... most rows that may contain all the texts, those of the rarest trigram, and the
+        number of different trigrams, None if no text was long enough to narrow the rows down
+        """
+        trigrams = {text[i:i + 3] for text in texts for i in range(len(text) - 2)}
+        if not trigrams:
+            return None
+        return min(len(self.postings.get(trigram, ())) for trigram in trigrams), len(trigrams)
+
+    def find(self, texts):
+        """
+        Finds the rows that may contain all the given texts: those that have all their trigrams
+        :param texts: [string] ... case folded, those shorter than three characters are left out
+        :return: [integer] ... row numbers, in order, or None if no text was long enough to narrow the rows down
+        """
+        trigrams = set()
+        for text in texts:
+            trigrams.update(text[i:i + 3] for i in range(len(text) - 2))
+        if not trigrams:
+            return None
+        postings = sorted((self.postings.get(trigram, ()) for trigram in trigrams), key=len)
+        found_rows = []
+        for row_id in postings[0]:
+            for posting in postings[1:]:
+                i = bisect_left(posting, row_id)
+                if i == len(posting) or posting[i] != row_id:
+                    break
+            else:
+                found_rows.append(row_id)
+        return found_rows
+
+    def rank(self, text, min_score):
+        """
+        Ranks the rows by how many of the trigrams of a text they have, so that texts with typos are still found
+        :param text: string
+        :param min_score: float ... share of the trigrams of the text that a row must have, from 0 to 1
+        :return: [(float, integer)] ... score and row number, best first, then in order
+        """
+        trigrams = text_trigrams(text)
+        if not trigrams:
+            return []
+        counts = collections.Counter()
+        for trigram in trigrams:
+            counts.update(self.postings.get(trigram, ()))
+        min_count = min_score * len(trigrams)
+        return sorted(((count / len(trigrams), row_id) for row_id, count in counts.items() if count >= min_count),
+                      key=lambda scored_row: (-scored_row[0], scored_row[1]))
+
+
+class TimeSpentIndex():
+    @profiled
+    def __init__(self, table):
+        """
+        Keeps the minutes spent on every task in a sorted array, next to another array with the row numbers of the
+        tasks, so exact and range queries are done with bisect and the spread of the minutes is known at once
+
+        :param table: TaskTable
+        """
+        pairs = sorted((table.minutes[row_id], row_id) for row_id in table.live_row_ids())
+        self.minutes = array('i', (pair[0] for pair in pairs))
+        self.row_ids = array('q', (pair[1] for pair in pairs))
+
+    def add(self, row_id, minutes):
+        """
+        Adds a row to the index
+        :param row_id: integer
+        :param minutes: integer ... time spent on the task
+        :return: None
+        """
+        i = bisect_right(self.minutes, minutes)
+        self.minutes.insert(i, minutes)
+        self.row_ids.insert(i, row_id)
+
+    def remove(self, row_id, minutes):
+        """
+        Removes a row from the index
+        :param row_id: integer
+        :param minutes: integer ... time spent on the task
+        :return: None
+        """
+        for i in range(bisect_left(self.minutes, minutes), bisect_right(self.minutes, minutes)):
+            if self.row_ids[i] == row_id:
+                del self.minutes[i]
+                del self.row_ids[i]
+                break
+
+    def count_range(self, first_minutes, last_minutes):
+        """
+        :param first_minutes: integer
+        :param last_minutes: integer
+        :return: integer ... tasks that took between the two amounts of minutes, both included
+        """
+        return bisect_right(self.minutes, last_minutes) - bisect_left(self.minutes, first_minutes)
+
+    def find_range(self, first_minutes, last_minutes):
+        """
+        Finds the tasks that took between two amounts of minutes, both included
+        :param first_minutes: integer
+        :param last_minutes: integer
+        :return: [integer] ... row numbers, in order
+        """
+        return sorted(self.row_ids[bisect_left(self.minutes, first_minutes):
+                                   bisect_right(self.minutes, last_minutes)])
+
+    def percentile(self, percent):
+        """
+        The minutes that a given percentage of the tasks don't go over, by the nearest rank method
+        :param percent: number ... from 0 to 100, 0 being the minimum and 100 the maximum
+        :return: integer ... minutes, None if there are no tasks
+        """
+        if not self.minutes:
+            return None
+        return self.minutes[nearest_rank(percent, len(self.minutes))]
+
+
+class IdIndex():
+    @profiled
+    def __init__(self, table):
+        """
+        Keeps the ids of the tasks in a sorted array, next to another array with their row numbers, so a task is found
+        by its id with bisect, and from its row number where it starts in the log file. Ids are given in the order
+        tasks are added, so the rows are usually in order already and sorting them costs little.
+
+        :param table: TaskTable
+        """
+        row_ids = [row_id for row_id in table.live_row_ids() if table.ids[row_id]]
+        row_ids.sort(key=table.ids.__getitem__)
+        self.ids = array('q', (table.ids[row_id] for row_id in row_ids))
+        self.row_ids = array('q', row_ids)
+
+    def add(self, row_id, task_id):
+        """
+        Adds a row to the index
+        :param row_id: integer
+        :param task_id: integer ... id of the task of the row
+        :return: None
+        """
+        i = bisect_left(self.ids, task_id)
+        self.ids.insert(i, task_id)
+        self.row_ids.insert(i, row_id)
+
+    def remove(self, row_id, task_id):
+        """
+        Removes a row from the index
+        :param row_id: integer
+        :param task_id: integer ... id of the task of the row
+        :return: None
+        """
+        for i in range(bisect_left(self.ids, task_id), bisect_right(self.ids, task_id)):
+            if self.row_ids[i] == row_id:
+                del self.ids[i]
+                del self.row_ids[i]
+                break
+
+    def find(self, task_id):
+        """
+        :param task_id: integer
+        :return: integer ... row number of the task, None if there is no task with that id
+        """
+        i = bisect_left(self.ids, task_id)
+        if i < len(self.ids) and self.ids[i] == task_id:
+            return self.row_ids[i]
+        return None
@@ -0,0 +1,513 @@
+"""
+The query server, which keeps a log in memory for other processes, and the RemoteStore that uses it
+
+"""
+import http.client
+import json
+import re
+import sys
+from array import array
+from concurrent.futures import ThreadPoolExecutor
+from http import HTTPStatus
+from urllib.parse import urlsplit
+
+from .core import Query, QueryPlan, StoredTask, Task, TaskRow, lazy_import, normalize_row, ordinal_to_date, profiled
+from .stores import ArchivedStore, LogFollower, LogStore, TaskStore
+
+
+# constants
+
+SERVER_HOST = "127.0.0.1"  # where serve_log listens by default, only this machine
+SERVER_PORT = 8765
+SERVER_TIMEOUT = 60  # seconds a RemoteStore waits for an answer
+SERVER_READS = {  # store methods that the query server answers, and their parameters, run in a pool of threads
+    "get_version": (), "get_time_columns": (), "get_tasks": (), "get_task": ("row_id",),
+    "get_task_by_id": ("task_id",), "get_dates_with_tasks": (), "find_by_date_range": ("first_date", "last_date"),
+    "find_by_time_spent": ("first_minutes", "last_minutes"), "time_spent_percentile": ("percent",),
+    "find_by_words": ("words",), "find_by_phrase": ("phrase",), "find_by_pattern": ("pattern", "flags"),
+    "find_by_substring": ("text",), "find_fuzzy": ("text", "limit"),
+    "get_report": ("period", "first_date", "last_date", "percents"), "run_query": ("query", "explain"),
+}
+SERVER_WRITES = {  # likewise, run one at a time by the writer of the server
+    "append_rows": ("rows",), "write_rows": ("rows",), "replace_task": ("old_task", "new_task"),
+    "delete_task": ("task",),
+}
+
+
+# Classes
+
+class RemoteStore(LogStore):
+    def __init__(self, file_name):
+        """
+        A log served by the query server of another process, see serve_log, used through its JSON endpoints. The
+        server keeps the tasks and their indexes in memory, so even the first search of a new process is quick.
+
+        :param file_name: string ... URL of the server, e.g. http://127.0.0.1:8765
+        """
+        super().__init__(file_name)
+        self.connection = None  # http.client.HTTPConnection, kept open between calls
+
+    @profiled
+    def call(self, method, **parameters):
+        """
+        Runs a method of the store on the server. Reads are sent again once if the connection had been closed, e.g.
+        because the server was restarted.
+        :param method: string ... one of SERVER_READS or SERVER_WRITES
+        :param parameters: the parameters of the method, as JSON values
+        :return: what the method returned, as JSON values
+        """
+        body = json.dumps(parameters).encode("utf-8")
+        with self.lock:
+            for attempt in range(2):
+                if self.connection is None:
+                    url = urlsplit(self.file_name)
+                    self.connection = http.client.HTTPConnection(url.hostname, url.port or 80, timeout=SERVER_TIMEOUT)
+                try:
+                    self.connection.request("POST", "/" + method, body, {"Content-Type": "application/json"})
+                    response = self.connection.getresponse()
+                    reply = json.loads(response.read().decode("utf-8"))
+                    break
+                except (http.client.HTTPException, ConnectionError):
+                    self.connection.close()
+                    self.connection = None
+                    if attempt or method in SERVER_WRITES:
+                        raise
+        if response.status == 400:
+            raise ValueError(reply["error"])
+        if response.status != 200:
+            raise IOError("{} answered {} {}: {}".format(self.file_name, response.status, response.reason,
+                                                        reply.get("error")))
+        return reply["result"]
+
+    def get_version(self):
+        """
+        :return: list ... the version of the served store, see get_version of its class
+        """
+        return self.call("get_version")
+
+    def get_time_columns(self):
+        """
+        :return: (array, array) ... date ordinals and minutes of every task, as array('i')
+        """
+        ordinals, minutes = self.call("get_time_columns")
+        return array('i', ordinals), array('i', minutes)
+
+    def get_tasks(self):
+        """
+        :return: [StoredTask]
+        """
+        return [task_from_json(task_json) for task_json in self.call("get_tasks")]
+
+    def get_task(self, row_id):
+        """
+        :param row_id: integer
+        :return: StoredTask ... None if there is no such task
+        """
+        task_json = self.call("get_task", row_id=row_id)
+        return task_from_json(task_json) if task_json is not None else None
+
+    def get_task_by_id(self, task_id):
+        """
+        :param task_id: integer
+        :return: Task ... None if there is no task with that id
+        """
+        task_json = self.call("get_task_by_id", task_id=task_id)
+        return task_from_json(task_json) if task_json is not None else None
+
+    def append_rows(self, rows):
+        """
+        :param rows: iterable of [string] ... rows as normalize_row makes them
+        :return: integer ... number of rows appended
+        """
+        return self.call("append_rows", rows=[list(row) for row in rows])
+
+    def write_rows(self, rows):
+        """
+        :param rows: iterable of [string] ... date, description, time spent, notes
+        :return: None
+        """
+        self.call("write_rows", rows=[list(row) for row in rows])
+
+    def replace_task(self, old_task, new_task):
+        """
+        :param old_task: Task
+        :param new_task: Task
+        :return: None ... raises a ValueError, and changes nothing, if the old task is no longer in the log
+        """
+        self.call("replace_task", old_task=task_to_json(old_task), new_task=task_to_json(new_task))
+
+    def delete_task(self, task):
+        """
+        :param task: Task
+        :return: None
+        """
+        self.call("delete_task", task=task_to_json(task))
+
+    def get_dates_with_tasks(self):
+        """
+        :return: [string] ... dd/mm/yyyy, in order
+        """
+        return self.call("get_dates_with_tasks")
+
+    def find_by_date_range(self, first_date, last_date):
+        """
+        :param first_date: string ... dd/mm/yyyy
+        :param last_date: string ... dd/mm/yyyy
+        :return: [StoredTask] ... ordered by date
+        """
+        return [task_from_json(task_json)
+                for task_json in self.call("find_by_date_range", first_date=first_date, last_date=last_date)]
+
+    def find_by_time_spent(self, first_minutes, last_minutes):
+        """
+        :param first_minutes: integer
+        :param last_minutes: integer
+        :return: [StoredTask] ... in log order
+        """
+        return [task_from_json(task_json) for task_json in self.call("find_by_time_spent", first_minutes=first_minutes,
+                                                                     last_minutes=last_minutes)]
+
+    def time_spent_percentile(self, percent):
+        """
+        :param percent: number ... from 0 to 100
+        :return: integer ... None if there are no tasks
+        """
+        return self.call("time_spent_percentile", percent=percent)
+
+    def find_by_words(self, words):
+        """
+        :param words: string
+        :return: [StoredTask] ... those using all the words, in log order
+        """
+        return [task_from_json(task_json) for task_json in self.call("find_by_words", words=words)]
+
+    def find_by_phrase(self, phrase):
+        """
+        :param phrase: string
+        :return: [StoredTask] ... those containing the exact phrase, in log order
+        """
+        return [task_from_json(task_json) for task_json in self.call("find_by_phrase", phrase=phrase)]
+
+    def find_by_pattern(self, pattern):
+        """
+        :param pattern: compiled regular expression ... sent as its pattern and flags
+        :return: [StoredTask] ... those whose description or notes match, in log order
+        """
+        return [task_from_json(task_json)
+                for task_json in self.call("find_by_pattern", pattern=pattern.pattern, flags=pattern.flags)]
+
+    def find_by_substring(self, text):
+        """
+        :param text: string
+        :return: [StoredTask] ... those containing the text anywhere, in any case, in log order
+        """
+        return [task_from_json(task_json) for task_json in self.call("find_by_substring", text=text)]
+
+    def find_fuzzy(self, text, limit=20):
+        """
+        :param text: string
+        :param limit: integer ... most tasks to find
+        :return: [(float, StoredTask)] ... score and task, best first
+        """
+        return [(score, task_from_json(task_json)) for score, task_json in self.call("find_fuzzy", text=text,
+                                                                                     limit=limit)]
+
+    def get_report(self, period, first_date=None, last_date=None, percents=(50, 90)):
+        """
+        Made and kept by the server, see LogStore.get_report
+        :return: [[string, integer, integer, float, integer...]] ... see make_time_report
+        """
+        return self.call("get_report", period=period, first_date=first_date, last_date=last_date,
+                         percents=list(percents))
+
+    def run_query(self, query, plan=None):
+        """
+        Run by the server, see LogStore.run_query
+        :param query: Query
+        :param plan: QueryPlan ... to add the steps that the server took to
+        :return: [StoredTask] ... in log order
+        """
+        reply = self.call("run_query", query=query.to_json(), explain=plan is not None)
+        if plan is not None:
+            plan.add_plan(reply["plan"])
+        return [task_from_json(task_json) for task_json in reply["tasks"]]
+
+
+# Query Server
+
+def task_to_json(task, task_date=None):
+    """
+    :param task: Task
+    :param task_date: string ... the date of the task, if already known
+    :return: dictionary ... the task as the query server sends it, with its row id and its id if it has them
+    """
+    return {"row_id": getattr(task, "row_id", None), "id": task.task_id, "date": task_date or task.task_date,
+            "description": task.description, "minutes": int(task.time_spent), "notes": task.notes}
+
+
+def tasks_to_json(tasks):
+    """
+    :param tasks: [Task]
+    :return: [dictionary] ... see task_to_json
+    """
+    dates = {}  # ordinal: dd/mm/yyyy, for the tasks read from a TaskTable, as most tasks share their date with others
+    tasks_json = []
+    for task in tasks:
+        if isinstance(task, TaskRow):
+            ordinal = task.table.ordinals[task.row_id]
+            if ordinal not in dates:
+                dates[ordinal] = ordinal_to_date(ordinal)
+            tasks_json.append(task_to_json(task, dates[ordinal]))
+        else:
+            tasks_json.append(task_to_json(task))
+    return tasks_json
+
+
+def task_from_json(task_json):
+    """
+    :param task_json: dictionary ... see task_to_json
+    :return: Task ... StoredTask if it has a row id
+    """
+    if task_json.get("row_id") is None:
+        return Task(task_json["description"], task_json["minutes"], task_json.get("notes", ""), task_json["date"],
+                    task_json.get("id"))
+    return StoredTask(task_json["row_id"], task_json["description"], task_json["minutes"], task_json.get("notes", ""),
+                      task_json["date"], task_json.get("id"))
+
+
+def get_served_arguments(store, method, parameters):
+    """
+    Turns the parameters of a request to the query server into the arguments of the store method
+    :param store: LogStore ... served
+    :param method: string ... one of SERVER_READS or SERVER_WRITES
+    :param parameters: dictionary ... JSON object of the request
+    :return: dictionary ... keyword arguments for the method
+    """
+    known_parameters = SERVER_READS[method] if method in SERVER_READS else SERVER_WRITES[method]
+    unknown_parameters = set(parameters) - set(known_parameters)
+    if unknown_parameters:
+        raise ValueError("{} doesn't take {}".format(method, ", ".join(sorted(unknown_parameters))))
+    arguments = dict(parameters)
+    if method == "find_by_pattern":
+        arguments["pattern"] = re.compile(arguments["pattern"], arguments.pop("flags", 0))
+    elif "rows" in arguments:
+        for row in arguments["rows"]:
+            if len(row) not in (4, 5):
+                raise ValueError("expected 4 fields, or 5 with an id, found {}".format(len(row)))
+        arguments["rows"] = [normalize_row(row) for row in arguments["rows"]]
+    elif method == "run_query":
+        arguments["query"] = Query.from_json(arguments["query"])
+        arguments["plan"] = QueryPlan() if arguments.pop("explain", False) else None
+    for name in ("task", "old_task"):
+        if name in arguments:
+            task = task_from_json(arguments[name])
+            if isinstance(task, StoredTask):  # the task as the store has it, if it is still there, is found at once
+                stored_task = store.get_task(task.row_id)
+                task = stored_task if stored_task is not None and stored_task == task else task
+            arguments[name] = task
+    if "new_task" in arguments:
+        arguments["new_task"] = task_from_json(arguments["new_task"])
+    return arguments
+
+
+def call_served_store(store, method, parameters):
+    """
+    Runs a store method for a request to the query server
+    :param store: LogStore
+    :param method: string ... one of SERVER_READS or SERVER_WRITES
+    :param parameters: dictionary ... JSON object of the request
+    :return: what the method returned, as JSON values
+    """
+    arguments = get_served_arguments(store, method, parameters)
+    result = getattr(store, method)(**arguments)
+    if method == "run_query":
+        return {"tasks": tasks_to_json(result), "plan": arguments["plan"] and arguments["plan"].to_json()}
+    if method == "get_time_columns":
+        return [column.tolist() for column in result]
+    if isinstance(result, Task):
+        return task_to_json(result)
+    if isinstance(result, list) and result and isinstance(result[0], Task):
+        return tasks_to_json(result)
+    if isinstance(result, list) and result and isinstance(result[0], tuple):  # scored tasks
+        return [[score, task_json] for score, task_json in zip((score for score, task in result),
+                                                                tasks_to_json([task for score, task in result]))]
+    return result
+
+
+async def write_served_store(store, writes):
+    """
+    The only task that changes the served store, taking the writes in order in a thread of its own. Appends waiting
+    together share one append_rows, and so one fsync.
+    :param store: LogStore
+    :param writes: asyncio.Queue ... of (string, dictionary, asyncio.Future), the method, its parameters and the
+    future for its result
+    :return: None
+    """
+    asyncio = lazy_import("asyncio")
+    loop = asyncio.get_running_loop()
+    write_thread = ThreadPoolExecutor(1, "worklog-writer")
+    try:
+        next_write = None
+        while True:
+            method, parameters, future = next_write or await writes.get()
+            next_write = None
+            if method != "append_rows":
+                try:
+                    result = await loop.run_in_executor(write_thread, call_served_store, store, method, parameters)
+                except Exception as error:
+                    if not future.cancelled():
+                        future.set_exception(error)
+                else:
+                    if not future.cancelled():
+                        future.set_result(result)
+                continue
+
+            appends = [(parameters, future)]
+            while not writes.empty():
+                write = writes.get_nowait()
+                if write[0] != "append_rows":
+                    next_write = write
+                    break
+                appends.append(write[1:])
+            rows, appended_futures = [], []  # the futures get the number of rows of their append
+            for parameters, future in appends:
+                try:
+                    append_rows = get_served_arguments(store, "append_rows", parameters)["rows"]
+                except Exception as error:  # only that append is refused
+                    if not future.cancelled():
+                        future.set_exception(error)
+                    continue
+                rows.extend(append_rows)
+                appended_futures.append((future, len(append_rows)))
+            try:
+                await loop.run_in_executor(write_thread, store.append_rows, rows)
+            except Exception as error:
+                for future, appended_rows in appended_futures:
+                    if not future.cancelled():
+                        future.set_exception(error)
+            else:
+                for future, appended_rows in appended_futures:
+                    if not future.cancelled():
+                        future.set_result(appended_rows)
+    finally:
+        write_thread.shutdown()
+
+
+async def answer_request(store, writes, request_line, body):
+    """
+    Answers a request to the query server: POST /method with the parameters as a JSON object
+    :param store: LogStore
+    :param writes: asyncio.Queue ... see write_served_store
+    :param request_line: bytes ... e.g. POST /find_by_words HTTP/1.1
+    :param body: bytes
+    :return: (integer, dictionary) ... HTTP status, and the JSON object to send back, with the result or an error
+    """
+    asyncio = lazy_import("asyncio")
+    request_fields = request_line.decode("latin-1").split()
+    if len(request_fields) != 3:
+        return 400, {"error": "bad request line"}
+    method = request_fields[1].lstrip("/").partition("?")[0]
+    if method not in SERVER_READS and method not in SERVER_WRITES:
+        return 404, {"error": "no such method: {}".format(method)}
+    if request_fields[0] != "POST":
+        return 405, {"error": "send the parameters of {} as a JSON object with POST".format(method)}
+    try:
+        parameters = json.loads(body.decode("utf-8") or "{}")
+        if not isinstance(parameters, dict):
+            raise ValueError("the parameters must be a JSON object")
+        if method in SERVER_WRITES:
+            future = asyncio.get_running_loop().create_future()
+            await writes.put((method, parameters, future))
+            result = await future
+        else:
+            result = await asyncio.get_running_loop().run_in_executor(None, call_served_store, store, method,
+                                                                      parameters)
+    except (ValueError, TypeError, KeyError, re.error) as error:
+        return 400, {"error": "{}: {}".format(type(error).__name__, error)}
+    except Exception as error:
+        return 500, {"error": "{}: {}".format(type(error).__name__, error)}
+    return 200, {"result": result}
+
+
+async def serve_connection(store, writes, reader, writer):
+    """
+    Answers the requests sent on a connection to the query server, until the client closes it
+    :param store: LogStore
+    :param writes: asyncio.Queue ... see write_served_store
+    :param reader: asyncio.StreamReader
+    :param writer: asyncio.StreamWriter
+    :return: None
+    """
+    asyncio = lazy_import("asyncio")
+    try:
+        while True:
+            request_line = await reader.readline()
+            if not request_line.strip():
+                break
+            headers = {}
+            while True:
+                header_line = await reader.readline()
+                if not header_line.strip():
+                    break
+                name, _, value = header_line.decode("latin-1").partition(":")
+                headers[name.strip().lower()] = value.strip()
+            body = await reader.readexactly(int(headers.get("content-length", 0)))
+            status, reply = await answer_request(store, writes, request_line, body)
+            payload = json.dumps(reply).encode("utf-8")
+            writer.write("HTTP/1.1 {} {}\r\nContent-Type: application/json\r\nContent-Length: {}\r\n\r\n".format(
+                status, HTTPStatus(status).phrase, len(payload)).encode("latin-1") + payload)
+            await writer.drain()
+            if headers.get("connection", "").lower() == "close":
+                break
+    except (ConnectionError, asyncio.IncompleteReadError, ValueError):
+        pass  # the client went away or sent something that isn't HTTP
+    finally:
+        writer.close()
+
+
+def follow_log(store):
+    """
+    Starts keeping the tasks of a log up to date in memory, in the background, while other processes write to it
+    :param store: LogStore
+    :return: LogFollower ... None for logs that are not kept in a csv file, which have nothing to follow
+    """
+    if isinstance(store, ArchivedStore):
+        store = store.log
+    if type(store) is not TaskStore:
+        return None
+    return LogFollower(store).start()
+
+
+def serve_log(store, host=SERVER_HOST, port=SERVER_PORT):
+    """
+    Serves a log to other processes, e.g. scripts run with --server, until interrupted, with the tasks and indexes
+    kept in memory. Every method in SERVER_READS and SERVER_WRITES is an endpoint, e.g. POST /find_by_words with
+    {"words": "deploy client"} answers {"result": [tasks]}, see task_to_json. Reads run in a pool of threads, still
+    one at a time under the store's lock, and writes go to a single writer, see write_served_store.
+    :param store: LogStore
+    :param host: string
+    :param port: integer ... 0 for any free port
+    :return: None
+    """
+    asyncio = lazy_import("asyncio")
+    store.warm_up()
+    follower = follow_log(store)
+
+    async def run_server():
+        writes = asyncio.Queue()
+        writer_task = asyncio.ensure_future(write_served_store(store, writes))
+        server = await asyncio.start_server(lambda reader, writer: serve_connection(store, writes, reader, writer),
+                                            host, port)
+        print("serving {} at http://{}:{}".format(store.file_name, host, server.sockets[0].getsockname()[1]),
+              file=sys.stderr, flush=True)
+        try:
+            async with server:
+                await server.serve_forever()
+        finally:
+            writer_task.cancel()
+
+    try:
+        asyncio.run(run_server())
+    finally:
+        if follower:
+            follower.stop()
@@ -0,0 +1,3094 @@
+"""
+Where logs are kept: csv files, SQLite databases, months and archives, and the script's own log
+
+"""
+import abc
+import csv
+import ctypes
+import ctypes.util
+import gzip
+import hashlib
+import io
+import itertools
+import mmap
+import multiprocessing
+import os
+import re
+import select
+import struct
+import sys
+import tempfile
+import threading
+import time
+from array import array
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import contextmanager
+from datetime import date
+
+from .core import (FUZZY_MIN_SCORE, QUERY_INDEX_COSTS, StoredTask, TaskRow, count, count_hit, date_to_ordinal,
+                   lazy_import, make_time_report, merged_percentile, narrow_cost, nearest_rank, normalize_row,
+                   order_conditions, ordinal_to_date, phrase_matcher, profiled, required_texts, row_fingerprint,
+                   rows_to_stored_tasks, sort_by_date, split_words, task_to_row, task_trigrams, task_words,
+                   text_trigrams, with_ids)
+from .indexes import DateIndex, IdIndex, TaskTable, TimeSpentIndex, TrigramIndex, WordIndex
+
+try:
+    import fcntl
+except ImportError:  # e.g. on Windows, where the file lock only counts holds
+    fcntl = None
+try:
+    from compression import zstd  # Python 3.14 on
+except ImportError:
+    zstd = None
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+
+# constants
+
+DEVELOPING = True
+WORK_LOG_FILE_NAME = "work_log_developing.csv" if DEVELOPING else "work_log.csv"
+
+USE_JOURNAL = True  # edits and deletes are appended to a journal instead of rewriting the whole log
+JOURNAL_COMPACTION_SIZE = 64 * 1024  # bytes of journal after which it is folded back into the log
+APPEND_BUFFER_ROWS = 10000  # rows read before taking the lock to append them, see buffered_rows
+
+PARALLEL_SCAN_SIZE = 8 * 1024 * 1024  # logs smaller than this are searched by pattern in this process
+PARALLEL_SCAN_CHUNK_SIZE = 1024 * 1024  # smallest piece of the log handed to each worker
+
+SIDECAR_MIN_SIZE = 256 * 1024  # logs from this size on keep their parsed columns in a binary file next to them
+SIDECAR_MAGIC = b"WORKLOG2"
+SIDECAR_HEADER = struct.Struct("<8s?QQ20sQQ")  # magic, little endian, log size, log mtime, log sha1, rows, text size
+SIDECAR_IDS = struct.Struct("<QQQ")  # after the header: log size and mtime, and the last id given to a task by then
+
+FOLLOW_CHECK_SIZE = 4096  # last bytes of the log compared to tell an append from a rewrite, see TaskStore.read_appended
+FOLLOW_POLL_INTERVAL = 1  # seconds between looks at a followed log where inotify is not available, see LogFollower
+INOTIFY_MASK = 0x2 | 0x8 | 0x80 | 0x100 | 0x200  # modified, closed after writing, moved in, created, deleted
+INOTIFY_OVERFLOW = 0x4000  # events were dropped, anything may have changed
+INOTIFY_EVENT = struct.Struct("iIII")  # watch, mask, cookie and length of the name that follows
+
+SQLITE_EXTENSIONS = (".sqlite", ".sqlite3", ".db")  # logs with these extensions are kept in SQLite, the rest in csv
+PARTITIONED_EXTENSION = ".months"  # logs with this extension are directories with a csv file for each month
+PARTITION_ROW_IDS = 10 ** 7  # row ids of a partitioned log are yyyymm * this + the row number in the month's file
+ARCHIVE_EXTENSION = ".archive"  # a csv log whose old tasks have been archived keeps them in a directory named like this
+ARCHIVE_ROW_IDS = 10 ** 12  # row ids of archived tasks are the segment number * this + the row number in the segment
+ARCHIVE_COMPRESSIONS = {"gzip": ".csv.gz", "zstd": ".csv.zst"}  # how segments can be compressed, and their extensions
+SQLITE_SCHEMA = """
+CREATE TABLE IF NOT EXISTS tasks (id INTEGER PRIMARY KEY, ordinal INTEGER NOT NULL, description TEXT NOT NULL,
+                                  minutes INTEGER NOT NULL, notes TEXT NOT NULL);
+CREATE INDEX IF NOT EXISTS tasks_by_date ON tasks (ordinal);
+CREATE INDEX IF NOT EXISTS tasks_by_minutes ON tasks (minutes);
+"""
+SQLITE_TEXT_INDEXES = [  # full text index on descriptions and notes, splitting words as split_words does
+    ("fts5", "CREATE VIRTUAL TABLE tasks_text USING fts5(description, notes, content='tasks', content_rowid='id', "
+             "tokenize=\"unicode61 remove_diacritics 0 tokenchars '_'\")"),
+    ("fts4", "CREATE VIRTUAL TABLE tasks_text USING fts4(description, notes, content='tasks', "
+             "tokenize=unicode61 'remove_diacritics=0' 'tokenchars=_')"),
+]
+
+
+# Classes
+
+class LogStore(abc.ABC):
+    def __init__(self, file_name):
+        """
+        Where a log is kept, as the rest of the script sees it. TaskStore keeps it in a csv file and SqliteStore in a
+        SQLite database, make_store picks one by the extension of the file. The tasks they give back have a row_id that
+        identifies them until the log is rewritten, and a task_id that they keep for good, even when edited. Each kind
+        of log implements the abstract methods, the others are written with them.
+
+        :param file_name: string ... path to the log
+        """
+        self.file_name = file_name
+        self.lock = threading.RLock()  # held by the thread using the store
+        self.reports = {}  # (period, first date, last date, percents): report, see get_report
+        self.reports_version = None  # get_version() when the reports were made
+
+    @abc.abstractmethod
+    def get_version(self):
+        """
+        :return: anything that can be compared ... changes whenever the tasks change
+        """
+
+    @abc.abstractmethod
+    def get_time_columns(self):
+        """
+        :return: (array, array) ... date ordinals and minutes of every task, as array('i')
+        """
+
+    @abc.abstractmethod
+    def get_tasks(self):
+        """
+        :return: [Task] ... every task, in log order
+        """
+
+    @abc.abstractmethod
+    def get_task(self, row_id):
+        """
+        :param row_id: integer
+        :return: Task ... None if there is no such task
+        """
+
+    @abc.abstractmethod
+    def get_task_by_id(self, task_id):
+        """
+        :param task_id: integer
+        :return: Task ... None if there is no task with that id
+        """
+
+    @abc.abstractmethod
+    def append_rows(self, rows):
+        """
+        :param rows: iterable of [string] ... rows as normalize_row makes them
+        :return: integer ... number of rows appended
+        """
+
+    @abc.abstractmethod
+    def write_rows(self, rows):
+        """
+        Writes rows over the whole log
+        :param rows: iterable of [string] ... date, description, time spent, notes
+        :return: None
+        """
+
+    @abc.abstractmethod
+    def replace_task(self, old_task, new_task):
+        """
+        :param old_task: Task
+        :param new_task: Task
+        :return: None ... raises a ValueError, and changes nothing, if the old task is no longer in the log
+        """
+
+    @abc.abstractmethod
+    def delete_task(self, task):
+        """
+        :param task: Task
+        :return: None
+        """
+
+    @abc.abstractmethod
+    def get_dates_with_tasks(self):
+        """
+        :return: [string] ... dd/mm/yyyy, in order
+        """
+
+    @abc.abstractmethod
+    def find_by_date_range(self, first_date, last_date):
+        """
+        :param first_date: string ... dd/mm/yyyy
+        :param last_date: string ... dd/mm/yyyy
+        :return: [Task] ... ordered by date
+        """
+
+    @abc.abstractmethod
+    def find_by_time_spent(self, first_minutes, last_minutes):
+        """
+        :param first_minutes: integer
+        :param last_minutes: integer
+        :return: [Task] ... in log order
+        """
+
+    @abc.abstractmethod
+    def time_spent_percentile(self, percent):
+        """
+        :param percent: number ... from 0 to 100
+        :return: integer ... minutes that the given percentage of the tasks don't go over, None if there are no tasks
+        """
+
+    @abc.abstractmethod
+    def find_by_words(self, words):
+        """
+        :param words: string
+        :return: [Task] ... those using all the words, in log order
+        """
+
+    @abc.abstractmethod
+    def find_by_pattern(self, pattern):
+        """
+        :param pattern: compiled regular expression
+        :return: [Task] ... those whose description or notes match, in log order
+        """
+
+    def warm_up(self):
+        """
+        Loads whatever the store keeps in memory to answer searches, before the first search needs it
+        :return: None
+        """
+        pass
+
+    def append(self, task_entry):
+        """
+        Appends a task to the log
+        :param task_entry: [string] ... date, description, time spent, notes
+        :return: None
+        """
+        self.append_rows([normalize_row(task_entry)])
+
+    def rewrite(self, tasks_list):
+        """
+        Writes tasks over the whole log
+        :param tasks_list: [Task]
+        :return: None
+        """
+        self.write_rows([task_to_row(task, with_id=True) for task in tasks_list])
+
+    def find_by_phrase(self, phrase):
+        """
+        Finds the tasks whose description or notes contain the exact phrase, made of whole words
+        :param phrase: string
+        :return: [Task] ... in log order
+        """
+        with self.lock:
+            if split_words(phrase):
+                candidates = self.find_by_words(phrase)
+            else:
+                candidates = self.get_tasks()  # nothing to look up, e.g. only punctuation
+            has_phrase = phrase_matcher(phrase)
+            return [task for task in candidates if has_phrase(task.description) or has_phrase(task.notes)]
+
+    def find_by_substring(self, text):
+        """
+        Finds the tasks whose description or notes contain a text anywhere, in any case
+        :param text: string
+        :return: [Task] ... in log order
+        """
+        folded_text = text.casefold()
+        with self.lock:
+            return [task for task in self.get_tasks()
+                    if folded_text in task.description.casefold() or folded_text in task.notes.casefold()]
+
+    def find_fuzzy(self, text, limit=20):
+        """
+        Finds the tasks most like a text, even with typos, by the share of the trigrams of the text that they have,
+        see TrigramIndex.rank
+        :param text: string
+        :param limit: integer ... most tasks to find
+        :return: [(float, Task)] ... score from 0 to 1 and task, best first, then in log order
+        """
+        trigrams = text_trigrams(text)
+        if not trigrams:
+            return []
+        with self.lock:
+            scored_tasks = [(len(trigrams & task_trigrams(task)) / len(trigrams), task) for task in self.get_tasks()]
+        return sorted((scored_task for scored_task in scored_tasks if scored_task[0] >= FUZZY_MIN_SCORE),
+                      key=lambda scored_task: -scored_task[0])[:limit]
+
+    def run_query(self, query, plan=None):
+        """
+        Finds the tasks that meet every condition of a query, by checking every task
+        :param query: Query
+        :param plan: QueryPlan ... to add the steps taken to, see QueryPlan.explain
+        :return: [Task] ... in log order
+        """
+        start = time.perf_counter()
+        with self.lock:
+            tasks = [task for task in self.get_tasks() if query.matches(task)]
+        if plan is not None:
+            plan.add_step("every condition", "check every task", None, len(tasks),
+                          (time.perf_counter() - start) * 1000)
+        return tasks
+
+    @profiled
+    def get_report(self, period, first_date=None, last_date=None, percents=(50, 90)):
+        """
+        Totals, means and percentiles of the minutes spent on the tasks, by period, see make_time_report. Reports are
+        kept until the tasks change, so asking again costs nothing.
+        :param period: string ... one of REPORT_PERIODS
+        :param first_date: string ... dd/mm/yyyy, leaves out the tasks before it
+        :param last_date: string ... dd/mm/yyyy, leaves out the tasks after it
+        :param percents: (number) ... percentiles to work out, from 0 to 100
+        :return: [[string, integer, integer, float, integer...]] ... see make_time_report
+        """
+        with self.lock:
+            version = self.get_version()
+            if version != self.reports_version:
+                self.reports, self.reports_version = {}, version
+            key = (period, first_date, last_date, tuple(percents))
+            count_hit("reports", key in self.reports)
+            if key not in self.reports:
+                ordinals, minutes = self.get_time_columns()
+                self.reports[key] = make_time_report(ordinals, minutes, period, first_date, last_date, percents)
+            return self.reports[key]
+
+
+class FileLock():
+    def __init__(self, file_name):
+        """
+        Advisory lock on a log for every process that uses it, held on a file of its own as the log is replaced when
+        rewritten: shared by readers, exclusive for writers. Holds nest, and an exclusive hold inside a shared one
+        upgrades the lock, though not atomically, so writers check the files again once they hold it. Without fcntl
+        it only counts the holds.
+
+        :param file_name: string ... path to the lock file
+        """
+        self.file_name = file_name
+        self.fd = None  # of the lock file, opened the first time the lock is taken
+        self.holds = []  # True for each exclusive hold, False for each shared one, the innermost last
+
+    def set_lock(self, exclusive):
+        """
+        Takes, changes or drops the lock on the lock file, waiting for other processes if needed
+        :param exclusive: boolean ... None to drop the lock
+        :return: None
+        """
+        if fcntl is None:
+            return
+        if self.fd is None:
+            self.fd = os.open(self.file_name, os.O_RDWR | os.O_CREAT, 0o666)
+        fcntl.flock(self.fd, fcntl.LOCK_UN if exclusive is None else fcntl.LOCK_EX if exclusive else fcntl.LOCK_SH)
+
+    def acquire(self, exclusive=False):
+        """
+        Takes a hold on the lock, see the caveat on upgrading it in __init__
+        :param exclusive: boolean
+        :return: None
+        """
+        if not self.holds or (exclusive and not any(self.holds)):
+            self.set_lock(exclusive)
+        self.holds.append(exclusive)
+
+    def release(self):
+        """
+        Releases the innermost hold, going back to the lock that the outer holds need
+        :return: None
+        """
+        exclusive = self.holds.pop()
+        if not self.holds:
+            self.set_lock(None)
+        elif exclusive and not any(self.holds):
+            self.set_lock(False)
+
+
+class PendingAppend():
+    __slots__ = ("rows", "appended", "error")
+
+    def __init__(self, rows):
+        """
+        Rows waiting for TaskStore.append_rows to write them together with those of other threads
+        :param rows: iterable of [string] ... rows as normalize_row makes them
+        """
+        self.rows = rows
+        self.appended = None  # number of rows written, once they have been
+        self.error = None  # exception raised while writing them, if any
+
+
+class TaskStore(LogStore):
+    def __init__(self, file_name):
+        """
+        Keeps the tasks of a log file in memory, in a TaskTable, so the file is only parsed again when it changes on
+        disk.
+
+        When USE_JOURNAL is on, edits and deletes are not written to the log file but appended to a journal next to
+        it, keyed by the row number of the task in the log and a checksum of the task, see row_fingerprint. The
+        journal is replayed on top of the log when loading, and folded back into the log once it grows past
+        JOURNAL_COMPACTION_SIZE.
+
+        The files are read under a shared FileLock and written under an exclusive one, once checked to be as loaded.
+        Appends from several threads are committed together, see append_rows.
+
+        Every task has an id, the last field of its row, given when it is appended and found through the id index. The
+        last id given is kept in the sidecar, so appends don't load the log. Older logs get ids from migrate_log.
+
+        What other processes append to the log or the journal is parsed on its own and added to the indexes in place,
+        see read_appended. Any other change loads the log again.
+
+        :param file_name: string ... path to the csv log file
+        """
+        super().__init__(file_name)
+        self.journal_file_name = file_name + ".journal"
+        self.sidecar_file_name = file_name + ".cache"
+        self.table = TaskTable()
+        self.file_state = None  # stat of the log and the journal the last time we read or wrote them
+        self.log_end = None  # (inode, bytes) of the log then, its last FOLLOW_CHECK_SIZE bytes, see read_appended
+        self.loaded = False
+        self.date_index = None  # DateIndex, built the first time it is needed after a load
+        self.word_index = None  # WordIndex, likewise
+        self.time_index = None  # TimeSpentIndex, likewise
+        self.trigram_index = None  # TrigramIndex, likewise, see find_candidates
+        self.id_index = None  # IdIndex, likewise
+        self.first_id = 1  # ids given to new tasks are at least this
+        self.last_id = None  # and at most this, if set, see next_free_id
+        self.scans = 0  # searches by text that checked every row, see find_candidates
+        self.file_lock = FileLock(file_name + ".lock")
+        self.append_condition = threading.Condition()  # guards the next two, and signals finished appends
+        self.pending_appends = []  # [PendingAppend] waiting to be written
+        self.appending = False  # whether some thread is writing pending appends
+        self.compaction = None  # threading.Thread folding the journal into the log, if any
+
+    @contextmanager
+    def locked(self, exclusive=False):
+        """
+        Holds the store, against other threads, and the log, against other processes
+        :param exclusive: boolean ... whether the log is going to be written
+        :return: None
+        """
+        with self.lock:
+            self.file_lock.acquire(exclusive)
+            try:
+                yield
+            finally:
+                self.file_lock.release()
+
+    @staticmethod
+    def stat_file(file_name):
+        """
+        Looks at a file on disk
+        :param file_name: string
+        :return: (integer, integer) ... modification time in nanoseconds and size in bytes, None if there is no file
+        """
+        try:
+            file_stat = os.stat(file_name)
+        except FileNotFoundError:
+            return None
+        return file_stat.st_mtime_ns, file_stat.st_size
+
+    def get_file_state(self):
+        """
+        Looks at the log file and its journal on disk
+        :return: ((integer, integer), (integer, integer)) ... see stat_file
+        """
+        return self.stat_file(self.file_name), self.stat_file(self.journal_file_name)
+
+    @profiled
+    def load(self):
+        """
+        Loads the log file into memory, from the sidecar if it is up to date, and replays the journal on top of it.
+        Only the part of the log that the sidecar doesn't cover is parsed, and the sidecar is written again if it
+        wasn't up to date.
+        :return: None
+        """
+        with self.locked():
+            file_state = self.get_file_state()
+            log_state = file_state[0]
+            table, parsed_size = TaskTable(), 0
+            if log_state and log_state[1] >= SIDECAR_MIN_SIZE:
+                table, parsed_size = read_sidecar(self.sidecar_file_name, self.file_name, log_state) or (table, 0)
+            if log_state and parsed_size < log_state[1]:
+                with open(self.file_name, 'rb') as rf:
+                    rf.seek(parsed_size)
+                    for offset, row in read_rows_with_offsets(rf, parsed_size, log_state[1]):
+                        table.append(row, offset)
+                if log_state[1] >= SIDECAR_MIN_SIZE:
+                    write_sidecar(self.sidecar_file_name, table, log_state, hash_file(self.file_name, log_state[1]),
+                                  self.next_free_id(table) - 1)
+            if log_state:
+                count("log rows read", len(table))
+                count("log bytes parsed", log_state[1] - parsed_size)
+                if log_state[1] >= SIDECAR_MIN_SIZE:
+                    count_hit("sidecar", parsed_size > 0)
+            if file_state[1]:
+                self.replay_journal(table)
+            self.table = table
+            self.file_state = file_state
+            self.loaded = True
+            self.remember_log_end(log_state)
+            self.reset_indexes()
+
+    def remember_log_end(self, log_state):
+        """
+        Keeps which file the log is and how it ends, to tell later whether it has only been appended to
+        :param log_state: (integer, integer) ... state of the log as the cached tasks have it, see stat_file
+        :return: None
+        """
+        self.log_end = None
+        if log_state:
+            with open(self.file_name, 'rb') as rf:
+                rf.seek(max(0, log_state[1] - FOLLOW_CHECK_SIZE))
+                self.log_end = os.fstat(rf.fileno()).st_ino, rf.read(min(log_state[1], FOLLOW_CHECK_SIZE))
+
+    @profiled
+    def read_appended(self):
+        """
+        Brings the cached tasks up to date with the rows appended to the log file and the records appended to the
+        journal since they were read, parsing only those, and updates the indexes that have been built in place instead
+        of dropping them. The sidecar is left as it is, the next load parses what it doesn't cover.
+        :return: boolean ... False if the files have been changed otherwise, e.g. the log truncated, rewritten or
+        replaced, or the journal folded into it, and have to be loaded again
+        """
+        with self.locked():
+            if not self.loaded:
+                return False
+            file_state = self.get_file_state()
+            (old_log_state, old_journal_state), (log_state, journal_state) = self.file_state, file_state
+            if not log_state or old_log_state and (log_state[1] < old_log_state[1] or
+                                                   log_state[1] == old_log_state[1] and log_state != old_log_state):
+                return False
+            if old_journal_state and (not journal_state or journal_state[1] < old_journal_state[1] or
+                                      journal_state[1] == old_journal_state[1] and journal_state != old_journal_state):
+                return False
+            try:
+                if log_state != old_log_state:
+                    parsed_size = old_log_state[1] if old_log_state else 0
+                    with open(self.file_name, 'rb') as rf:
+                        if old_log_state:
+                            log_inode, log_end = self.log_end
+                            rf.seek(parsed_size - len(log_end))
+                            if os.fstat(rf.fileno()).st_ino != log_inode or rf.read(len(log_end)) != log_end:
+                                return False
+                        first_row = len(self.table)
+                        for offset, row in read_rows_with_offsets(rf, parsed_size, log_state[1]):
+                            self.index_row(self.table.append(row, offset))
+                    count("log rows read", len(self.table) - first_row)
+                    count("log bytes parsed", log_state[1] - parsed_size)
+                    self.remember_log_end(log_state)
+                if journal_state != old_journal_state:
+                    self.replay_journal(self.table, old_journal_state[1] if old_journal_state else 0, indexed=True)
+            except BaseException:
+                self.loaded = False  # the cached tasks may have part of what was appended
+                raise
+            self.file_state = file_state
+            return True
+
+    @profiled
+    def replay_journal(self, table, start=0, indexed=False):
+        """
+        Applies the edits and deletes recorded in the journal
+        :param table: TaskTable ... every row of the log file
+        :param start: integer ... byte offset of the first record to apply, the ones before have been applied already
+        :param indexed: boolean ... whether table is the cached one, whose indexes are then updated too
+        :return: None
+        """
+        with open(self.journal_file_name, 'rb') as jf:
+            jf.seek(start)
+            for record in csv.reader(io.TextIOWrapper(jf, newline='')):
+                if len(record) < 3 or not record[1].isdigit():
+                    continue  # cut short by a crash
+                operation, row_id, fingerprint = record[0], int(record[1]), record[2]
+                if row_id >= len(table) or not table.alive[row_id] or \
+                        fingerprint not in (row_fingerprint(table.get_row(row_id)),
+                                            row_fingerprint(table.get_row(row_id), with_id=False)):  # older journals
+                    continue  # left over from a journal that has already been folded into the log
+                if operation == "E" and len(record) == 7:
+                    if indexed:
+                        self.unindex_row(row_id)
+                    table.replace(row_id, record[3:])
+                    if indexed:
+                        self.index_row(row_id)
+                elif operation == "D":
+                    if indexed:
+                        self.unindex_row(row_id)
+                    table.delete(row_id)
+
+    def refresh(self):
+        """
+        Brings the tasks up to date if the log file has changed since we last saw it, reading only what was appended
+        to it if that is all that changed, and reloading it otherwise
+        :return: TaskTable
+        """
+        with self.lock:
+            up_to_date = self.loaded and self.get_file_state() == self.file_state
+            count_hit("tasks kept in memory", up_to_date)
+            if not up_to_date:
+                appended = self.read_appended()
+                count_hit("only appended rows read", appended)
+                if not appended:
+                    self.load()
+            return self.table
+
+    def next_free_id(self, table):
+        """
+        The id to give to the next new task: after those of the table, and between first_id and last_id
+        :param table: TaskTable
+        :return: integer
+        """
+        max_id = table.max_id
+        if self.last_id is not None and max_id > self.last_id:  # some tasks came from another part of the log
+            max_id = max((task_id for task_id in table.ids if task_id <= self.last_id), default=0)
+        return max(max_id + 1, self.first_id)
+
+    def get_tasks(self):
+        """
+        Returns the tasks in the log, reloading them only if the file has changed since we last saw it
+        :return: [TaskRow]
+        """
+        with self.lock:
+            table = self.refresh()
+            return [TaskRow(table, row_id) for row_id in table.live_row_ids()]
+
+    def get_version(self):
+        """
+        :return: ((integer, integer), (integer, integer)) ... state of the log and the journal, see get_file_state
+        """
+        with self.lock:
+            self.refresh()
+            return self.file_state
+
+    def get_time_columns(self):
+        """
+        Copies the date and minutes columns of the tasks still in the log
+        :return: (array, array) ... date ordinals and minutes, as array('i')
+        """
+        with self.lock:
+            table = self.refresh()
+            if table.live_rows == len(table):
+                return array('i', table.ordinals), array('i', table.minutes)
+            return (array('i', itertools.compress(table.ordinals, table.alive)),
+                    array('i', itertools.compress(table.minutes, table.alive)))
+
+    def append_rows(self, rows):
+        """
+        Appends rows to the log file, and to the cached tasks if they are still in step with the file.
+
+        The rows are read APPEND_BUFFER_ROWS at a time before taking the lock, so that a slow iterable, e.g. rows
+        read from the standard input, doesn't keep other processes waiting, see buffered_rows. If reading them raises,
+        the rows before are still appended.
+        :param rows: iterable of [string] ... rows as normalize_row makes them
+        :return: integer ... number of rows appended
+        """
+        appended_rows = 0
+        for buffer, error in buffered_rows(rows):
+            appended_rows += self.append_buffer(buffer)
+            if error is not None:
+                raise error
+        return appended_rows
+
+    def append_buffer(self, rows):
+        """
+        Appends rows already read to the log file.
+
+        Rows appended at the same time by several threads are committed together: the first thread to come writes
+        them all, with a single open and fsync of the log, while the others wait for it. The rows of each call are
+        written together and in order.
+        :param rows: [[string]] ... rows as normalize_row makes them
+        :return: integer ... number of rows appended
+        """
+        pending_append = PendingAppend(rows)
+        with self.append_condition:
+            self.pending_appends.append(pending_append)
+            while pending_append.appended is None and pending_append.error is None:
+                if self.appending:
+                    self.append_condition.wait()
+                    continue
+                pending_appends, self.pending_appends = self.pending_appends, []
+                self.appending = True
+                self.append_condition.release()
+                try:
+                    self.write_appends(pending_appends)
+                finally:
+                    self.append_condition.acquire()
+                    self.appending = False
+                    self.append_condition.notify_all()
+        if pending_append.error is not None:
+            raise pending_append.error
+        return pending_append.appended
+
+    @profiled
+    def write_appends(self, pending_appends):
+        """
+        Writes the rows of several appends at the end of the log file, giving ids to the rows that have none. The ids
+        taken are known from the cached tasks if they are up to date, or else from the sidecar, and the log is only
+        loaded if neither says.
+        :param pending_appends: [PendingAppend] ... each one gets the number of rows written or the error raised
+        :return: None
+        """
+        try:
+            with self.locked(exclusive=True):
+                file_state = self.get_file_state()
+                in_step = self.loaded and file_state == self.file_state
+                given_id = None if in_step else read_given_id(self.sidecar_file_name, file_state[0])
+                if not in_step and given_id is None:
+                    self.load()  # changed by a writer that doesn't keep the last id in the sidecar
+                    in_step = True
+                offset = file_state[0][1] if file_state[0] else 0
+                new_ids = itertools.count(self.next_free_id(self.table) if in_step else max(given_id + 1,
+                                                                                             self.first_id))
+                with open(self.file_name, 'ab', buffering=1024 * 1024) as f:
+                    for pending_append in pending_appends:
+                        appended_rows = 0
+                        try:
+                            for row, encoded_row in encode_rows(with_ids(pending_append.rows, new_ids)):
+                                f.write(encoded_row)
+                                if in_step:
+                                    self.index_row(self.table.append(row, offset))
+                                offset += len(encoded_row)
+                                appended_rows += 1
+                        except Exception as error:
+                            pending_append.error = error  # the rows before the bad one are still appended
+                        pending_append.appended = appended_rows
+                    f.flush()
+                    os.fsync(f.fileno())
+                file_state = self.get_file_state()
+                if file_state[0][1] == offset:
+                    write_given_id(self.sidecar_file_name, file_state[0], next(new_ids) - 1)
+                if in_step and file_state[0][1] == offset:
+                    self.file_state = file_state
+                    self.remember_log_end(file_state[0])
+                else:
+                    self.loaded = False  # the file changed under us, e.g. by a writer that doesn't lock
+        except BaseException as error:
+            self.loaded = False  # the rows may be in the cached tasks and not in the file
+            for pending_append in pending_appends:
+                if pending_append.error is None:
+                    pending_append.error = error
+            if not isinstance(error, Exception):
+                raise
+
+    def append_to_journal(self, record):
+        """
+        Appends an edit or a delete to the journal
+        :param record: [string] ... operation, row number, fingerprint of the row and, for edits, the new row
+        :return: None
+        """
+        file_state = self.get_file_state()
+        with open(self.journal_file_name, 'a', newline='') as f:
+            writer = csv.writer(f)
+            writer.writerow(record)
+            f.flush()
+            os.fsync(f.fileno())
+        if file_state == self.file_state:
+            self.file_state = self.get_file_state()
+        else:
+            self.loaded = False  # somebody else changed the files too, the next refresh() reloads them
+
+    @profiled
+    def write_rows(self, rows, ordinals=None):
+        """
+        Writes rows over the log file, folding the journal into it, and makes them the cached tasks. Rows without an
+        id are given a new one.
+        :param rows: [[string]] ... date, description, time spent, notes and, optionally, id
+        :param ordinals: [integer] ... date ordinal of each row, if the caller has them already
+        :return: None
+        """
+        with self.locked(exclusive=True):
+            table = TaskTable()
+            for row, ordinal in zip(rows, ordinals or itertools.repeat(None)):
+                table.append(row, ordinal=ordinal)
+            if 0 in table.ids:
+                table.give_ids(itertools.count(max(self.next_free_id(table), self.next_free_id(self.table))))
+            offsets = write_log_rows_atomically(self.file_name, (table.get_row(row_id) for row_id in range(len(table))))
+            table.log_offsets = array('q', offsets)
+            if os.path.exists(self.journal_file_name):
+                os.remove(self.journal_file_name)
+            self.table = table
+            self.loaded = True
+            self.file_state = self.get_file_state()
+            log_state = self.file_state[0]
+            self.remember_log_end(log_state)
+            if log_state[1] >= SIDECAR_MIN_SIZE:
+                write_sidecar(self.sidecar_file_name, table, log_state, hash_file(self.file_name, log_state[1]),
+                              self.next_free_id(table) - 1)
+            else:
+                write_given_id(self.sidecar_file_name, log_state, self.next_free_id(table) - 1)
+            self.reset_indexes()
+
+    def save(self):
+        """
+        Writes the cached tasks over the log file, folding the journal into it
+        :return: None
+        """
+        with self.locked(exclusive=True):
+            self.refresh()
+            row_ids = self.table.live_row_ids()
+            self.write_rows([self.table.get_row(row_id) for row_id in row_ids],
+                            [self.table.ordinals[row_id] for row_id in row_ids])
+
+    @profiled
+    def compact(self):
+        """
+        Folds the journal into the log file
+        :return: None
+        """
+        with self.locked(exclusive=True):
+            self.refresh()
+            if self.file_state[1]:
+                self.save()
+
+    def compact_if_needed(self):
+        """
+        Starts folding the journal into the log file in the background once the journal is big enough
+        :return: None
+        """
+        journal_state = self.file_state[1]
+        if journal_state and journal_state[1] >= JOURNAL_COMPACTION_SIZE:
+            if self.compaction is None or not self.compaction.is_alive():
+                # not a daemon thread, so the script waits for it before exiting
+                self.compaction = threading.Thread(target=self.compact, name="worklog-compaction")
+                self.compaction.start()
+
+    def get_task(self, row_id):
+        """
+        Returns a task by its row number
+        :param row_id: integer
+        :return: TaskRow ... None if there is no such row or it has been deleted
+        """
+        with self.lock:
+            table = self.refresh()
+            if 0 <= row_id < len(table) and table.alive[row_id]:
+                return TaskRow(table, row_id)
+            return None
+
+    def get_task_by_id(self, task_id):
+        """
+        Returns a task by its id, through the id index
+        :param task_id: integer
+        :return: TaskRow ... None if there is no task with that id
+        """
+        with self.lock:
+            row_id = self.get_id_index().find(task_id)
+            return TaskRow(self.table, row_id) if row_id is not None else None
+
+    def find_row(self, task):
+        """
+        Finds the row of a task, straight away if it was read from the current table, through the id index if it has
+        an id, or else the first equal one
+        :param task: Task
+        :return: integer ... row number, or None if the task is no longer in the log
+        """
+        table = self.refresh()
+        if isinstance(task, TaskRow) and task.table is table:
+            return task.row_id if table.alive[task.row_id] else None
+        if task.task_id is not None:
+            return self.get_id_index().find(task.task_id)
+        task_row = normalize_row(task_to_row(task))
+        for row_id in table.live_row_ids():
+            if table.get_row(row_id)[:4] == task_row:
+                return row_id
+        return None
+
+    def replace_task(self, old_task, new_task):
+        """
+        Replaces a task by a new one. With the journal the new task takes the place of the old one, otherwise it goes
+        to the end of the log and the whole log is saved.
+        :param old_task: Task
+        :param new_task: Task
+        :return: None ... raises a ValueError, and changes nothing, if the old task is no longer in the log
+        """
+        with self.locked(exclusive=True):
+            row_id = self.find_row(old_task)  # reloads the tasks first if another process changed them
+            if row_id is None:
+                raise ValueError("the task to replace is no longer in the log")
+            new_row = normalize_row(task_to_row(new_task))
+            if USE_JOURNAL:
+                # the journal is written first, so a failed write leaves the cached tasks as they were
+                self.append_to_journal(["E", str(row_id), row_fingerprint(self.table.get_row(row_id))] + new_row)
+                self.unindex_row(row_id)
+                self.table.replace(row_id, new_row)
+                self.index_row(row_id)
+                self.compact_if_needed()
+            else:
+                new_row.append(str(self.table.ids[row_id] or ""))
+                self.table.delete(row_id)
+                self.write_rows([self.table.get_row(i) for i in self.table.live_row_ids()] + [new_row])
+
+    def delete_task(self, task):
+        """
+        Deletes a task, through the journal or by saving the whole log
+        :param task: Task
+        :return: None
+        """
+        with self.locked(exclusive=True):
+            row_id = self.find_row(task)  # reloads the tasks first if another process changed them
+            if row_id is None:
+                return
+            if USE_JOURNAL:  # written first, so a failed write leaves the cached tasks as they were
+                self.append_to_journal(["D", str(row_id), row_fingerprint(self.table.get_row(row_id))])
+            self.unindex_row(row_id)
+            self.table.delete(row_id)
+            if USE_JOURNAL:
+                self.compact_if_needed()
+            else:
+                self.save()
+
+    def warm_up(self):
+        """
+        Loads the tasks and builds every index
+        :return: None
+        """
+        with self.lock:
+            self.get_date_index()
+            self.get_time_index()
+            self.get_word_index()
+            self.get_trigram_index()
+            self.get_id_index()
+
+    def reset_indexes(self):
+        """
+        Drops the indexes after the table has been replaced, they are built again when needed
+        :return: None
+        """
+        self.date_index = None
+        self.word_index = None
+        self.time_index = None
+        self.trigram_index = None
+        self.id_index = None
+
+    def index_row(self, row_id):
+        """
+        Adds a row to the indexes that have been built
+        :param row_id: integer
+        :return: None
+        """
+        if self.date_index:
+            self.date_index.add(row_id, self.table.ordinals[row_id])
+        if self.word_index:
+            self.word_index.add(row_id, task_words(TaskRow(self.table, row_id)))
+        if self.time_index:
+            self.time_index.add(row_id, self.table.minutes[row_id])
+        if self.trigram_index:
+            self.trigram_index.add(row_id, task_trigrams(TaskRow(self.table, row_id)))
+        if self.id_index and self.table.ids[row_id]:
+            self.id_index.add(row_id, self.table.ids[row_id])
+
+    def unindex_row(self, row_id):
+        """
+        Removes a row from the indexes that have been built, before it changes
+        :param row_id: integer
+        :return: None
+        """
+        if self.date_index:
+            self.date_index.remove(row_id, self.table.ordinals[row_id])
+        if self.word_index:
+            self.word_index.remove(row_id, task_words(TaskRow(self.table, row_id)))
+        if self.time_index:
+            self.time_index.remove(row_id, self.table.minutes[row_id])
+        if self.trigram_index:
+            self.trigram_index.remove(row_id, task_trigrams(TaskRow(self.table, row_id)))
+        if self.id_index and self.table.ids[row_id]:
+            self.id_index.remove(row_id, self.table.ids[row_id])
+
+    def rows_to_tasks(self, row_ids):
+        """
+        :param row_ids: iterable of integer ... row numbers in the current table
+        :return: [TaskRow]
+        """
+        return [TaskRow(self.table, row_id) for row_id in row_ids]
+
+    def get_date_index(self):
+        """
+        Returns the date index of the current tasks, building it if needed
+        :return: DateIndex
+        """
+        with self.lock:
+            table = self.refresh()
+            count_hit("date index", self.date_index is not None)
+            if self.date_index is None:
+                self.date_index = DateIndex(table)
+            return self.date_index
+
+    def get_dates_with_tasks(self):
+        """
+        The dates that have tasks, in order
+        :return: [string] ... dd/mm/yyyy
+        """
+        return [ordinal_to_date(ordinal) for ordinal in self.get_date_index().ordinals]
+
+    @profiled
+    def find_by_date_range(self, first_date, last_date):
+        """
+        Finds the tasks between two dates, both included
+        :param first_date: string ... dd/mm/yyyy
+        :param last_date: string ... dd/mm/yyyy
+        :return: [TaskRow] ... ordered by date
+        """
+        with self.lock:
+            date_index = self.get_date_index()
+            return self.rows_to_tasks(date_index.find_range(date_to_ordinal(first_date), date_to_ordinal(last_date)))
+
+    def get_time_index(self):
+        """
+        Returns the time spent index of the current tasks, building it if needed
+        :return: TimeSpentIndex
+        """
+        with self.lock:
+            table = self.refresh()
+            count_hit("time index", self.time_index is not None)
+            if self.time_index is None:
+                self.time_index = TimeSpentIndex(table)
+            return self.time_index
+
+    def get_id_index(self):
+        """
+        Returns the id index of the current tasks, building it if needed
+        :return: IdIndex
+        """
+        with self.lock:
+            table = self.refresh()
+            count_hit("id index", self.id_index is not None)
+            if self.id_index is None:
+                self.id_index = IdIndex(table)
+            return self.id_index
+
+    @profiled
+    def find_by_time_spent(self, first_minutes, last_minutes):
+        """
+        Finds the tasks that took between two amounts of minutes, both included
+        :param first_minutes: integer
+        :param last_minutes: integer
+        :return: [TaskRow] ... in log order
+        """
+        with self.lock:
+            return self.rows_to_tasks(self.get_time_index().find_range(first_minutes, last_minutes))
+
+    @profiled
+    def time_spent_percentile(self, percent):
+        """
+        The minutes that a given percentage of the tasks don't go over, see TimeSpentIndex.percentile
+        :param percent: number ... from 0 to 100
+        :return: integer ... None if there are no tasks
+        """
+        with self.lock:
+            return self.get_time_index().percentile(percent)
+
+    def get_word_index(self):
+        """
+        Returns the word index of the current tasks, building it if needed
+        :return: WordIndex
+        """
+        with self.lock:
+            table = self.refresh()
+            count_hit("word index", self.word_index is not None)
+            if self.word_index is None:
+                self.word_index = WordIndex(table)
+            return self.word_index
+
+    @profiled
+    def find_by_words(self, words):
+        """
+        Finds the tasks whose description or notes use all the given words, in any order
+        :param words: string
+        :return: [TaskRow] ... in log order
+        """
+        with self.lock:
+            return self.rows_to_tasks(self.get_word_index().find(split_words(words)))
+
+    def get_trigram_index(self, build=True):
+        """
+        Returns the trigram index of the current tasks, building it if needed
+        :param build: boolean ... False to get None rather than build it
+        :return: TrigramIndex
+        """
+        with self.lock:
+            table = self.refresh()
+            count_hit("trigram index", self.trigram_index is not None)
+            if self.trigram_index is None and build:
+                self.trigram_index = TrigramIndex(table)
+            return self.trigram_index
+
+    def find_candidates(self, texts):
+        """
+        The rows that may contain all the given texts, by the trigram index. Building the index takes several times as
+        long as checking every row once, so the first search by text of the store checks every row and the index is
+        only built from the second one on.
+        :param texts: [string] ... case folded, see TrigramIndex.find
+        :return: [integer] ... row numbers, in order, None if every row has to be checked
+        """
+        if not any(len(text) >= 3 for text in texts):
+            return None  # nothing to look up
+        with self.lock:
+            table = self.refresh()
+            trigram_index = self.get_trigram_index(build=self.scans > 0)
+            candidates = trigram_index.find(texts) if trigram_index else None
+            if candidates is None:
+                self.scans += 1
+            else:
+                count_hit("rows pruned by trigrams", True, table.live_rows - len(candidates))
+                count_hit("rows pruned by trigrams", False, len(candidates))
+            return candidates
+
+    @profiled
+    def find_by_substring(self, text):
+        """
+        Finds the tasks whose description or notes contain a text anywhere, in any case, checking only the rows that
+        the trigram index leaves
+        :param text: string
+        :return: [TaskRow] ... in log order
+        """
+        folded_text = text.casefold()
+        with self.lock:
+            table = self.refresh()
+            candidates = self.find_candidates([folded_text])
+            return self.rows_to_tasks(row_id for row_id in (table.live_row_ids() if candidates is None else candidates)
+                                      if folded_text in table.get_description(row_id).casefold() or
+                                      folded_text in table.get_notes(row_id).casefold())
+
+    @profiled
+    def find_fuzzy(self, text, limit=20):
+        """
+        Finds the tasks most like a text, even with typos, see TrigramIndex.rank
+        :param text: string
+        :param limit: integer ... most tasks to find
+        :return: [(float, TaskRow)] ... score from 0 to 1 and task, best first, then in log order
+        """
+        with self.lock:
+            ranked_rows = self.get_trigram_index().rank(text, FUZZY_MIN_SCORE)[:limit]
+            return [(score, TaskRow(self.table, row_id)) for score, row_id in ranked_rows]
+
+    def estimate_rows(self, query, condition, build):
+        """
+        How many rows may meet a condition of a query, by its index and without finding them: exactly for the date and
+        the minutes, and at most the rows of the rarest word or trigram for the texts
+        :param query: Query
+        :param condition: string ... one of QUERY_CONDITIONS
+        :param build: boolean ... whether to build the word index if needed, the trigram index is never built for this
+        :return: (integer, float) ... the rows, and the cost of finding them with the index, see QUERY_INDEX_COSTS,
+        None if no index can tell, as every row has to be checked
+        """
+        if condition == "date":
+            rows = self.get_date_index().count_range(*query.ordinals)
+            return rows, rows * QUERY_INDEX_COSTS[condition]
+        if condition == "minutes":
+            rows = self.get_time_index().count_range(*query.minutes)
+            return rows, rows * QUERY_INDEX_COSTS[condition]
+        if condition == "text":
+            words = split_words(query.text)
+            if not words or (self.word_index is None and not build):
+                return None
+            estimate = self.get_word_index().estimate(words)
+        else:
+            trigram_index = self.get_trigram_index(build=False)
+            estimate = trigram_index and trigram_index.estimate([query.contains.casefold()] if condition == "contains"
+                                                                else required_texts(query.pattern))
+            if estimate is None:
+                return None
+        rows, postings = estimate
+        return rows, rows * postings * QUERY_INDEX_COSTS[condition]
+
+    def find_query_candidates(self, query, condition):
+        """
+        The rows that the index of a condition of a query leaves, see estimate_rows
+        :param query: Query
+        :param condition: string ... one of QUERY_CONDITIONS, with an estimate
+        :return: [integer] ... row numbers, by date for the date, in order otherwise, those of the texts still to be
+        checked
+        """
+        if condition == "date":
+            return self.get_date_index().find_range(*query.ordinals)
+        if condition == "minutes":
+            return self.get_time_index().find_range(*query.minutes)
+        if condition == "text":
+            return self.get_word_index().find(split_words(query.text))
+        return self.get_trigram_index().find([query.contains.casefold()] if condition == "contains" else
+                                             required_texts(query.pattern))
+
+    @profiled
+    def run_query(self, query, plan=None):
+        """
+        Finds the tasks that meet every condition of a query, taking them in the order that costs least, see
+        order_conditions. The first is searched as on its own, and each of the others either checks the rows left or,
+        when cheaper, intersects them with what its index finds.
+        :param query: Query
+        :param plan: QueryPlan ... to add the steps taken to, see QueryPlan.explain
+        :return: [TaskRow] ... in log order
+        """
+        searches = {"text": lambda: self.find_by_phrase(query.text),
+                    "contains": lambda: self.find_by_substring(query.contains),
+                    "pattern": lambda: self.find_by_pattern(query.pattern)}
+        index_names = {"date": "date index", "minutes": "time spent index", "text": "word index",
+                       "contains": "trigram index", "pattern": "trigram index"}
+        with self.locked():  # the rows and the indexes must stay those of the same table
+            start = time.perf_counter()
+            table = self.refresh()
+            if plan is not None:
+                plan.add_step("log", "load if changed", None, table.live_rows, (time.perf_counter() - start) * 1000)
+            start = time.perf_counter()
+            conditions = query.get_conditions()
+            build = "date" not in conditions and "minutes" not in conditions
+            estimates = {condition: self.estimate_rows(query, condition, build) for condition in conditions}
+            conditions = order_conditions(estimates, table.live_rows)
+            if plan is not None:
+                plan.add_step("plan", "estimate from the indexes, and order", None, None,
+                              (time.perf_counter() - start) * 1000)
+            if not conditions:
+                return self.rows_to_tasks(table.live_row_ids())
+
+            start = time.perf_counter()
+            condition = conditions[0]
+            if condition in searches:
+                rows = sorted(task.row_id for task in searches[condition]())
+            else:
+                rows = sorted(self.find_query_candidates(query, condition))
+            if plan is not None:
+                how = "every row" if estimates[condition] is None else index_names[condition]
+                plan.add_step(query.describe(condition), "search by the " + how,
+                              estimates[condition] and estimates[condition][0], len(rows),
+                              (time.perf_counter() - start) * 1000)
+            for condition in conditions[1:]:
+                start = time.perf_counter()
+                check = query.get_check(condition, table)
+                if not rows:
+                    how = "skip, no rows left"
+                elif narrow_cost(condition, estimates[condition], len(rows))[1]:
+                    candidates = set(self.find_query_candidates(query, condition))
+                    rows = [row_id for row_id in rows if row_id in candidates]
+                    how = "intersect with the " + index_names[condition]
+                    if condition not in ("date", "minutes"):
+                        rows = [row_id for row_id in rows if check(row_id)]
+                        how += ", then check"
+                else:
+                    rows = [row_id for row_id in rows if check(row_id)]
+                    how = "check each row left"
+                if plan is not None:
+                    plan.add_step(query.describe(condition), how, estimates[condition] and estimates[condition][0],
+                                  len(rows), (time.perf_counter() - start) * 1000)
+            return self.rows_to_tasks(rows)
+
+    @profiled
+    def find_by_pattern(self, pattern):
+        """
+        Finds the tasks whose description or notes match a regular expression. Only the rows that the trigram index
+        leaves for the plain text in the pattern are checked, see required_texts. Otherwise big logs are scanned
+        straight from the file, split in chunks that are searched in parallel by a pool of processes.
+        :param pattern: compiled regular expression
+        :return: [TaskRow] ... in log order
+        """
+        with self.locked():  # the log file is read again, it must not change meanwhile
+            table = self.refresh()
+            candidates = self.find_candidates(required_texts(pattern))
+            if candidates is not None:
+                return self.rows_to_tasks(row_id for row_id in candidates
+                                          if pattern.search(table.get_description(row_id)) or
+                                          pattern.search(table.get_notes(row_id)))
+            log_size = self.file_state[0][1] if self.file_state[0] else 0
+            if log_size < PARALLEL_SCAN_SIZE or (os.cpu_count() or 1) < 2 or get_fork_context() is None:
+                return self.rows_to_tasks(row_id for row_id in table.live_row_ids()
+                                          if pattern.search(table.get_description(row_id)) or
+                                          pattern.search(table.get_notes(row_id)))
+
+            # the file holds the rows as they were loaded, edited ones are searched here
+            rows_by_offset = {}
+            found_rows = []
+            for row_id in table.live_row_ids():
+                if table.log_offsets[row_id] >= 0:
+                    rows_by_offset[table.log_offsets[row_id]] = row_id
+                elif pattern.search(table.get_description(row_id)) or pattern.search(table.get_notes(row_id)):
+                    found_rows.append(row_id)
+            count("log bytes scanned in parallel", log_size)
+            matching_offsets = scan_log_in_parallel(self.file_name, sorted(rows_by_offset), log_size, pattern)
+            found_rows.extend(rows_by_offset[offset] for offset in matching_offsets if offset in rows_by_offset)
+            return self.rows_to_tasks(sorted(found_rows))
+
+
+class LogFollower():
+    def __init__(self, store, poll_interval=FOLLOW_POLL_INTERVAL):
+        """
+        Keeps a TaskStore up to date in the background while other processes write to its log. A thread waits for the
+        log or its journal to change, through inotify on Linux or by looking every poll_interval seconds, and then
+        refreshes the store. inotify watches the directory, as rewriting the log replaces the file.
+
+        :param store: TaskStore
+        :param poll_interval: float ... seconds
+        """
+        self.store = store
+        self.poll_interval = poll_interval
+        self.directory, log_name = os.path.split(os.path.abspath(store.file_name))
+        self.followed_names = {log_name, os.path.basename(store.journal_file_name)}
+        self.inotify_fd = None  # file descriptor of the inotify instance, None when polling
+        self.stopping = threading.Event()
+        self.thread = None
+        self.refreshes = 0  # times the store was refreshed after a change
+
+    def start(self):
+        """
+        Starts following the log
+        :return: LogFollower ... itself
+        """
+        self.inotify_fd = open_inotify(self.directory)
+        self.thread = threading.Thread(target=self.follow, name="worklog-follower", daemon=True)
+        self.thread.start()
+        return self
+
+    def stop(self):
+        """
+        Stops following the log, waiting for the thread to finish
+        :return: None
+        """
+        self.stopping.set()
+        if self.thread:
+            self.thread.join()
+        if self.inotify_fd is not None:
+            os.close(self.inotify_fd)
+            self.inotify_fd = None
+
+    def wait_for_change(self):
+        """
+        Waits for the log or its journal to change, or for poll_interval seconds at most, to see whether to stop
+        :return: boolean ... whether they may have changed
+        """
+        if self.inotify_fd is None:
+            return not self.stopping.wait(self.poll_interval)
+        if not select.select([self.inotify_fd], [], [], self.poll_interval)[0]:
+            return False
+        changed_names = read_inotify_names(self.inotify_fd)
+        return changed_names is None or not self.followed_names.isdisjoint(changed_names)
+
+    def follow(self):
+        """
+        Refreshes the store whenever the log changes, until stopped
+        :return: None
+        """
+        while not self.stopping.is_set():
+            if self.wait_for_change() and not self.stopping.is_set():
+                try:
+                    self.store.refresh()
+                    self.refreshes += 1
+                except Exception:
+                    pass  # e.g. a row half written by a script that does not lock, the next search reports it
+
+
+class SqliteStore(LogStore):
+    def __init__(self, file_name):
+        """
+        Keeps a log in a SQLite database, with indexes on the date and the time spent and a full text index on the
+        descriptions and notes, so that every search but those by pattern is answered from an index. The row id of a
+        task is its id too: they start at 1 like those of a csv log, and edited tasks keep theirs. The database is
+        opened when first used.
+
+        :param file_name: string ... path to the database
+        """
+        super().__init__(file_name)
+        self.connection = None
+        self.text_index = None  # full text module of the tasks_text table, None if this SQLite has none
+
+    @profiled
+    def connect(self):
+        """
+        Opens the database the first time, creating its tables and indexes if needed
+        :return: sqlite3.Connection ... in autocommit mode, see transaction
+        """
+        with self.lock:
+            if self.connection is None:
+                sqlite3 = lazy_import("sqlite3")
+                connection = sqlite3.connect(self.file_name, timeout=60, isolation_level=None,
+                                             check_same_thread=False)  # threads take turns through self.lock
+                connection.execute("PRAGMA journal_mode=WAL")  # readers in other processes don't wait for writers
+                connection.executescript(SQLITE_SCHEMA)
+                row = connection.execute("SELECT sql FROM sqlite_master WHERE name = 'tasks_text'").fetchone()
+                if row:
+                    self.text_index = "fts5" if "fts5" in row[0].lower() else "fts4"
+                else:
+                    for module, statement in SQLITE_TEXT_INDEXES:
+                        try:
+                            connection.execute(statement)
+                        except sqlite3.OperationalError:
+                            continue  # not compiled into this SQLite
+                        connection.execute("INSERT INTO tasks_text(tasks_text) VALUES ('rebuild')")
+                        self.text_index = module
+                        break
+                self.connection = connection
+            return self.connection
+
+    def warm_up(self):
+        """
+        Opens the database
+        :return: None
+        """
+        self.connect()
+
+    @contextmanager
+    def transaction(self):
+        """
+        Holds the store and runs the statements inside as a single write transaction
+        :return: sqlite3.Connection
+        """
+        with self.lock:
+            connection = self.connect()
+            connection.execute("BEGIN IMMEDIATE")  # takes the write lock now, so it can't fail halfway for it
+            try:
+                yield connection
+            except BaseException:
+                connection.execute("ROLLBACK")
+                raise
+            connection.execute("COMMIT")
+
+    @profiled
+    def select_tasks(self, condition="", parameters=(), order="id"):
+        """
+        :param condition: string ... WHERE clause, if any
+        :param parameters: tuple ... for the condition
+        :param order: string ... ORDER BY clause
+        :return: [StoredTask]
+        """
+        dates = {}  # ordinal: dd/mm/yyyy, as most tasks share their date with others
+        tasks = []
+        statement = "SELECT id, ordinal, description, minutes, notes FROM tasks {} ORDER BY {}".format(condition, order)
+        with self.lock:
+            for row_id, ordinal, description, minutes, notes in self.connect().execute(statement, parameters):
+                if ordinal not in dates:
+                    dates[ordinal] = ordinal_to_date(ordinal)
+                tasks.append(StoredTask(row_id, description, minutes, notes, dates[ordinal], row_id))
+        return tasks
+
+    def insert_rows(self, connection, rows):
+        """
+        Inserts rows after the last task, inside a transaction. Rows with an id keep it, the others are given the next
+        ones.
+        :param connection: sqlite3.Connection
+        :param rows: iterable of [string] ... rows as normalize_row makes them
+        :return: integer ... number of rows inserted
+        """
+        new_ids = itertools.count(connection.execute("SELECT coalesce(max(id) + 1, 1) FROM tasks").fetchone()[0])
+        values = [(int(row[4]), date_to_ordinal(row[0]), row[1], int(row[2]), row[3])
+                  for row in with_ids(rows, new_ids)]
+        connection.executemany("INSERT INTO tasks (id, ordinal, description, minutes, notes) VALUES (?, ?, ?, ?, ?)",
+                               values)
+        if self.text_index:
+            connection.executemany("INSERT INTO tasks_text(rowid, description, notes) VALUES (?, ?, ?)",
+                                   ((value[0], value[2], value[4]) for value in values))
+        return len(values)
+
+    def unindex_text(self, connection, row_id, row):
+        """
+        Takes a task out of the full text index, before it changes
+        :param connection: sqlite3.Connection
+        :param row_id: integer
+        :param row: [string] ... the task as it is in the database
+        :return: None
+        """
+        if self.text_index:
+            connection.execute("INSERT INTO tasks_text(tasks_text, rowid, description, notes) "
+                               "VALUES ('delete', ?, ?, ?)", (row_id, row[1], row[3]))
+
+    def find_row(self, connection, task):
+        """
+        Finds the id of a task: its own if it has one, the row id it was read with if it still is as read, or else that
+        of the first equal one
+        :param connection: sqlite3.Connection
+        :param task: Task
+        :return: (integer, [string]) ... the id and the task as a row, the id being None if the task isn't there
+        """
+        row = normalize_row(task_to_row(task))
+        if task.task_id is not None:
+            found = connection.execute("SELECT id, ordinal, description, minutes, notes FROM tasks WHERE id = ?",
+                                       (task.task_id,)).fetchone()
+            if found is None:
+                return None, row
+            return found[0], [ordinal_to_date(found[1]), found[2], str(found[3]), found[4]]
+        values = (date_to_ordinal(row[0]), row[1], int(row[2]), row[3])
+        condition = "ordinal = ? AND description = ? AND minutes = ? AND notes = ?"
+        found = None
+        if isinstance(getattr(task, "row_id", None), int):
+            found = connection.execute("SELECT id FROM tasks WHERE id = ? AND " + condition,
+                                       (task.row_id,) + values).fetchone()
+        if found is None:
+            found = connection.execute("SELECT id FROM tasks WHERE " + condition + " ORDER BY id LIMIT 1",
+                                       values).fetchone()
+        return (found[0] if found else None), row
+
+    def get_tasks(self):
+        return self.select_tasks()
+
+    def get_version(self):
+        """
+        :return: (integer, integer) ... changes made by other connections to the database, and by this one
+        """
+        with self.lock:
+            connection = self.connect()
+            return connection.execute("PRAGMA data_version").fetchone()[0], connection.total_changes
+
+    def get_time_columns(self):
+        with self.lock:
+            ordinals, minutes = array('i'), array('i')
+            for ordinal, task_minutes in self.connect().execute("SELECT ordinal, minutes FROM tasks"):
+                ordinals.append(ordinal)
+                minutes.append(task_minutes)
+            return ordinals, minutes
+
+    def get_task(self, row_id):
+        tasks = self.select_tasks("WHERE id = ?", (row_id,))
+        return tasks[0] if tasks else None
+
+    def get_task_by_id(self, task_id):
+        return self.get_task(task_id)
+
+    @profiled
+    def append_rows(self, rows):
+        appended_rows = 0
+        for buffer, error in buffered_rows(rows):  # read before taking the write lock, as TaskStore.append_rows
+            with self.transaction() as connection:
+                appended_rows += self.insert_rows(connection, buffer)
+            if error is not None:
+                raise error
+        return appended_rows
+
+    @profiled
+    def write_rows(self, rows):
+        with self.transaction() as connection:
+            connection.execute("DELETE FROM tasks")
+            if self.text_index:
+                connection.execute("INSERT INTO tasks_text(tasks_text) VALUES ('delete-all')")
+            self.insert_rows(connection, (normalize_row(row) for row in rows))
+
+    @profiled
+    def replace_task(self, old_task, new_task):
+        """
+        Replaces a task by a new one, which keeps its id
+        :param old_task: Task
+        :param new_task: Task
+        :return: None ... raises a ValueError, and changes nothing, if the old task is no longer in the log
+        """
+        with self.transaction() as connection:
+            row_id, old_row = self.find_row(connection, old_task)
+            if row_id is None:
+                raise ValueError("the task to replace is no longer in the log")
+            new_row = normalize_row(task_to_row(new_task))
+            self.unindex_text(connection, row_id, old_row)
+            connection.execute("UPDATE tasks SET ordinal = ?, description = ?, minutes = ?, notes = ? WHERE id = ?",
+                               (date_to_ordinal(new_row[0]), new_row[1], int(new_row[2]), new_row[3], row_id))
+            if self.text_index:
+                connection.execute("INSERT INTO tasks_text(rowid, description, notes) VALUES (?, ?, ?)",
+                                   (row_id, new_row[1], new_row[3]))
+
+    @profiled
+    def delete_task(self, task):
+        with self.transaction() as connection:
+            row_id, row = self.find_row(connection, task)
+            if row_id is not None:
+                self.unindex_text(connection, row_id, row)
+                connection.execute("DELETE FROM tasks WHERE id = ?", (row_id,))
+
+    def get_dates_with_tasks(self):
+        with self.lock:
+            return [ordinal_to_date(ordinal) for ordinal,
+                    in self.connect().execute("SELECT DISTINCT ordinal FROM tasks ORDER BY ordinal")]
+
+    def find_by_date_range(self, first_date, last_date):
+        return self.select_tasks("WHERE ordinal BETWEEN ? AND ?", (date_to_ordinal(first_date),
+                                                                    date_to_ordinal(last_date)), "ordinal, id")
+
+    def find_by_time_spent(self, first_minutes, last_minutes):
+        return self.select_tasks("WHERE minutes BETWEEN ? AND ?", (first_minutes, last_minutes))
+
+    @profiled
+    def time_spent_percentile(self, percent):
+        with self.lock:
+            connection = self.connect()
+            rows = connection.execute("SELECT count(*) FROM tasks").fetchone()[0]
+            if not rows:
+                return None
+            return connection.execute("SELECT minutes FROM tasks ORDER BY minutes LIMIT 1 OFFSET ?",
+                                      (nearest_rank(percent, rows),)).fetchone()[0]
+
+    @profiled
+    def find_by_words(self, words):
+        """
+        Finds the tasks that use all the given words, through the full text index or, without one, by checking the
+        tasks that contain them
+        :param words: string
+        :return: [StoredTask] ... in log order
+        """
+        words = set(split_words(words))
+        if not words:
+            return []
+        with self.lock:
+            self.connect()
+            if self.text_index:
+                return self.select_tasks("WHERE id IN (SELECT rowid FROM tasks_text WHERE tasks_text MATCH ?)",
+                                         (" ".join('"{}"'.format(word) for word in words),))
+            conditions = " AND ".join(["(description LIKE ? OR notes LIKE ?)"] * len(words))
+            candidates = self.select_tasks("WHERE " + conditions,
+                                           tuple("%{}%".format(word) for word in words for _ in range(2)))
+        return [task for task in candidates if words <= task_words(task)]
+
+    @profiled
+    def find_by_pattern(self, pattern):
+        with self.lock:
+            self.connect().create_function("matches_pattern", 1, lambda text: pattern.search(text) is not None)
+            return self.select_tasks("WHERE matches_pattern(description) OR matches_pattern(notes)")
+
+    @profiled
+    def run_query(self, query, plan=None):
+        """
+        Runs a query as a single SELECT, leaving the order of the conditions to the query planner of SQLite: the date
+        and the minutes have their indexes, the words of the text the full text index, and the texts and the pattern
+        are checked on the rows left by functions of this script. The plan is the one EXPLAIN QUERY PLAN gives.
+        :param query: Query
+        :param plan: QueryPlan ... to add the steps taken to, see QueryPlan.explain
+        :return: [StoredTask] ... in log order
+        """
+        conditions, parameters = [], []
+        if query.ordinals is not None:
+            conditions.append("ordinal BETWEEN ? AND ?")
+            parameters.extend(query.ordinals)
+        if query.minutes is not None:
+            conditions.append("minutes BETWEEN ? AND ?")
+            parameters.extend(query.minutes)
+        with self.lock:
+            connection = self.connect()
+            if query.text is not None:
+                words = set(split_words(query.text))
+                if words and self.text_index:
+                    conditions.append("id IN (SELECT rowid FROM tasks_text WHERE tasks_text MATCH ?)")
+                    parameters.append(" ".join('"{}"'.format(word) for word in words))
+                connection.create_function("has_text", 1, query.has_text)
+                conditions.append("(has_text(description) OR has_text(notes))")
+            if query.contains is not None:
+                folded_text = query.contains.casefold()
+                connection.create_function("contains_text", 1, lambda text: folded_text in text.casefold())
+                conditions.append("(contains_text(description) OR contains_text(notes))")
+            if query.pattern is not None:
+                connection.create_function("matches_pattern", 1, lambda text: query.pattern.search(text) is not None)
+                conditions.append("(matches_pattern(description) OR matches_pattern(notes))")
+            condition = "WHERE " + " AND ".join(conditions) if conditions else ""
+            if plan is not None:
+                for row in connection.execute("EXPLAIN QUERY PLAN SELECT id FROM tasks " + condition, parameters):
+                    plan.add_step("sqlite", row[-1], None, None, None)
+            start = time.perf_counter()
+            tasks = self.select_tasks(condition, tuple(parameters))
+            if plan is not None:
+                plan.add_step("every condition", "one SELECT", None, len(tasks), (time.perf_counter() - start) * 1000)
+            return tasks
+
+
+class PartitionedStore(LogStore):
+    def __init__(self, file_name):
+        """
+        Keeps a log in a directory with a yyyy-mm.csv file for each month, each kept by a TaskStore, and a manifest of
+        the dates and tasks of each month. Searches by date, appends, edits and deletes only open the months concerned.
+
+        The dates in the manifest are widened before appends and only narrowed when the whole log is written, so they
+        always cover their month. Row ids, and new ids, start from yyyymm * PARTITION_ROW_IDS.
+
+        :param file_name: string ... path to the directory
+        """
+        super().__init__(file_name)
+        self.manifest_file_name = os.path.join(file_name, "manifest.csv")
+        self.manifest = {}  # yyyy-mm: [first date ordinal, last date ordinal, rows]
+        self.manifest_state = None  # stat of the manifest when it was read, see TaskStore.stat_file
+        self.partitions = {}  # yyyy-mm: TaskStore, made the first time the month is used
+        self.file_lock = FileLock(os.path.join(file_name, "manifest.lock"))
+
+    @staticmethod
+    def get_month(ordinal):
+        """
+        :param ordinal: integer ... date ordinal
+        :return: string ... yyyy-mm, the month of the date
+        """
+        day = date.fromordinal(ordinal)
+        return "{:04d}-{:02d}".format(day.year, day.month)
+
+    @staticmethod
+    def group_by_month(rows):
+        """
+        :param rows: iterable of [string] ... date, description, time spent, notes
+        :return: dictionary ... yyyy-mm: ([integer], [[string]]), the date ordinals and the rows of each month
+        """
+        rows_by_month = {}
+        for row in rows:
+            ordinal = date_to_ordinal(row[0])
+            ordinals, month_rows = rows_by_month.setdefault(PartitionedStore.get_month(ordinal), ([], []))
+            ordinals.append(ordinal)
+            month_rows.append(row)
+        return rows_by_month
+
+    @staticmethod
+    def widen(manifest, month, ordinals, added_rows):
+        """
+        Makes the dates of a month in the manifest cover some more dates
+        :param manifest: dictionary ... see self.manifest
+        :param month: string ... yyyy-mm
+        :param ordinals: [integer] ... date ordinals, at least one
+        :param added_rows: integer ... rows added to the month
+        :return: None
+        """
+        entry = manifest.setdefault(month, [min(ordinals), max(ordinals), 0])
+        entry[0] = min(entry[0], min(ordinals))
+        entry[1] = max(entry[1], max(ordinals))
+        entry[2] += added_rows
+
+    def refresh_manifest(self):
+        """
+        Reads the manifest again if it has changed since we last read it. It is always replaced whole, so it can be
+        read without the lock.
+        :return: dictionary ... see self.manifest
+        """
+        with self.lock:
+            manifest_state = TaskStore.stat_file(self.manifest_file_name)
+            if manifest_state != self.manifest_state:
+                manifest = {}
+                if manifest_state:
+                    with open(self.manifest_file_name, 'r', newline='') as f:
+                        for month, first_date, last_date, rows in csv.reader(f):
+                            manifest[month] = [date_to_ordinal(first_date), date_to_ordinal(last_date), int(rows)]
+                self.manifest, self.manifest_state = manifest, manifest_state
+            return self.manifest
+
+    @contextmanager
+    def changing_manifest(self):
+        """
+        Holds the store, and the manifest against other processes, while the partitions change. The manifest is
+        written again at the end if it was changed.
+        :return: dictionary ... a copy of the manifest as it is on disk, to change in place, see self.manifest
+        """
+        with self.lock:
+            os.makedirs(self.file_name, exist_ok=True)
+            self.file_lock.acquire(exclusive=True)
+            try:
+                self.manifest_state = None  # another process may have written it in the same tick of the clock
+                manifest = {month: list(entry) for month, entry in self.refresh_manifest().items()}
+                yield manifest
+                if manifest != self.manifest:
+                    contents = io.StringIO()
+                    csv.writer(contents).writerows([month, ordinal_to_date(first_ordinal),
+                                                    ordinal_to_date(last_ordinal), rows]
+                                                   for month, (first_ordinal, last_ordinal, rows)
+                                                   in sorted(manifest.items()))
+                    write_file_atomically(self.manifest_file_name,
+                                          lambda f: f.write(contents.getvalue().encode("utf-8")))
+                    self.manifest, self.manifest_state = manifest, TaskStore.stat_file(self.manifest_file_name)
+            finally:
+                self.file_lock.release()
+
+    def get_partition(self, month):
+        """
+        :param month: string ... yyyy-mm
+        :return: TaskStore ... of the file of the month
+        """
+        with self.lock:
+            if month not in self.partitions:
+                partition = TaskStore(os.path.join(self.file_name, month + ".csv"))
+                partition.first_id = (int(month[:4]) * 100 + int(month[5:])) * PARTITION_ROW_IDS + 1
+                partition.last_id = partition.first_id + PARTITION_ROW_IDS - 2
+                self.partitions[month] = partition
+            return self.partitions[month]
+
+    def get_partitions(self, first_ordinal=None, last_ordinal=None):
+        """
+        The months in the manifest, or only those that may have tasks between two dates
+        :param first_ordinal: integer ... date ordinal
+        :param last_ordinal: integer ... date ordinal
+        :return: [(string, TaskStore)] ... month and its partition, in order
+        """
+        with self.lock:
+            manifest = self.refresh_manifest()
+            return [(month, self.get_partition(month)) for month in sorted(manifest)
+                    if (first_ordinal is None or manifest[month][1] >= first_ordinal) and
+                    (last_ordinal is None or manifest[month][0] <= last_ordinal)]
+
+    @staticmethod
+    def to_stored_tasks(month, tasks):
+        """
+        :param month: string ... yyyy-mm
+        :param tasks: [TaskRow] ... read from the partition of the month
+        :return: [StoredTask] ... the same tasks, with the row ids of this store
+        """
+        return rows_to_stored_tasks((int(month[:4]) * 100 + int(month[5:])) * PARTITION_ROW_IDS, tasks)
+
+    def find_in_partition(self, task):
+        """
+        Finds the month of a task and the task in the partition of the month
+        :param task: Task
+        :return: (string, Task) ... month, and the TaskRow of the partition if the task came from this store and is
+        still there, otherwise the task as given, for the partition to look for an equal one
+        """
+        if task.task_id is not None:
+            month, partition_task = self.find_by_id(task.task_id)
+            return (month, partition_task) if month is not None else (self.get_month(date_to_ordinal(task.task_date)),
+                                                                      task)
+        if isinstance(task, StoredTask) and task.row_id >= PARTITION_ROW_IDS:
+            month_number, row_id = divmod(task.row_id, PARTITION_ROW_IDS)
+            month = "{:04d}-{:02d}".format(*divmod(month_number, 100))
+            partition_task = self.get_partition(month).get_task(row_id)
+            if partition_task is not None and partition_task == task:
+                return month, partition_task
+        return self.get_month(date_to_ordinal(task.task_date)), task
+
+    def find_by_id(self, task_id):
+        """
+        Finds a task by its id, in the month it was given in first and then, in case it was moved, in the others
+        :param task_id: integer
+        :return: (string, TaskRow) ... month and task of its partition, (None, None) if there is no task with that id
+        """
+        month = "{:04d}-{:02d}".format(*divmod(task_id // PARTITION_ROW_IDS, 100))
+        with self.lock:
+            manifest = self.refresh_manifest()
+            for other_month in ([month] if month in manifest else []) + sorted(set(manifest) - {month}):
+                task = self.get_partition(other_month).get_task_by_id(task_id)
+                if task is not None:
+                    return other_month, task
+            return None, None
+
+    def warm_up(self):
+        """
+        Loads the tasks and builds the indexes of every month
+        :return: None
+        """
+        with self.lock:
+            for month, partition in self.get_partitions():
+                partition.warm_up()
+
+    def get_version(self):
+        """
+        :return: tuple ... state of the manifest and of the files of every month, see TaskStore.get_file_state
+        """
+        with self.lock:
+            partitions = self.get_partitions()
+            return self.manifest_state, tuple(partition.get_file_state() for month, partition in partitions)
+
+    def get_time_columns(self):
+        """
+        :return: (array, array) ... date ordinals and minutes of every task, month after month, as array('i')
+        """
+        with self.lock:
+            ordinals, minutes = array('i'), array('i')
+            for month, partition in self.get_partitions():
+                month_ordinals, month_minutes = partition.get_time_columns()
+                ordinals.extend(month_ordinals)
+                minutes.extend(month_minutes)
+            return ordinals, minutes
+
+    def get_tasks(self):
+        """
+        :return: [StoredTask] ... month after month, in log order within each month
+        """
+        with self.lock:
+            return [task for month, partition in self.get_partitions()
+                    for task in self.to_stored_tasks(month, partition.get_tasks())]
+
+    def get_task(self, row_id):
+        """
+        :param row_id: integer
+        :return: StoredTask ... None if there is no such task
+        """
+        month_number, partition_row_id = divmod(row_id, PARTITION_ROW_IDS)
+        month = "{:04d}-{:02d}".format(*divmod(month_number, 100))
+        with self.lock:
+            if month not in self.refresh_manifest():
+                return None
+            task = self.get_partition(month).get_task(partition_row_id)
+            return self.to_stored_tasks(month, [task])[0] if task is not None else None
+
+    def get_task_by_id(self, task_id):
+        """
+        :param task_id: integer
+        :return: StoredTask ... None if there is no task with that id
+        """
+        with self.lock:
+            month, task = self.find_by_id(task_id)
+            return self.to_stored_tasks(month, [task])[0] if task is not None else None
+
+    @profiled
+    def append_rows(self, rows):
+        """
+        Appends rows to the files of their months, widening the dates of the months in the manifest first. The store
+        isn't held while the rows are written, so that appends from several threads are committed together, see
+        TaskStore.append_rows.
+        :param rows: iterable of [string] ... rows as normalize_row makes them
+        :return: integer ... number of rows appended
+        """
+        rows_by_month = self.group_by_month(rows)
+        with self.changing_manifest() as manifest:
+            for month, (ordinals, month_rows) in rows_by_month.items():
+                self.widen(manifest, month, ordinals, len(month_rows))
+        appended_rows = 0
+        try:
+            for month in sorted(rows_by_month):
+                ordinals, month_rows = rows_by_month[month]
+                appended_rows += self.get_partition(month).append_rows(month_rows)
+                entry = self.refresh_manifest().get(month)
+                if entry is None or entry[0] > min(ordinals) or entry[1] < max(ordinals):
+                    with self.changing_manifest() as manifest:  # the whole log was written meanwhile
+                        self.widen(manifest, month, ordinals, len(month_rows))
+        except Exception:
+            with self.changing_manifest() as manifest:
+                for month in rows_by_month:
+                    manifest[month][2] = self.get_partition(month).refresh().live_rows
+            raise
+        return appended_rows
+
+    @profiled
+    def write_rows(self, rows):
+        """
+        Writes rows over the whole log, a file for each month, and the manifest with their exact dates
+        :param rows: iterable of [string] ... date, description, time spent, notes
+        :return: None
+        """
+        rows_by_month = self.group_by_month(rows)
+        with self.changing_manifest() as manifest:
+            for month in sorted(set(manifest) | set(rows_by_month)):
+                partition = self.get_partition(month)
+                if month in rows_by_month:
+                    ordinals, month_rows = rows_by_month[month]
+                    partition.write_rows(month_rows)
+                    manifest[month] = [min(ordinals), max(ordinals), len(month_rows)]
+                else:
+                    with partition.locked(exclusive=True):
+                        partition.write_rows([])
+                        for file_name in (partition.file_name, partition.sidecar_file_name):
+                            if os.path.exists(file_name):
+                                os.remove(file_name)
+                    del manifest[month]
+
+    @profiled
+    def replace_task(self, old_task, new_task):
+        """
+        Replaces a task by a new one, in the file of its month, or moves it to the file of its new month, where it keeps
+        its id, see move_task
+        :param old_task: Task
+        :param new_task: Task
+        :return: None ... raises a ValueError, and changes nothing, if the old task is no longer in the log
+        """
+        new_row = normalize_row(task_to_row(new_task))
+        new_ordinal = date_to_ordinal(new_row[0])
+        with self.lock:
+            month, partition_task = self.find_in_partition(old_task)
+            if self.get_month(new_ordinal) != month:
+                self.move_task(old_task, new_row, new_ordinal)
+                return
+            with self.changing_manifest() as manifest:
+                if month not in manifest:
+                    raise ValueError("the task to replace is no longer in the log")
+                self.widen(manifest, month, [new_ordinal], 0)
+                self.get_partition(month).replace_task(partition_task, new_task)
+
+    def move_task(self, old_task, new_row, new_ordinal):
+        """
+        Moves a task to the file of another month, where it keeps its id, holding the manifest against other processes
+        all along. The task is appended to its new month before it is deleted from the old one, so that a crash in
+        between leaves it twice rather than lose it.
+        :param old_task: Task
+        :param new_row: [string] ... as normalize_row makes it
+        :param new_ordinal: integer ... date ordinal of the new row
+        :return: None ... raises a ValueError, and changes nothing, if the old task is no longer in the log
+        """
+        new_month = self.get_month(new_ordinal)
+        with self.lock:
+            os.makedirs(self.file_name, exist_ok=True)
+            self.file_lock.acquire(exclusive=True)
+            try:
+                month, partition_task = self.find_in_partition(old_task)  # again, now that nobody else can move it
+                with self.changing_manifest() as manifest:
+                    if month not in manifest or self.get_partition(month).find_row(partition_task) is None:
+                        raise ValueError("the task to replace is no longer in the log")
+                    if isinstance(partition_task, TaskRow) and partition_task.task_id is not None:
+                        new_row = new_row[:4] + [str(partition_task.task_id)]  # it keeps its id
+                    self.widen(manifest, new_month, [new_ordinal], 0)  # the dates cover the task before it is written
+                with self.changing_manifest() as manifest:
+                    new_partition = self.get_partition(new_month)
+                    new_partition.append_rows([new_row])
+                    manifest[new_month][2] = new_partition.refresh().live_rows
+                    old_partition = self.get_partition(month)
+                    old_partition.delete_task(partition_task)
+                    manifest[month][2] = old_partition.refresh().live_rows
+            finally:
+                self.file_lock.release()
+
+    @profiled
+    def delete_task(self, task):
+        """
+        Deletes a task from the file of its month
+        :param task: Task
+        :return: None
+        """
+        with self.lock:
+            month, partition_task = self.find_in_partition(task)
+            if month not in self.refresh_manifest():
+                return
+            partition = self.get_partition(month)
+            with self.changing_manifest() as manifest:
+                partition.delete_task(partition_task)
+                manifest[month][2] = partition.refresh().live_rows
+
+    def get_dates_with_tasks(self):
+        """
+        :return: [string] ... dd/mm/yyyy, in order
+        """
+        with self.lock:
+            return [task_date for month, partition in self.get_partitions()
+                    for task_date in partition.get_dates_with_tasks()]
+
+    @profiled
+    def find_by_date_range(self, first_date, last_date):
+        """
+        Finds the tasks between two dates, both included, only in the months that the manifest says may have them
+        :param first_date: string ... dd/mm/yyyy
+        :param last_date: string ... dd/mm/yyyy
+        :return: [StoredTask] ... ordered by date
+        """
+        with self.lock:
+            partitions = self.get_partitions(date_to_ordinal(first_date), date_to_ordinal(last_date))
+            count("months skipped by date", len(self.manifest) - len(partitions))
+            return [task for month, partition in partitions
+                    for task in self.to_stored_tasks(month, partition.find_by_date_range(first_date, last_date))]
+
+    @profiled
+    def find_by_time_spent(self, first_minutes, last_minutes):
+        """
+        :param first_minutes: integer
+        :param last_minutes: integer
+        :return: [StoredTask] ... month after month, in log order within each month
+        """
+        with self.lock:
+            return [task for month, partition in self.get_partitions()
+                    for task in self.to_stored_tasks(month, partition.find_by_time_spent(first_minutes, last_minutes))]
+
+    @profiled
+    def time_spent_percentile(self, percent):
+        """
+        The minutes that a given percentage of the tasks don't go over, see merged_percentile
+        :param percent: number ... from 0 to 100
+        :return: integer ... None if there are no tasks
+        """
+        with self.lock:
+            return merged_percentile([partition.get_time_index().minutes for month, partition in self.get_partitions()],
+                                     percent)
+
+    @profiled
+    def find_by_words(self, words):
+        """
+        :param words: string
+        :return: [StoredTask] ... those using all the words, month after month
+        """
+        with self.lock:
+            return [task for month, partition in self.get_partitions()
+                    for task in self.to_stored_tasks(month, partition.find_by_words(words))]
+
+    @profiled
+    def find_by_pattern(self, pattern):
+        """
+        :param pattern: compiled regular expression
+        :return: [StoredTask] ... those whose description or notes match, month after month
+        """
+        with self.lock:
+            return [task for month, partition in self.get_partitions()
+                    for task in self.to_stored_tasks(month, partition.find_by_pattern(pattern))]
+
+    @profiled
+    def find_by_substring(self, text):
+        """
+        :param text: string
+        :return: [StoredTask] ... those containing the text anywhere, in any case, month after month
+        """
+        with self.lock:
+            return [task for month, partition in self.get_partitions()
+                    for task in self.to_stored_tasks(month, partition.find_by_substring(text))]
+
+    @profiled
+    def find_fuzzy(self, text, limit=20):
+        """
+        The best tasks of every month, ranked together
+        :param text: string
+        :param limit: integer ... most tasks to find
+        :return: [(float, StoredTask)] ... score and task, best first, then in log order
+        """
+        scored_tasks = []
+        with self.lock:
+            for month, partition in self.get_partitions():
+                month_scored_tasks = partition.find_fuzzy(text, limit)
+                scored_tasks.extend(zip((score for score, task in month_scored_tasks),
+                                        self.to_stored_tasks(month, [task for score, task in month_scored_tasks])))
+        return sorted(scored_tasks, key=lambda scored_task: (-scored_task[0], scored_task[1].row_id))[:limit]
+
+    @profiled
+    def run_query(self, query, plan=None):
+        """
+        Runs a query on each month, only those that the manifest says may have tasks of its dates if it has any
+        :param query: Query
+        :param plan: QueryPlan ... to add the steps taken to, adding up those of every month
+        :return: [StoredTask] ... month after month, in log order within each month
+        """
+        with self.lock:
+            partitions = self.get_partitions(*(query.ordinals or (None, None)))
+            if plan is not None:
+                plan.add_note("{} of {} months searched".format(len(partitions), len(self.manifest)))
+            return [task for month, partition in partitions
+                    for task in self.to_stored_tasks(month, partition.run_query(query, plan))]
+
+
+class SegmentStore(TaskStore):
+    def __init__(self, file_name):
+        """
+        Keeps the tasks of a segment of an archive in memory, see ArchivedStore. Segments are compressed csv files that
+        are never changed once written, so they are read without locking them, decompressed as they are parsed, and
+        searched in memory. They are not written through this store.
+
+        :param file_name: string ... path to the segment, its extension tells how it is compressed
+        """
+        super().__init__(file_name)
+
+    @contextmanager
+    def locked(self, exclusive=False):
+        """
+        Holds the store against other threads, the segment doesn't change
+        :param exclusive: boolean
+        :return: None
+        """
+        with self.lock:
+            yield
+
+    def read_appended(self):
+        """
+        Segments are compressed, and never appended to, so one that changed is read whole again
+        :return: boolean ... False
+        """
+        return False
+
+    @profiled
+    def load(self):
+        """
+        Reads the tasks of the segment, decompressing it as it goes
+        :return: None
+        """
+        with self.lock:
+            file_state = self.get_file_state()
+            table = TaskTable()
+            ordinals = {}  # dd/mm/yyyy: ordinal, the rows are sorted by date so there are few of them
+            with open(self.file_name, 'rb') as rf, compressed_file(rf, get_compression(self.file_name)) as cf:
+                for row in csv.reader(io.TextIOWrapper(cf, encoding="utf-8", newline="")):
+                    if row[0] not in ordinals:
+                        ordinals[row[0]] = date_to_ordinal(row[0])
+                    table.append(row, ordinal=ordinals[row[0]])
+            count("archived rows read", len(table))
+            self.table = table
+            self.file_state = file_state
+            self.loaded = True
+            self.reset_indexes()
+
+    def find_by_pattern(self, pattern):
+        """
+        Finds the tasks whose description or notes match a regular expression, checking only the rows that the trigram
+        index leaves, see TaskStore.find_by_pattern
+        :param pattern: compiled regular expression
+        :return: [TaskRow] ... in segment order
+        """
+        with self.lock:
+            table = self.refresh()
+            candidates = self.find_candidates(required_texts(pattern))
+            return self.rows_to_tasks(row_id for row_id in (table.live_row_ids() if candidates is None else candidates)
+                                      if pattern.search(table.get_description(row_id)) or
+                                      pattern.search(table.get_notes(row_id)))
+
+
+class ArchivedStore(LogStore):
+    def __init__(self, file_name):
+        """
+        Keeps a csv log whose old tasks have been moved to an archive, see archive: a directory named like the log with
+        ARCHIVE_EXTENSION, holding compressed segments of a year or less of tasks, sorted by date and never changed,
+        and a summary of their dates, tasks, minutes and highest id. The rest of the log is kept by a TaskStore.
+
+        Searches by date only read the segments they overlap. Editing or deleting an archived task writes its segment
+        again as a new one, and an edited task goes back to the log file.
+
+        :param file_name: string ... path to the csv log file
+        """
+        super().__init__(file_name)
+        self.log = TaskStore(file_name)
+        self.archive_directory = file_name + ARCHIVE_EXTENSION
+        self.summary_file_name = os.path.join(self.archive_directory, "segments.csv")
+        self.summary = {}  # segment number: [file name, first date ordinal, last date ordinal, rows, minutes, last id]
+        self.summary_state = None  # stat of the summary when it was read, see TaskStore.stat_file
+        self.segments = {}  # segment number: SegmentStore, made the first time the segment is used
+        self.file_lock = FileLock(os.path.join(self.archive_directory, "segments.lock"))
+
+    def refresh_summary(self):
+        """
+        Reads the summary again if it has changed since we last read it. It is always replaced whole, so it can be read
+        without the lock.
+        :return: dictionary ... see self.summary
+        """
+        with self.lock:
+            summary_state = TaskStore.stat_file(self.summary_file_name)
+            if summary_state != self.summary_state:
+                summary = {}
+                if summary_state:
+                    with open(self.summary_file_name, 'r', newline='') as f:
+                        for entry in csv.reader(f):  # segments written before tasks had ids have no last id
+                            number, segment_file_name, first_date, last_date, rows, minutes = entry[:6]
+                            summary[int(number)] = [segment_file_name, date_to_ordinal(first_date),
+                                                    date_to_ordinal(last_date), int(rows), int(minutes),
+                                                    int(entry[6]) if len(entry) > 6 else 0]
+                self.summary, self.summary_state = summary, summary_state
+                self.segments = {number: segment for number, segment in self.segments.items() if number in summary}
+                self.log.first_id = max((entry[5] for entry in summary.values()), default=0) + 1
+            return self.summary
+
+    @contextmanager
+    def changing_summary(self):
+        """
+        Holds the store, and the archive against other processes, while segments are written. The summary is written
+        again at the end if it was changed, and then the files of the segments taken out of it are removed.
+        :return: dictionary ... a copy of the summary as it is on disk, to change in place, see self.summary
+        """
+        with self.lock:
+            os.makedirs(self.archive_directory, exist_ok=True)
+            self.file_lock.acquire(exclusive=True)
+            try:
+                self.summary_state = None  # another process may have written it in the same tick of the clock
+                old_summary = self.refresh_summary()
+                summary = {number: list(entry) for number, entry in old_summary.items()}
+                yield summary
+                if summary != old_summary:
+                    contents = io.StringIO()
+                    csv.writer(contents).writerows([number, segment_file_name, ordinal_to_date(first_ordinal),
+                                                    ordinal_to_date(last_ordinal), rows, minutes, last_id]
+                                                   for number, (segment_file_name, first_ordinal, last_ordinal, rows,
+                                                                minutes, last_id) in sorted(summary.items()))
+                    write_file_atomically(self.summary_file_name,
+                                          lambda f: f.write(contents.getvalue().encode("utf-8")))
+                    self.refresh_summary()
+                    for number in set(old_summary) - set(summary):
+                        segment_file_name = os.path.join(self.archive_directory, old_summary[number][0])
+                        if os.path.exists(segment_file_name):
+                            os.remove(segment_file_name)
+            finally:
+                self.file_lock.release()
+
+    def write_segments(self, summary, ordinals, rows, compression):
+        """
+        Writes rows to new segments, one for each year, and adds them to the summary
+        :param summary: dictionary ... see self.summary, as changing_summary gives it
+        :param ordinals: [integer] ... date ordinal of each row
+        :param rows: [[string]] ... date, description, time spent, notes, id
+        :param compression: string ... one of ARCHIVE_COMPRESSIONS
+        :return: None
+        """
+        rows_by_year = {}
+        for ordinal, row in sorted(zip(ordinals, rows), key=lambda dated_row: dated_row[0]):
+            rows_by_year.setdefault(date.fromordinal(ordinal).year, []).append((ordinal, row))
+        for year in sorted(rows_by_year):
+            year_rows = rows_by_year[year]
+            number = max(summary, default=0) + 1
+            first_ordinal, last_ordinal = year_rows[0][0], year_rows[-1][0]
+            segment_file_name = "{:04d}_{}_{}{}".format(number, date.fromordinal(first_ordinal).isoformat(),
+                                                        date.fromordinal(last_ordinal).isoformat(),
+                                                        ARCHIVE_COMPRESSIONS[compression])
+
+            def write_segment(f):
+                with compressed_file(f, compression, "wb") as cf:
+                    for row, encoded_row in encode_rows(row for ordinal, row in year_rows):
+                        cf.write(encoded_row)
+
+            write_file_atomically(os.path.join(self.archive_directory, segment_file_name), write_segment)
+            summary[number] = [segment_file_name, first_ordinal, last_ordinal, len(year_rows),
+                               sum(int(row[2]) for ordinal, row in year_rows),
+                               max(int(row[4]) if len(row) > 4 and row[4] else 0 for ordinal, row in year_rows)]
+
+    @profiled
+    def archive(self, before_date, compression="gzip"):
+        """
+        Moves the tasks of the log file dated before a day to new segments, and leaves the log file with the rest. The
+        segments and the summary are written before the log file, so a crash in between leaves the moved tasks twice
+        rather than not at all.
+        :param before_date: string ... dd/mm/yyyy
+        :param compression: string ... one of ARCHIVE_COMPRESSIONS
+        :return: integer ... number of tasks moved
+        """
+        before_ordinal = date_to_ordinal(before_date)
+        with self.log.locked(exclusive=True):
+            table = self.log.refresh()
+            archived_ordinals, archived_rows, kept_rows = [], [], []
+            for row_id in table.live_row_ids():
+                if table.ordinals[row_id] < before_ordinal:
+                    archived_ordinals.append(table.ordinals[row_id])
+                    archived_rows.append(table.get_row(row_id))
+                else:
+                    kept_rows.append(table.get_row(row_id))
+            if not archived_rows:
+                return 0
+            with self.changing_summary() as summary:
+                self.write_segments(summary, archived_ordinals, archived_rows, compression)
+            self.log.write_rows(kept_rows)
+            return len(archived_rows)
+
+    def get_segment(self, number):
+        """
+        :param number: integer ... segment number, in the summary
+        :return: SegmentStore
+        """
+        with self.lock:
+            if number not in self.segments:
+                self.segments[number] = SegmentStore(os.path.join(self.archive_directory, self.summary[number][0]))
+            return self.segments[number]
+
+    def get_segments(self, first_ordinal=None, last_ordinal=None):
+        """
+        The segments in the summary, or only those that may have tasks between two dates
+        :param first_ordinal: integer ... date ordinal
+        :param last_ordinal: integer ... date ordinal
+        :return: [(integer, SegmentStore)] ... segment number and segment, by date
+        """
+        with self.lock:
+            summary = self.refresh_summary()
+            return [(number, self.get_segment(number))
+                    for number in sorted(summary, key=lambda number: (summary[number][1], number))
+                    if (first_ordinal is None or summary[number][2] >= first_ordinal) and
+                    (last_ordinal is None or summary[number][1] <= last_ordinal)]
+
+    def search(self, search_store, first_ordinal=None, last_ordinal=None):
+        """
+        Runs a search on the segments that may have tasks between two dates, and on the log file
+        :param search_store: function ... called with a TaskStore, returns the [TaskRow] found in it
+        :param first_ordinal: integer ... date ordinal
+        :param last_ordinal: integer ... date ordinal
+        :return: [Task] ... the archived tasks, as StoredTask, segment after segment, then those of the log file
+        """
+        with self.lock:
+            return [task for number, segment in self.get_segments(first_ordinal, last_ordinal)
+                    for task in rows_to_stored_tasks(number * ARCHIVE_ROW_IDS, search_store(segment))] + \
+                search_store(self.log)
+
+    def find_in_archive(self, task):
+        """
+        Finds an archived task in its segment
+        :param task: Task
+        :return: (integer, integer) ... segment number and row number in the segment, None if the task is not archived
+        """
+        with self.lock:
+            if task.task_id is not None:
+                number, found_task = self.find_by_id(task.task_id)
+                return (number, found_task.row_id) if number is not None else None
+            summary = self.refresh_summary()
+            if isinstance(task, StoredTask) and task.row_id >= ARCHIVE_ROW_IDS:
+                number, row_id = divmod(task.row_id, ARCHIVE_ROW_IDS)
+                if number in summary:
+                    segment_task = self.get_segment(number).get_task(row_id)
+                    if segment_task is not None and segment_task == task:
+                        return number, row_id
+            if isinstance(task, TaskRow):
+                return None  # read from the log file
+            with self.log.lock:
+                if self.log.find_row(task) is not None:
+                    return None
+            ordinal = date_to_ordinal(task.task_date)
+            for number, segment in self.get_segments(ordinal, ordinal):
+                with segment.lock:
+                    row_id = segment.find_row(task)
+                if row_id is not None:
+                    return number, row_id
+            return None
+
+    def find_by_id(self, task_id):
+        """
+        Finds a task by its id, in the log file and then in the segments with ids as high as it
+        :param task_id: integer
+        :return: (integer, TaskRow) ... segment number, None for the log file, and task of the log file or the segment,
+        (None, None) if there is no task with that id
+        """
+        with self.lock:
+            task = self.log.get_task_by_id(task_id)
+            if task is not None:
+                return None, task
+            summary = self.refresh_summary()
+            for number in sorted(summary):
+                if summary[number][5] >= task_id:
+                    task = self.get_segment(number).get_task_by_id(task_id)
+                    if task is not None:
+                        return number, task
+            return None, None
+
+    @profiled
+    def remove_from_archive(self, number, row_id):
+        """
+        Writes a segment again without one of its tasks, as a new segment
+        :param number: integer ... segment number
+        :param row_id: integer ... row number in the segment
+        :return: [string] ... the row taken out, None if the segment was already written again by another process
+        """
+        with self.changing_summary() as summary:
+            if number not in summary:
+                return None
+            table = self.get_segment(number).refresh()
+            kept_rows = [kept_row for kept_row in table.live_row_ids() if kept_row != row_id]
+            if kept_rows:  # numbered after the old segment, so its row ids are not given to other tasks
+                self.write_segments(summary, [table.ordinals[kept_row] for kept_row in kept_rows],
+                                    [table.get_row(kept_row) for kept_row in kept_rows],
+                                    get_compression(summary[number][0]))
+            del summary[number]
+        return table.get_row(row_id)
+
+    def warm_up(self):
+        """
+        Loads the tasks and builds the indexes of the log file and of every segment
+        :return: None
+        """
+        with self.lock:
+            for number, segment in self.get_segments():
+                segment.warm_up()
+            self.log.warm_up()
+
+    def get_version(self):
+        """
+        :return: tuple ... state of the summary and of the log file, see TaskStore.get_file_state, the segments don't
+        change
+        """
+        with self.lock:
+            self.refresh_summary()
+            return self.summary_state, self.log.get_version()
+
+    def get_time_columns(self):
+        """
+        :return: (array, array) ... date ordinals and minutes of every task, the archived ones first, as array('i')
+        """
+        with self.lock:
+            ordinals, minutes = array('i'), array('i')
+            for number, segment in self.get_segments() + [(None, self.log)]:
+                part_ordinals, part_minutes = segment.get_time_columns()
+                ordinals.extend(part_ordinals)
+                minutes.extend(part_minutes)
+            return ordinals, minutes
+
+    def get_tasks(self):
+        """
+        :return: [Task] ... the archived tasks by date, then those of the log file in log order
+        """
+        return self.search(lambda store: store.get_tasks())
+
+    def get_task(self, row_id):
+        """
+        :param row_id: integer
+        :return: Task ... None if there is no such task
+        """
+        number, segment_row_id = divmod(row_id, ARCHIVE_ROW_IDS)
+        with self.lock:
+            if number == 0:
+                return self.log.get_task(row_id)
+            if number not in self.refresh_summary():
+                return None
+            task = self.get_segment(number).get_task(segment_row_id)
+            return rows_to_stored_tasks(number * ARCHIVE_ROW_IDS, [task])[0] if task is not None else None
+
+    def get_task_by_id(self, task_id):
+        """
+        :param task_id: integer
+        :return: Task ... None if there is no task with that id
+        """
+        with self.lock:
+            number, task = self.find_by_id(task_id)
+            if number is None:
+                return task
+            return rows_to_stored_tasks(number * ARCHIVE_ROW_IDS, [task])[0]
+
+    def append_rows(self, rows):
+        """
+        Appends rows to the log file, see TaskStore.append_rows
+        :param rows: iterable of [string] ... rows as normalize_row makes them
+        :return: integer ... number of rows appended
+        """
+        self.refresh_summary()  # for the log file to give ids above those of the archive
+        return self.log.append_rows(rows)
+
+    @profiled
+    def write_rows(self, rows):
+        """
+        Writes rows over the whole log. Those dated up to the last day of the archive go to new segments, compressed
+        as the old ones were, and the rest to the log file. Rows without an id are given a new one first.
+        :param rows: iterable of [string] ... date, description, time spent, notes and, optionally, id
+        :return: None
+        """
+        archived_ordinals, archived_rows, kept_rows = [], [], []
+        with self.log.locked(exclusive=True):
+            with self.changing_summary() as summary:
+                last_ordinal = max((entry[2] for entry in summary.values()), default=None)
+                for row in with_ids(rows, itertools.count(self.log.next_free_id(self.log.refresh()))):
+                    ordinal = date_to_ordinal(row[0])
+                    if last_ordinal is not None and ordinal <= last_ordinal:
+                        archived_ordinals.append(ordinal)
+                        archived_rows.append(row)
+                    else:
+                        kept_rows.append(row)
+                old_numbers = list(summary)
+                compression = get_compression(summary[old_numbers[0]][0]) if old_numbers else "gzip"
+                self.write_segments(summary, archived_ordinals, archived_rows, compression)
+                for number in old_numbers:
+                    del summary[number]
+            self.log.write_rows(kept_rows)
+
+    def replace_task(self, old_task, new_task):
+        """
+        Replaces a task by a new one, in the log file, or takes it out of its segment and puts the new one in the log
+        file
+        :param old_task: Task
+        :param new_task: Task
+        :return: None ... raises a ValueError, and changes nothing, if the old task is no longer in the log
+        """
+        with self.lock:
+            archived = self.find_in_archive(old_task)
+            if archived is None:
+                self.log.replace_task(old_task, new_task)
+                return
+            removed_row = self.remove_from_archive(*archived)
+            if removed_row is None:
+                raise ValueError("the task to replace is no longer in the log")
+            self.log.append_rows([normalize_row(task_to_row(new_task) + removed_row[4:])])  # with its id, if any
+
+    def delete_task(self, task):
+        """
+        Deletes a task from the log file or from its segment
+        :param task: Task
+        :return: None
+        """
+        with self.lock:
+            archived = self.find_in_archive(task)
+            if archived is None:
+                self.log.delete_task(task)
+            else:
+                self.remove_from_archive(*archived)
+
+    def get_dates_with_tasks(self):
+        """
+        :return: [string] ... dd/mm/yyyy, in order
+        """
+        with self.lock:
+            ordinals = set()
+            for number, segment in self.get_segments() + [(None, self.log)]:
+                ordinals.update(segment.get_date_index().ordinals)
+            return [ordinal_to_date(ordinal) for ordinal in sorted(ordinals)]
+
+    @profiled
+    def find_by_date_range(self, first_date, last_date):
+        """
+        Finds the tasks between two dates, both included, only in the segments that the summary says may have them
+        :param first_date: string ... dd/mm/yyyy
+        :param last_date: string ... dd/mm/yyyy
+        :return: [Task] ... ordered by date
+        """
+        first_ordinal, last_ordinal = date_to_ordinal(first_date), date_to_ordinal(last_date)
+        with self.lock:
+            count("segments skipped by date",
+                  len(self.refresh_summary()) - len(self.get_segments(first_ordinal, last_ordinal)))
+            tasks = self.search(lambda store: store.find_by_date_range(first_date, last_date), first_ordinal,
+                                last_ordinal)
+            if not tasks or isinstance(tasks[0], TaskRow):
+                return tasks  # only from the log file, already in order
+            return sort_by_date(tasks)
+
+    @profiled
+    def find_by_time_spent(self, first_minutes, last_minutes):
+        """
+        :param first_minutes: integer
+        :param last_minutes: integer
+        :return: [Task] ... the archived tasks by date, then those of the log file in log order
+        """
+        return self.search(lambda store: store.find_by_time_spent(first_minutes, last_minutes))
+
+    @profiled
+    def time_spent_percentile(self, percent):
+        """
+        The minutes that a given percentage of the tasks don't go over, see merged_percentile
+        :param percent: number ... from 0 to 100
+        :return: integer ... None if there are no tasks
+        """
+        with self.lock:
+            return merged_percentile([segment.get_time_index().minutes
+                                      for number, segment in self.get_segments() + [(None, self.log)]], percent)
+
+    @profiled
+    def find_by_words(self, words):
+        """
+        :param words: string
+        :return: [Task] ... those using all the words, the archived ones by date first
+        """
+        return self.search(lambda store: store.find_by_words(words))
+
+    @profiled
+    def find_by_pattern(self, pattern):
+        """
+        :param pattern: compiled regular expression
+        :return: [Task] ... those whose description or notes match, the archived ones by date first
+        """
+        return self.search(lambda store: store.find_by_pattern(pattern))
+
+    @profiled
+    def find_by_substring(self, text):
+        """
+        :param text: string
+        :return: [Task] ... those containing the text anywhere, in any case, the archived ones by date first
+        """
+        return self.search(lambda store: store.find_by_substring(text))
+
+    @profiled
+    def find_fuzzy(self, text, limit=20):
+        """
+        The best tasks of every segment and of the log file, ranked together
+        :param text: string
+        :param limit: integer ... most tasks to find
+        :return: [(float, Task)] ... score and task, best first, then the archived ones by date first
+        """
+        scored_tasks = []
+        with self.lock:
+            for number, segment in self.get_segments():
+                segment_scored_tasks = segment.find_fuzzy(text, limit)
+                scored_tasks.extend(zip((score for score, task in segment_scored_tasks),
+                                        rows_to_stored_tasks(number * ARCHIVE_ROW_IDS,
+                                                             [task for score, task in segment_scored_tasks])))
+            scored_tasks.extend(self.log.find_fuzzy(text, limit))
+        return sorted(scored_tasks, key=lambda scored_task: -scored_task[0])[:limit]
+
+    @profiled
+    def run_query(self, query, plan=None):
+        """
+        Runs a query on each segment, only those that the summary says may have tasks of its dates if it has any, and on
+        the log file
+        :param query: Query
+        :param plan: QueryPlan ... to add the steps taken to, adding up those of every segment and the log file
+        :return: [Task] ... the archived ones by date first
+        """
+        first_ordinal, last_ordinal = query.ordinals or (None, None)
+        with self.lock:
+            if plan is not None:
+                plan.add_note("{} of {} segments searched, and the log file".format(
+                    len(self.get_segments(first_ordinal, last_ordinal)), len(self.refresh_summary())))
+            return self.search(lambda store: store.run_query(query, plan), first_ordinal, last_ordinal)
+
+
+def make_store(file_name):
+    """
+    Makes the store for a log, by the extension of its file
+    :param file_name: string
+    :return: LogStore ... RemoteStore for http:// URLs of a query server, SqliteStore for the SQLITE_EXTENSIONS,
+    PartitionedStore for the PARTITIONED_EXTENSION, ArchivedStore for csv logs with an archive, TaskStore for anything
+    else
+    """
+    if file_name.startswith("http://"):
+        return lazy_import("worklog.server").RemoteStore(file_name)
+    extension = os.path.splitext(os.path.normpath(file_name))[1].lower()
+    if extension in SQLITE_EXTENSIONS:
+        return SqliteStore(file_name)
+    if extension == PARTITIONED_EXTENSION:
+        return PartitionedStore(file_name)
+    if os.path.isdir(file_name + ARCHIVE_EXTENSION):
+        return ArchivedStore(file_name)
+    return TaskStore(file_name)
+
+
+TASK_STORE = None  # shared by every command in this process, made the first time it is needed, see get_task_store
+
+
+def get_task_store():
+    """
+    Makes the store of the script's log the first time it is asked for, so importing the script touches no files
+    :return: LogStore
+    """
+    global TASK_STORE
+    if TASK_STORE is None:
+        TASK_STORE = make_store(WORK_LOG_FILE_NAME)
+    return TASK_STORE
+
+
+def set_task_store(store):
+    """
+    Makes every command in this process use a store, e.g. a RemoteStore for --server
+    :param store: LogStore
+    :return: None
+    """
+    global TASK_STORE
+    TASK_STORE = store
+
+
+# File Functions
+
+def buffered_rows(rows, size=APPEND_BUFFER_ROWS):
+    """
+    Reads rows a buffer at a time, so that a store can read them before taking the lock that writing them needs,
+    rather than while it holds it
+    :param rows: iterable of [string]
+    :param size: integer ... rows in each buffer
+    :return: generator of ([[string]], Exception) ... each buffer, and the error that reading the rows after it raised,
+    if any, in which case it is the last one
+    """
+    rows = iter(rows)
+    while True:
+        buffer = []
+        try:
+            for row in itertools.islice(rows, size):
+                buffer.append(row)
+        except Exception as error:
+            yield buffer, error
+            return
+        if buffer:
+            yield buffer, None
+        if len(buffer) < size:
+            return
+
+
+@profiled
+def read_log_file():
+    """
+    reads the log file into a list of Task objects, the log is only parsed again if it has changed on disk
+    :return: [Task]
+    """
+    task_log = list(get_task_store().get_tasks())
+    if not task_log:  # empty file?'
+        print("\n\a\t*** Sorry the log file seems empty. *** \n")
+    return task_log
+
+
+def append_task_to_log(task_entry):
+    """
+    Appends a task to the log
+    :param task_entry: string
+    :return:
+    """
+    get_task_store().append(task_entry)
+
+
+def read_rows_with_offsets(rf, offset=0, end=None):
+    """
+    Reads csv rows from a file opened in binary mode, telling where each row starts
+    :param rf: binary file
+    :param offset: integer ... position of the file at the start
+    :param end: integer ... position of the file where to stop, if not at the end of the file
+    :return: generator of (integer, [string]) ... byte offset of the row and the row
+    """
+    end_of_line = [offset]  # how far the reader has read, the csv reader only asks for the lines it needs
+
+    def lines():
+        for line in rf:
+            if end is not None and end_of_line[0] >= end:
+                return
+            end_of_line[0] += len(line)
+            yield line.decode("utf-8")
+
+    row_start = offset
+    for row in csv.reader(lines()):
+        yield row_start, row
+        row_start = end_of_line[0]
+
+
+def encode_rows(rows):
+    """
+    Encodes rows the way csv.writer writes them to the log file
+    :param rows: iterable of [string]
+    :return: generator of ([string], bytes) ... each row and its bytes
+    """
+    row_buffer = io.StringIO()
+    writer = csv.writer(row_buffer)
+    for row in rows:
+        writer.writerow(row)
+        yield row, row_buffer.getvalue().encode("utf-8")
+        row_buffer.seek(0)
+        row_buffer.truncate()
+
+
+def get_compression(file_name):
+    """
+    :param file_name: string ... of a segment of an archive, see ArchivedStore
+    :return: string ... how it is compressed, one of ARCHIVE_COMPRESSIONS, by its extension
+    """
+    for compression, extension in ARCHIVE_COMPRESSIONS.items():
+        if file_name.endswith(extension):
+            return compression
+    raise ValueError("{} is not a segment of an archive".format(file_name))
+
+
+def compressed_file(f, compression, mode="rb"):
+    """
+    Decompresses what is read from a file, or compresses what is written to it, as a stream. zstd needs Python 3.14 or
+    the zstandard package.
+    :param f: binary file ... left open when the compressed file is closed
+    :param compression: string ... one of ARCHIVE_COMPRESSIONS
+    :param mode: string ... 'rb' or 'wb'
+    :return: binary file ... to use in a with statement
+    """
+    if compression == "gzip":
+        return gzip.GzipFile(fileobj=f, mode=mode, mtime=0)
+    if zstd is not None:
+        return zstd.ZstdFile(f, mode[0])
+    if zstandard is None:
+        raise ValueError("zstd compression needs Python 3.14 or the zstandard package: pip install zstandard")
+    if mode == "rb":
+        return io.BufferedReader(zstandard.ZstdDecompressor().stream_reader(f, closefd=False))
+    return zstandard.ZstdCompressor().stream_writer(f, closefd=False)
+
+
+@profiled
+def write_file_atomically(file_name, write_contents):
+    """
+    Writes a file through a temporary file next to it, flushed to disk and then renamed over the file, so the file is
+    either the old one or the new one, never a half written one
+    :param file_name: string ... path to the file
+    :param write_contents: function ... called with the temporary file, opened in binary mode
+    :return: whatever write_contents returns
+    """
+    directory = os.path.dirname(os.path.abspath(file_name))
+    fd, temp_file_name = tempfile.mkstemp(prefix="." + os.path.basename(file_name), suffix=".tmp", dir=directory)
+    try:
+        with open(fd, 'wb') as f:
+            result = write_contents(f)
+            f.flush()
+            os.fsync(f.fileno())
+        if os.path.exists(file_name):
+            os.chmod(temp_file_name, os.stat(file_name).st_mode & 0o7777)
+        os.replace(temp_file_name, file_name)
+    except BaseException:
+        os.unlink(temp_file_name)
+        raise
+    if hasattr(os, "O_DIRECTORY"):
+        # makes the rename itself durable
+        dir_fd = os.open(directory, os.O_RDONLY | os.O_DIRECTORY)
+        try:
+            os.fsync(dir_fd)
+        finally:
+            os.close(dir_fd)
+    return result
+
+
+def write_log_rows_atomically(file_name, rows):
+    """
+    Writes rows over the log file, see write_file_atomically
+    :param file_name: string ... path to the log file
+    :param rows: iterable of [string] ... rows to write, each written once
+    :return: [integer] ... byte offset of each row in the new log
+    """
+    def write_rows(f):
+        offsets = []
+        offset = 0
+        for row, encoded_row in encode_rows(rows):
+            f.write(encoded_row)
+            offsets.append(offset)
+            offset += len(encoded_row)
+        return offsets
+
+    return write_file_atomically(file_name, write_rows)
+
+
+def open_inotify(directory):
+    """
+    Starts watching a directory for files written, created, moved in or deleted, with Linux's inotify
+    :param directory: string
+    :return: integer ... file descriptor to read the events from, see read_inotify_names, None where there is no inotify
+    """
+    if not sys.platform.startswith("linux"):
+        return None
+    try:
+        libc = ctypes.CDLL(ctypes.util.find_library("c"), use_errno=True)
+        inotify_fd = libc.inotify_init1(os.O_CLOEXEC)
+    except (OSError, AttributeError):
+        return None
+    if inotify_fd < 0:
+        return None
+    if libc.inotify_add_watch(inotify_fd, os.fsencode(directory), INOTIFY_MASK) < 0:
+        os.close(inotify_fd)
+        return None
+    return inotify_fd
+
+
+def read_inotify_names(inotify_fd):
+    """
+    Reads the events waiting in an inotify file descriptor
+    :param inotify_fd: integer ... see open_inotify
+    :return: {string} ... names of the files that changed, None if events were dropped and any file may have changed
+    """
+    events = os.read(inotify_fd, 64 * 1024)
+    names = set()
+    position = 0
+    while position + INOTIFY_EVENT.size <= len(events):
+        _, mask, _, name_length = INOTIFY_EVENT.unpack_from(events, position)
+        position += INOTIFY_EVENT.size
+        if mask & INOTIFY_OVERFLOW:
+            return None
+        names.add(os.fsdecode(events[position:position + name_length].rstrip(b"\0")))
+        position += name_length
+    return names
+
+
+@profiled
+def hash_file(file_name, size):
+    """
+    Checksum of the start of a file
+    :param file_name: string
+    :param size: integer ... bytes to hash
+    :return: bytes ... sha1 digest, None if the file is shorter than size
+    """
+    digest = hashlib.sha1()
+    with open(file_name, 'rb') as f:
+        while size > 0:
+            block = f.read(min(size, 1024 * 1024))
+            if not block:
+                return None
+            digest.update(block)
+            size -= len(block)
+    return digest.digest()
+
+
+@profiled
+def write_sidecar(sidecar_file_name, table, log_state, log_digest, given_id):
+    """
+    Saves the columns of a table, as parsed from the log file, to a binary file next to the log
+    :param sidecar_file_name: string
+    :param table: TaskTable ... with every row of the log and nothing else, as it comes from parsing it
+    :param log_state: (integer, integer) ... modification time and size of the log the table comes from
+    :param log_digest: bytes ... sha1 of the log
+    :param given_id: integer ... the last id given to a task of the log, see write_given_id
+    :return: None
+    """
+    def write_columns(f):
+        f.write(SIDECAR_HEADER.pack(SIDECAR_MAGIC, sys.byteorder == "little", log_state[1], log_state[0], log_digest,
+                                    len(table), len(table.text)))
+        f.write(SIDECAR_IDS.pack(log_state[1], log_state[0], given_id))
+        for column in (table.ordinals, table.minutes, table.text_offsets, table.log_offsets, table.ids):
+            column.tofile(f)
+        f.write(table.text)
+
+    write_file_atomically(sidecar_file_name, write_columns)
+
+
+@profiled
+def read_sidecar(sidecar_file_name, log_file_name, log_state):
+    """
+    Loads the columns saved by write_sidecar, memory mapping the sidecar, if they still match the start of the log
+    :param sidecar_file_name: string
+    :param log_file_name: string
+    :param log_state: (integer, integer) ... modification time and size of the log now
+    :return: (TaskTable, integer) ... the table and how many bytes of the log it covers, or None
+    """
+    try:
+        with open(sidecar_file_name, 'rb') as f:
+            mapped_sidecar = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    except (FileNotFoundError, ValueError):  # ValueError for an empty file
+        return None
+    with mapped_sidecar:
+        if len(mapped_sidecar) < SIDECAR_HEADER.size + SIDECAR_IDS.size:
+            return None
+        magic, little_endian, log_size, log_mtime, log_digest, rows, text_size = \
+            SIDECAR_HEADER.unpack_from(mapped_sidecar)
+        if magic != SIDECAR_MAGIC or little_endian != (sys.byteorder == "little") or log_size > log_state[1]:
+            return None
+        if (log_mtime, log_size) != log_state and hash_file(log_file_name, log_size) != log_digest:
+            return None  # the log has been changed, not only appended to
+        table = TaskTable()
+        start = SIDECAR_HEADER.size + SIDECAR_IDS.size
+        for column, row_size in ((table.ordinals, 4), (table.minutes, 4), (table.text_offsets, 32),
+                                 (table.log_offsets, 8), (table.ids, 8)):
+            end = start + rows * row_size
+            column.frombytes(mapped_sidecar[start:end])
+            start = end
+        table.text = bytearray(mapped_sidecar[start:start + text_size])
+        if start + text_size != len(mapped_sidecar) or len(table.text_offsets) != rows * 4:
+            return None
+    table.alive = bytearray(b"\x01") * rows
+    table.live_rows = rows
+    table.max_id = max(table.ids, default=0)
+    return table, log_size
+
+
+def read_given_id(sidecar_file_name, log_state):
+    """
+    The last id given to a task of a log, as write_given_id saved it, without reading the rest of the sidecar
+    :param sidecar_file_name: string
+    :param log_state: (integer, integer) ... modification time and size of the log now, None if there is no log
+    :return: integer ... None if the sidecar doesn't say it of the log as it is now
+    """
+    try:
+        with open(sidecar_file_name, 'rb') as f:
+            header = f.read(SIDECAR_HEADER.size + SIDECAR_IDS.size)
+    except FileNotFoundError:
+        return None
+    if len(header) < SIDECAR_HEADER.size + SIDECAR_IDS.size or not header.startswith(SIDECAR_MAGIC):
+        return None
+    log_size, log_mtime, given_id = SIDECAR_IDS.unpack_from(header, SIDECAR_HEADER.size)
+    return given_id if (log_mtime, log_size) == (log_state or (0, 0)) else None
+
+
+def write_given_id(sidecar_file_name, log_state, given_id):
+    """
+    Saves the last id given to a task of a log in its sidecar, in place, so that the next append knows it without
+    loading the log. A log too small for a sidecar of its columns gets one of its header alone.
+    :param sidecar_file_name: string
+    :param log_state: (integer, integer) ... modification time and size of the log, with the task of that id
+    :param given_id: integer
+    :return: None
+    """
+    for attempt in range(2):
+        try:
+            with open(sidecar_file_name, 'r+b') as f:
+                if f.read(len(SIDECAR_MAGIC)) == SIDECAR_MAGIC:
+                    f.seek(SIDECAR_HEADER.size)
+                    f.write(SIDECAR_IDS.pack(log_state[1], log_state[0], given_id))
+                    return
+        except FileNotFoundError:
+            pass
+        write_sidecar(sidecar_file_name, TaskTable(), (0, 0), hashlib.sha1().digest(), 0)  # covers none of the log
+
+
+def get_fork_context():
+    """
+    Worker processes are forked, so they don't have to import the script again
+    :return: multiprocessing context, None where fork is not available
+    """
+    if "fork" not in multiprocessing.get_all_start_methods():
+        return None
+    return multiprocessing.get_context("fork")
+
+
+def scan_log_chunk(file_name, start, end, pattern, flags):
+    """
+    Searches the rows in a piece of the log for a regular expression, runs in a worker process
+    :param file_name: string
+    :param start: integer ... byte offset where the first row of the piece starts
+    :param end: integer ... byte offset where the piece ends
+    :param pattern: string ... regular expression
+    :param flags: integer ... regular expression flags
+    :return: [integer] ... offsets of the rows whose description or notes match
+    """
+    compiled_pattern = re.compile(pattern, flags)
+    with open(file_name, 'rb') as f:
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mapped_log:
+            chunk = mapped_log[start:end]
+    matching_offsets = []
+    for offset, row in read_rows_with_offsets(io.BytesIO(chunk), start):
+        if compiled_pattern.search(row[1]) or compiled_pattern.search(row[3]):
+            matching_offsets.append(offset)
+    return matching_offsets
+
+
+@profiled
+def scan_log_in_parallel(file_name, row_offsets, log_size, pattern):
+    """
+    Searches the log for a regular expression with a pool of processes, each one taking a piece of the log that
+    starts and ends on row boundaries
+    :param file_name: string
+    :param row_offsets: [integer] ... offsets of rows in the log, in order, used to split it
+    :param log_size: integer ... bytes of the log to search
+    :param pattern: compiled regular expression
+    :return: [integer] ... offsets of the matching rows, in file order
+    """
+    workers = os.cpu_count() or 1
+    chunk_size = max(PARALLEL_SCAN_CHUNK_SIZE, log_size // (workers * 4))
+    boundaries = [0]
+    for offset in row_offsets:
+        if offset - boundaries[-1] >= chunk_size:
+            boundaries.append(offset)
+    boundaries.append(log_size)
+
+    with ProcessPoolExecutor(max_workers=workers, mp_context=get_fork_context()) as executor:
+        futures = [executor.submit(scan_log_chunk, file_name, start, end, pattern.pattern, pattern.flags)
+                   for start, end in zip(boundaries, boundaries[1:])]
+        matching_offsets = []
+        for future in futures:
+            matching_offsets.extend(future.result())
+    return matching_offsets
+
+
+def rewrite_log_file(tasks_list):
+    """
+    rewrites the log file with new data
+    :param tasks_list: [Task]
+    :return:
+    """
+    get_task_store().rewrite(tasks_list)
+
+
+def migrate_log(source_file_name, target_file_name=None):
+    """
+    Copies every task of a log to a new one, e.g. from a csv file to a SQLite database, where they keep their ids. The
+    kind of each log comes from the extension of its file, see make_store. Without a new one the log is written again
+    in place, giving ids to the tasks of a log written before tasks had them.
+    :param source_file_name: string
+    :param target_file_name: string ... must not exist yet, None to write the log again in place
+    :return: integer ... number of tasks copied
+    """
+    if target_file_name is not None and os.path.exists(target_file_name):
+        raise FileExistsError(target_file_name)
+    source_store = make_store(source_file_name)
+    source_tasks = source_store.get_tasks()
+    target_store = source_store if target_file_name is None else make_store(target_file_name)
+    target_store.write_rows([task_to_row(task, with_id=True) for task in source_tasks])
+    return len(source_tasks)
+
+
+def archive_log(file_name, before_date, compression="gzip"):
+    """
+    Moves the tasks of a csv log dated before a day to compressed segments of its archive, see ArchivedStore.archive
+    :param file_name: string ... path to the log file
+    :param before_date: string ... dd/mm/yyyy
+    :param compression: string ... one of ARCHIVE_COMPRESSIONS
+    :return: integer ... number of tasks moved
+    """
+    store = make_store(file_name)
+    if type(store) is TaskStore:
+        store = ArchivedStore(file_name)
+    if not isinstance(store, ArchivedStore):
+        raise ValueError("only csv logs can be archived, {} is not one".format(file_name))
+    return store.archive(before_date, compression)